@@ -0,0 +1,364 @@
+"""
+HTTP load benchmark for the analytics API.
+
+Replays a weighted mix of dashboard, search, inbox and export requests at a
+fixed concurrency against a running server (seed the database first), then
+reports throughput and p50/p95/p99 latency per endpoint.
+
+Usage:
+    python benchmark.py                                        # 10 workers, 30s
+    python benchmark.py --concurrency 32 --duration 60 --output bench.json
+    python benchmark.py --output bench.json --baseline bench_baseline.json
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --only search,dashboard_trends --duration 10
+
+With --baseline the run exits non-zero when any endpoint's p95/p99 latency or
+throughput regresses beyond --max-regression, or its error rate exceeds
+--max-error-rate.
+"""
+import argparse
+import asyncio
+import json
+import platform as host_platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+# Fewer samples than this make the percentile too noisy to compare
+MIN_SAMPLES = {"p95_ms": 20, "p99_ms": 100}
+DOMAINS = ["fitness", "tech", "lifestyle", "fashion", "food", "travel", "gaming", "beauty"]
+
+# (name, weight, method, path, params/body builder); weights roughly follow
+# dashboard traffic: most requests are dashboard loads, then discovery, inbox
+# and the occasional export
+SCENARIOS = [
+    ("dashboard_bundle", 16, "GET", "/api/dashboard/bundle",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("dashboard_overview", 10, "GET", "/api/dashboard/overview",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("dashboard_trends", 10, "GET", "/api/dashboard/trends",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("platform_breakdown", 5, "GET", "/api/dashboard/platform-breakdown",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("posting_time_analysis", 5, "GET", "/api/dashboard/posting-time-analysis",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("monetization", 4, "GET", "/api/creator/monetization",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("profile_metrics", 4, "GET", "/api/creator/profile-metrics",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("search", 8, "GET", "/api/creators/search",
+     lambda f, rng: {"params": {"limit": 50}}),
+    ("search_filtered", 8, "GET", "/api/creators/search",
+     lambda f, rng: {"params": {"domain": rng.choice(DOMAINS), "min_engagement": 0.01, "limit": 20,
+                                "offset": rng.choice([0, 0, 20])}}),
+    ("inbox", 8, "GET", "/api/creator/inbox",
+     lambda f, rng: {"params": {"user_id": rng.choice(f["inbox_user_ids"])}}),
+    ("inbox_detail", 3, "GET", "/api/creator/inbox/{email_id}",
+     lambda f, rng: {"path": {"email_id": rng.choice(f["email_ids"])}}),
+    ("notifications", 5, "GET", "/api/notifications",
+     lambda f, rng: {"params": {"user_id": rng.choice(f["user_ids"])}}),
+    ("recommendations", 3, "GET", "/api/recommendations",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("ai_explain", 3, "POST", "/api/ai/explain",
+     lambda f, rng: {"json": {"creator_id": rng.choice(f["creator_ids"])}}),
+    ("export_csv", 2, "GET", "/api/reports/export",
+     lambda f, rng: {"params": {"creator_id": rng.choice(f["export_creator_ids"]), "format": "csv"}}),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HTTP load benchmark for the analytics API")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Server to benchmark")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent workers")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the run")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the request mix")
+    parser.add_argument("--only", default=None, help="Comma-separated scenario names to run")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous results file")
+    parser.add_argument("--save-baseline", default=None, help="Also write results to this baseline file")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed p95/p99 slowdown or throughput drop vs baseline, in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Ignore latency regressions smaller than this many milliseconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail when an endpoint's error rate exceeds this fraction")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    return parser.parse_args()
+
+
+def select_scenarios(only: Optional[str]):
+    if not only:
+        return SCENARIOS
+    names = {name.strip() for name in only.split(",") if name.strip()}
+    unknown = names - {s[0] for s in SCENARIOS}
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return [s for s in SCENARIOS if s[0] in names]
+
+
+async def discover_fixtures(client: httpx.AsyncClient) -> Dict[str, List[str]]:
+    """
+    Real ids to build requests from: creators from search, and email ids
+    from the inboxes of the first creators that have mail.
+    """
+    response = await client.get("/api/creators/search", params={"limit": 200})
+    response.raise_for_status()
+    creators = response.json()["creators"]
+    if not creators:
+        raise RuntimeError("No creators found - seed the database first")
+
+    fixtures = {
+        "creator_ids": [c["creator_id"] for c in creators],
+        "user_ids": [c["user_id"] for c in creators],
+        # Creators with posts, so export requests stream data rather than 404
+        "export_creator_ids": [c["creator_id"] for c in creators if c.get("post_count")] or
+                              [c["creator_id"] for c in creators],
+        "inbox_user_ids": [],
+        "email_ids": [],
+    }
+    for creator in creators[:50]:
+        response = await client.get("/api/creator/inbox", params={"user_id": creator["user_id"]})
+        response.raise_for_status()
+        emails = response.json()["emails"]
+        if emails:
+            fixtures["inbox_user_ids"].append(creator["user_id"])
+            fixtures["email_ids"].extend(e["email_id"] for e in emails)
+    if not fixtures["inbox_user_ids"]:
+        fixtures["inbox_user_ids"] = fixtures["user_ids"]
+    return fixtures
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.error_samples: Dict[str, str] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def record(self, name: str, latency_ms: float, ok: bool, size: int, error: Optional[str] = None):
+        self.latencies.setdefault(name, []).append(latency_ms)
+        self.bytes[name] = self.bytes.get(name, 0) + size
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            self.error_samples.setdefault(name, error)
+
+    @staticmethod
+    def _summary(latencies: List[float], errors: int, size: int, elapsed: float) -> Dict[str, Any]:
+        values = sorted(latencies)
+        count = len(values)
+        return {
+            "requests": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "bytes": size,
+            "mean_ms": round(sum(values) / count, 2) if count else 0.0,
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2) if values else 0.0,
+        }
+
+    def summarize(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {
+            name: self._summary(values, self.errors.get(name, 0), self.bytes.get(name, 0), elapsed)
+            for name, values in sorted(self.latencies.items())
+        }
+        for name, sample in self.error_samples.items():
+            endpoints[name]["error_sample"] = sample
+        overall = self._summary(
+            [v for values in self.latencies.values() for v in values],
+            sum(self.errors.values()), sum(self.bytes.values()), elapsed
+        )
+        return {"endpoints": endpoints, "overall": overall}
+
+
+async def send(client: httpx.AsyncClient, scenario, fixtures, rng: random.Random, recorder: Optional[Recorder]):
+    name, _, method, path, build = scenario
+    request = build(fixtures, rng)
+    url = path.format(**request.get("path", {}))
+    started = time.perf_counter()
+    size = 0
+    error = None
+    try:
+        # Streamed so export latency covers the whole body, not just the headers
+        async with client.stream(method, url, params=request.get("params"), json=request.get("json")) as response:
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+            ok = response.status_code < 400
+            if not ok:
+                error = f"HTTP {response.status_code}"
+    except httpx.HTTPError as e:
+        ok = False
+        error = f"{type(e).__name__}: {e}"
+    if recorder is not None:
+        recorder.record(name, (time.perf_counter() - started) * 1000, ok, size, error)
+
+
+async def worker(client, scenarios, cum_weights, fixtures, rng, deadline, recorder):
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(scenarios, cum_weights=cum_weights)[0]
+        await send(client, scenario, fixtures, rng, recorder)
+
+
+async def run_phase(client, scenarios, fixtures, concurrency: int, seconds: float, seed: int, recorder):
+    cum_weights = []
+    total = 0
+    for scenario in scenarios:
+        total += scenario[1]
+        cum_weights.append(total)
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(
+        worker(client, scenarios, cum_weights, fixtures, random.Random(seed * 1000 + i), deadline, recorder)
+        for i in range(concurrency)
+    ))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    scenarios = select_scenarios(args.only)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"🔍 Discovering fixtures from {args.base_url}...")
+        fixtures = await discover_fixtures(client)
+        print(f"   ✓ {len(fixtures['creator_ids'])} creators, {len(fixtures['email_ids'])} emails")
+        if not fixtures["email_ids"]:
+            print("⚠️  No emails found, skipping inbox_detail")
+            scenarios = [s for s in scenarios if s[0] != "inbox_detail"]
+        if not scenarios:
+            raise ValueError("No scenarios left to run")
+
+        if args.warmup > 0:
+            print(f"🔥 Warming up for {args.warmup:g}s...")
+            await run_phase(client, scenarios, fixtures, args.concurrency, args.warmup, args.seed + 1, None)
+
+        print(f"🚀 Running {len(scenarios)} scenarios with {args.concurrency} workers for {args.duration:g}s...")
+        recorder = Recorder()
+        started = time.perf_counter()
+        await run_phase(client, scenarios, fixtures, args.concurrency, args.duration, args.seed, recorder)
+        elapsed = time.perf_counter() - started
+
+    results = recorder.summarize(elapsed)
+    results["meta"] = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "warmup_s": args.warmup,
+        "seed": args.seed,
+        "git_revision": git_revision(),
+        "python": host_platform.python_version(),
+        "host": host_platform.node(),
+    }
+    return results
+
+
+def print_report(results: Dict[str, Any]):
+    header = f"{'endpoint':<24}{'reqs':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print("\n" + header)
+    print("-" * len(header))
+    rows = list(results["endpoints"].items()) + [("overall", results["overall"])]
+    for name, s in rows:
+        if name == "overall":
+            print("-" * len(header))
+        print(f"{name:<24}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>9.1f}"
+              f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    for name, s in results["endpoints"].items():
+        if s.get("error_sample"):
+            print(f"❌ {name}: {s['errors']} errors, e.g. {s['error_sample']}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float, min_delta_ms: float) -> List[str]:
+    """
+    Regressions vs the baseline run: p95/p99 slower, or throughput lower, by
+    more than max_regression percent. Latency changes under min_delta_ms, and
+    percentiles with fewer than MIN_SAMPLES requests behind them, are
+    treated as noise.
+    """
+    regressions = []
+    limit = 1 + max_regression / 100
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous["requests"]:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if min(previous["requests"], current["requests"]) < MIN_SAMPLES[metric]:
+                continue
+            before, after = previous[metric], current[metric]
+            if after > before * limit and after - before >= min_delta_ms:
+                regressions.append(f"{name} {metric}: {before:.1f} → {after:.1f} (+{(after / before - 1) * 100:.0f}%)")
+        before, after = previous["throughput_rps"], current["throughput_rps"]
+        if after * limit < before:
+            regressions.append(f"{name} throughput_rps: {before:.1f} → {after:.1f} (-{(1 - after / before) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    if args.list:
+        for name, weight, method, path, _ in SCENARIOS:
+            print(f"{name:<24}{weight:>4}  {method} {path}")
+        return 0
+
+    try:
+        results = asyncio.run(run_benchmark(args))
+    except (httpx.HTTPError, RuntimeError, ValueError) as e:
+        print(f"❌ Benchmark failed: {e}")
+        return 2
+
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Results written to {path}")
+
+    failed = False
+    for name, s in results["endpoints"].items():
+        if s["error_rate"] > args.max_error_rate:
+            print(f"❌ {name}: error rate {s['error_rate']:.1%} exceeds {args.max_error_rate:.1%}")
+            failed = True
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions vs {args.baseline} "
+                  f"(rev {baseline.get('meta', {}).get('git_revision')}):")
+            for line in regressions:
+                print(f"   • {line}")
+            failed = True
+        else:
+            print(f"\n✅ No regressions vs {args.baseline} (threshold {args.max_regression:g}%)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
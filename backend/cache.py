@@ -0,0 +1,278 @@
+import functools
+import logging
+import os
+import pickle
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Channel the posts_master triggers (10_cache_invalidation.sql) notify on
+POSTS_CHANGED_CHANNEL = "posts_master_changed"
+
+_MISSING = object()
+
+# Invalidations of each creator with a cached call computing, and how many such
+# calls there are. A call that sees its creator's count move (or the whole cache
+# cleared) while it computes doesn't store its result, which may predate the
+# change. Creators drop out once their last call finishes, so this stays small.
+_generations: Dict[str, int] = {}
+_computing: Dict[str, int] = {}
+_clears = 0
+
+
+def _creator_key(creator_id: Any) -> str:
+    """
+    Canonical creator id for keys: the trigger notifies lowercase uuid text,
+    while callers may pass uppercase or a UUID object.
+    """
+    try:
+        return str(uuid.UUID(str(creator_id)))
+    except ValueError:
+        return str(creator_id)
+
+
+class CacheBackend:
+    """
+    Async cache interface. Values are stored pickled so callers can mutate
+    what they get back without touching the cached copy.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, creator_id: str, ttl: int):
+        raise NotImplementedError
+
+    async def invalidate_creator(self, creator_id: str):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU with TTL, bounded by entry count and pickled size.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float, str]]" = OrderedDict()
+        self._creator_keys: Dict[str, Set[str]] = {}
+        self._bytes = 0
+
+    def _remove(self, key: str):
+        payload, _, creator_id = self._entries.pop(key)
+        self._bytes -= len(payload)
+        keys = self._creator_keys.get(creator_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._creator_keys[creator_id]
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pickle.loads(entry[0])
+
+    async def set(self, key: str, value: Any, creator_id: str, ttl: int):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (payload, time.monotonic() + ttl, creator_id)
+        self._creator_keys.setdefault(creator_id, set()).add(key)
+        self._bytes += len(payload)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate_creator(self, creator_id: str):
+        for key in list(self._creator_keys.get(creator_id, ())):
+            self._remove(key)
+        self.invalidations += 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._creator_keys.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared cache for multi-worker deployments. LRU eviction and the memory cap
+    come from the Redis server (maxmemory + maxmemory-policy allkeys-lru).
+    Hit/miss counters are per worker.
+    """
+
+    def __init__(self, url: str, prefix: str = "analytics"):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    def _creator_index(self, creator_id: str) -> str:
+        return f"{self._prefix}:creator:{creator_id}"
+
+    async def get(self, key: str) -> Any:
+        payload = await self._redis.get(f"{self._prefix}:{key}")
+        if payload is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return pickle.loads(payload)
+
+    async def set(self, key: str, value: Any, creator_id: str, ttl: int):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        index = self._creator_index(creator_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"{self._prefix}:{key}", payload, ex=ttl)
+            pipe.sadd(index, key)
+            pipe.expire(index, ttl)
+            await pipe.execute()
+
+    async def invalidate_creator(self, creator_id: str):
+        index = self._creator_index(creator_id)
+        keys = await self._redis.smembers(index)
+        if keys:
+            await self._redis.delete(*[f"{self._prefix}:{k.decode()}" for k in keys])
+        await self._redis.delete(index)
+        self.invalidations += 1
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=f"{self._prefix}:*"):
+            await self._redis.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "redis"}
+
+
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    if backend == "none":
+        return None
+    if backend == "redis":
+        return RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryCacheBackend(
+        max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+        max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    )
+
+
+analytics_cache = create_cache_backend()
+
+
+def cached(namespace: str, ttl: Optional[int] = None):
+    """
+    Caches an async service method whose first argument is the creator_id.
+    The key covers every argument; entries are dropped when the creator's
+    posts change (see listener.py / 10_cache_invalidation.sql) or the TTL expires.
+    A result whose creator was invalidated while it was computing isn't stored.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(creator_id: str, *args, **kwargs):
+            if analytics_cache is None:
+                return await func(creator_id, *args, **kwargs)
+
+            creator_key = _creator_key(creator_id)
+            key = f"{namespace}:{creator_key}:{args!r}:{sorted(kwargs.items())!r}"
+            try:
+                value = await analytics_cache.get(key)
+            except Exception as e:
+                logger.error(f"Cache get failed: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                return value
+
+            generation = (_clears, _generations.get(creator_key, 0))
+            _computing[creator_key] = _computing.get(creator_key, 0) + 1
+            try:
+                value = await func(creator_id, *args, **kwargs)
+            finally:
+                stale = (_clears, _generations.get(creator_key, 0)) != generation
+                _computing[creator_key] -= 1
+                if not _computing[creator_key]:
+                    del _computing[creator_key]
+                    _generations.pop(creator_key, None)
+
+            if stale:
+                return value
+            try:
+                await analytics_cache.set(key, value, creator_key, ttl or CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.error(f"Cache set failed: {e}")
+            return value
+        return wrapper
+    return decorator
+
+
+async def invalidate_creator(creator_id: str):
+    if analytics_cache is not None:
+        creator_key = _creator_key(creator_id)
+        if creator_key in _computing:
+            _generations[creator_key] = _generations.get(creator_key, 0) + 1
+        await analytics_cache.invalidate_creator(creator_key)
+
+
+async def clear_cache():
+    global _clears
+    if analytics_cache is not None:
+        _clears += 1
+        await analytics_cache.clear()
+
+
+def cache_stats() -> Dict[str, Any]:
+    if analytics_cache is None:
+        return {"backend": "none"}
+    return analytics_cache.stats()
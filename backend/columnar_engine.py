@@ -0,0 +1,754 @@
+"""
+Optional in-process analytics engine (ANALYTICS_ENGINE=columnar).
+
+Each API worker holds posts_master as NumPy arrays: one compact array per
+column, with platform and content_type dictionary-encoded and the rows sorted
+by (creator, post time), so one creator's posts are a contiguous slice found
+through the sorted creator keys and their offsets. The dashboard bundle,
+overview, platform breakdown, monetization and trend series are answered by
+vectorized group-bys over that slice, producing the same rows the SQL queries
+return so the services shape both alike.
+
+The arrays come from one of two places:
+- loaded from posts_master by every worker at startup, or
+- with COLUMNAR_SNAPSHOT_PATH, memory-mapped read-only from a snapshot file
+  that `python jobs.py snapshot` builds and atomically replaces. Every worker
+  maps the same pages, so the data is in memory once per host, and a worker
+  is ready as soon as the file is mapped.
+
+Changes arrive as posts_master_changed notifications (listener.py): the
+creator is served from SQL until the next refresh reloads just their rows
+(into the arrays, or for a mapped file into a small per-worker overlay).
+After a listener reconnect, when notifications may have been missed, the
+engine stops answering until it has caught up.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+from cache import POSTS_CHANGED_CHANNEL
+from database import get_connection_params
+from services.rollup_service import ROLLUP_SAFETY_LAG_SECONDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sql").lower()
+COLUMNAR_REFRESH_SECONDS = float(os.getenv("COLUMNAR_REFRESH_SECONDS", "5"))
+COLUMNAR_FETCH_SIZE = int(os.getenv("COLUMNAR_FETCH_SIZE", "50000"))
+# Snapshot file shared by the workers on a host; empty loads from the database
+COLUMNAR_SNAPSHOT_PATH = os.getenv("COLUMNAR_SNAPSHOT_PATH", "")
+
+# GROUPING(platform, content_type, post_hour, post_day) values of the bundle
+# rows; mirrors the constants in services/analytics_service.py
+GROUPING_TOTAL = 0b1111
+GROUPING_PLATFORM = 0b0111
+GROUPING_CONTENT_TYPE = 0b1011
+GROUPING_HOUR = 0b1101
+GROUPING_DAY = 0b1110
+
+ENCODED_COLUMNS = ('creator_id', 'platform', 'content_type')
+# Stored as int8; NULL (the posts_master triggers always fill them) becomes -1
+SMALL_COLUMNS = ('post_hour', 'post_day')
+COUNT_COLUMNS = ('views', 'likes', 'comments', 'shares')
+COLUMN_NAMES = ENCODED_COLUMNS + SMALL_COLUMNS + COUNT_COLUMNS + ('post_micros',)
+# Per-row arrays of a snapshot; creator_id is replaced by creator keys and offsets
+ROW_COLUMNS = COLUMN_NAMES[1:]
+NULL_SMALL = -1
+CREATOR_KEY_DTYPE = 'S36'  # UUID text
+
+# Snapshot file: magic, header length (little-endian uint64), JSON header, then
+# each array at a SNAPSHOT_ALIGN-aligned offset from the end of the header
+SNAPSHOT_MAGIC = b"ANSNAP01"
+SNAPSHOT_ALIGN = 64
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+POSTS_COLUMNS_SELECT = """
+    SELECT
+        creator_id::text, platform, content_type, post_hour, post_day,
+        views, likes, comments, shares,
+        (EXTRACT(EPOCH FROM post_datetime) * 1000000)::bigint as post_micros
+    FROM posts_master
+"""
+ALL_POSTS_QUERY = POSTS_COLUMNS_SELECT
+CREATOR_POSTS_QUERY = POSTS_COLUMNS_SELECT + "    WHERE creator_id = ANY(%s::uuid[])\n"
+
+# Creators whose posts may have changed after a snapshot was read. The caller
+# backs `since` off by ROLLUP_SAFETY_LAG_SECONDS for transactions that stamped
+# updated_at before the snapshot but committed after it.
+CHANGED_SINCE_QUERY = """
+    SELECT creator_id::text FROM posts_master WHERE updated_at > %(since)s
+    UNION
+    SELECT creator_id::text FROM posts_master_changes WHERE changed_at > %(since)s
+"""
+
+
+def to_micros(moment: datetime) -> int:
+    """Exact microseconds since the epoch, comparable with the post_micros column."""
+    return (moment - EPOCH) // MICROSECOND
+
+
+Columns = Dict[str, "np.ndarray"]
+Dictionaries = Dict[str, List[str]]
+
+
+def _encode(rows: List[Tuple]) -> Tuple[Columns, Dictionaries]:
+    """One fetched batch as arrays, each encoded column with its own dictionary."""
+    values = dict(zip(COLUMN_NAMES, zip(*rows))) if rows else {name: () for name in COLUMN_NAMES}
+    columns, dictionaries = {}, {}
+    for name in ENCODED_COLUMNS:
+        dictionary, codes = np.unique(np.array(values[name], dtype=object), return_inverse=True)
+        dictionaries[name] = dictionary.tolist()
+        columns[name] = codes.astype(np.int32)
+    for name in SMALL_COLUMNS:
+        columns[name] = np.array([NULL_SMALL if v is None else v for v in values[name]], dtype=np.int8)
+    for name in COUNT_COLUMNS + ('post_micros',):
+        columns[name] = np.array(values[name], dtype=np.int64)
+    return columns, dictionaries
+
+
+def _concat(parts: Iterable[Tuple[Columns, Dictionaries]]) -> Tuple[Columns, Dictionaries]:
+    """Concatenates encoded parts, re-coding them against one merged dictionary per column."""
+    parts = list(parts)
+    dictionaries = {
+        name: sorted(set().union(*(part_dictionaries[name] for _, part_dictionaries in parts)))
+        for name in ENCODED_COLUMNS
+    }
+    indexes = {name: {value: code for code, value in enumerate(dictionary)} for name, dictionary in dictionaries.items()}
+    columns = {}
+    for name in COLUMN_NAMES:
+        arrays = []
+        for part_columns, part_dictionaries in parts:
+            array = part_columns[name]
+            if name in indexes:
+                recode = np.array([indexes[name][value] for value in part_dictionaries[name]], dtype=np.int32)
+                array = recode[array] if array.size else array.astype(np.int32)
+            arrays.append(array)
+        columns[name] = np.concatenate(arrays)
+    return columns, dictionaries
+
+
+def _numeric_avg(total: int, count: int) -> Decimal:
+    """
+    AVG() of a bigint column as Postgres returns it: numeric division rounded
+    to at least 16 significant digits (select_div_scale in numeric.c).
+    """
+    def leading(value: int) -> Tuple[int, int]:
+        # (weight, first digit) of the value in base-10000 digits, as Postgres stores numerics
+        value = abs(value)
+        if value == 0:
+            return 0, 0
+        weight = (len(str(value)) - 1) // 4
+        return weight, value // 10000 ** weight
+
+    weight1, first1 = leading(total)
+    weight2, first2 = leading(count)
+    quotient_weight = weight1 - weight2 - (1 if first1 <= first2 else 0)
+    scale = max(16 - quotient_weight * 4, 0)
+    return (Decimal(total) / Decimal(count)).quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP)
+
+
+def _compact_codes(codes: "np.ndarray", size: int) -> "np.ndarray":
+    return codes.astype(np.uint8 if size <= 1 << 8 else np.uint16 if size <= 1 << 16 else np.int32)
+
+
+def _compact_counts(values: "np.ndarray") -> "np.ndarray":
+    limits = np.iinfo(np.int32)
+    if values.size == 0 or (values.min() >= limits.min and values.max() <= limits.max):
+        return values.astype(np.int32)
+    return values
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+
+class ColumnarSnapshot:
+    """
+    Immutable column arrays for every loaded post, sorted by (creator, post
+    time), plus per-creator totals. Refreshes build a new snapshot and swap
+    the reference, so a reader keeps a consistent view for as long as it
+    holds one. The arrays live in memory or are mapped from a snapshot file.
+    """
+
+    def __init__(self, columns: Columns, creator_keys: "np.ndarray", creator_offsets: "np.ndarray",
+                 totals: Columns, dictionaries: Dictionaries, as_of: Optional[datetime] = None):
+        self.columns = columns
+        # Sorted creator ids; creator i's rows are [creator_offsets[i], creator_offsets[i + 1])
+        self.creator_keys = creator_keys
+        self.creator_offsets = creator_offsets
+        self.totals = totals
+        self.dictionaries = dictionaries
+        self.codes = {name: {value: code for code, value in enumerate(values)} for name, values in dictionaries.items()}
+        # When the rows were read; later changes are not in the snapshot
+        self.as_of = as_of
+
+    @classmethod
+    def from_encoded(cls, columns: Columns, dictionaries: Dictionaries,
+                     as_of: Optional[datetime] = None) -> "ColumnarSnapshot":
+        # Drop dictionary values no row uses any more (e.g. a reloaded creator's old platform)
+        for name in ENCODED_COLUMNS:
+            used, codes = np.unique(columns[name], return_inverse=True)
+            dictionaries[name] = [dictionaries[name][code] for code in used]
+            columns[name] = codes
+
+        order = np.lexsort((columns['post_micros'], columns['creator_id']))
+        rows = {}
+        for name in ROW_COLUMNS:
+            array = columns[name][order]
+            if name in ENCODED_COLUMNS:
+                array = _compact_codes(array, len(dictionaries[name]))
+            elif name in COUNT_COLUMNS:
+                array = _compact_counts(array)
+            rows[name] = array
+
+        creator_keys = np.array([c.encode() for c in dictionaries.pop('creator_id')], dtype=CREATOR_KEY_DTYPE)
+        counts = np.bincount(columns['creator_id'], minlength=creator_keys.size)
+        creator_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(rows, creator_keys, creator_offsets, cls._creator_totals(rows, creator_offsets), dictionaries, as_of)
+
+    @classmethod
+    def from_parts(cls, parts: Iterable[Tuple[Columns, Dictionaries]],
+                   as_of: Optional[datetime] = None) -> "ColumnarSnapshot":
+        return cls.from_encoded(*_concat(parts), as_of)
+
+    @staticmethod
+    def _creator_totals(rows: Columns, creator_offsets: "np.ndarray") -> Columns:
+        """All-time sums per creator, in creator key order."""
+        starts = creator_offsets[:-1]
+        if starts.size == 0:
+            totals = {name: np.zeros(0, dtype=np.int64) for name in COUNT_COLUMNS + ('rated_posts',)}
+            totals['engagement_sum'] = np.zeros(0)
+            return totals
+        views = rows['views'].astype(np.int64)
+        engagement = rows['likes'].astype(np.int64) + rows['comments'] + rows['shares']
+        rated = views > 0
+        ratios = np.zeros(views.size)
+        ratios[rated] = engagement[rated] / views[rated]
+        # Every creator in the keys has at least one row, so no segment is empty
+        totals = {name: np.add.reduceat(rows[name].astype(np.int64), starts) for name in COUNT_COLUMNS}
+        totals['rated_posts'] = np.add.reduceat(rated.astype(np.int64), starts)
+        totals['engagement_sum'] = np.add.reduceat(ratios, starts)
+        return totals
+
+    def replace_creators(self, creator_ids: Iterable[str], rows: List[Tuple]) -> "ColumnarSnapshot":
+        """A new in-memory snapshot with the given creators' posts replaced by `rows`."""
+        creator_codes = np.repeat(np.arange(self.creator_keys.size), np.diff(self.creator_offsets))
+        replaced = [index for index in map(self._creator_index, creator_ids) if index is not None]
+        keep = ~np.isin(creator_codes, replaced)
+        kept = {name: array[keep] for name, array in self.columns.items()}
+        kept['creator_id'] = creator_codes[keep]
+        dictionaries = {'creator_id': [key.decode() for key in self.creator_keys.tolist()], **self.dictionaries}
+        return ColumnarSnapshot.from_parts([(kept, dictionaries), _encode(rows)], self.as_of)
+
+    @property
+    def row_count(self) -> int:
+        return int(self.creator_offsets[-1])
+
+    @property
+    def creator_count(self) -> int:
+        return int(self.creator_keys.size)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = list(self.columns.values()) + list(self.totals.values()) + [self.creator_keys, self.creator_offsets]
+        return sum(array.nbytes for array in arrays)
+
+    def write(self, path: str):
+        """
+        Writes the snapshot to `path` atomically: a temporary file in the same
+        directory, fsynced, then renamed over the old one. Workers that mapped
+        the old file keep reading it until they switch.
+        """
+        arrays = {f"column.{name}": array for name, array in self.columns.items()}
+        arrays.update({f"total.{name}": array for name, array in self.totals.items()})
+        arrays["creator_keys"] = self.creator_keys
+        arrays["creator_offsets"] = self.creator_offsets
+
+        layout, size = {}, 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": size}
+            size = _aligned(size + array.nbytes)
+        header = json.dumps({
+            "as_of": self.as_of.isoformat() if self.as_of else None,
+            "dictionaries": self.dictionaries,
+            "arrays": layout
+        }).encode()
+        data_start = _aligned(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+        temp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header)
+                for name, array in arrays.items():
+                    f.seek(data_start + layout[name]["offset"])
+                    f.write(np.ascontiguousarray(array).tobytes())
+                f.truncate(data_start + size)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def open(cls, path: str) -> "ColumnarSnapshot":
+        """Maps a snapshot file read-only; no array is copied into the process."""
+        with open(path, "rb") as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not an analytics snapshot")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length))
+        data_start = _aligned(len(SNAPSHOT_MAGIC) + 8 + header_length)
+
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            stop = start + int(np.prod(spec["shape"])) * dtype.itemsize
+            arrays[name] = mapped[start:stop].view(dtype).reshape(spec["shape"])
+
+        return cls(
+            {name: arrays[f"column.{name}"] for name in ROW_COLUMNS},
+            arrays["creator_keys"],
+            arrays["creator_offsets"],
+            {name[len("total."):]: array for name, array in arrays.items() if name.startswith("total.")},
+            header["dictionaries"],
+            datetime.fromisoformat(header["as_of"]) if header["as_of"] else None
+        )
+
+    def _creator_index(self, creator_id: str) -> Optional[int]:
+        key = creator_id.lower().encode()
+        index = int(np.searchsorted(self.creator_keys, key))
+        if index < self.creator_keys.size and self.creator_keys[index] == key:
+            return index
+        return None
+
+    def _select(self, creator_id: str, platform: Optional[str] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Optional[Columns]:
+        """The creator's posts, optionally for one platform and a post_datetime range, or None if none match."""
+        index = self._creator_index(creator_id)
+        if index is None:
+            return None
+        start, stop = int(self.creator_offsets[index]), int(self.creator_offsets[index + 1])
+        # Post times are sorted within a creator, so a window is a sub-slice
+        micros = self.columns['post_micros'][start:stop]
+        if until is not None:
+            stop = start + int(np.searchsorted(micros, to_micros(until), side='left'))
+        if since is not None:
+            start += int(np.searchsorted(micros, to_micros(since), side='left'))
+        if start >= stop:
+            return None
+        selected = {name: array[start:stop] for name, array in self.columns.items()}
+        if platform is not None:
+            code = self.codes['platform'].get(platform)
+            if code is None:
+                return None
+            mask = selected['platform'] == code
+            if not mask.any():
+                return None
+            selected = {name: array[mask] for name, array in selected.items()}
+        return selected
+
+    @staticmethod
+    def _group(rows: Columns, groups: "np.ndarray", size: int) -> Dict[str, "np.ndarray"]:
+        """SUM/AVG/COUNT of the bundle query per group code in [0, size)."""
+        views = rows['views'].astype(np.int64)
+        engagement = rows['likes'].astype(np.int64) + rows['comments'] + rows['shares']
+        rated = views > 0
+        # Float weights are exact for sums below 2**53
+        sums = {
+            name: np.bincount(groups, weights=rows[name], minlength=size).astype(np.int64)
+            for name in COUNT_COLUMNS
+        }
+        sums['post_count'] = np.bincount(groups, minlength=size)
+        # AVG((likes + comments + shares)::float / NULLIF(views, 0)) skips posts without views
+        sums['engagement_sum'] = np.bincount(groups[rated], weights=engagement[rated] / views[rated], minlength=size)
+        sums['rated_posts'] = np.bincount(groups[rated], minlength=size)
+        return sums
+
+    @staticmethod
+    def _bundle_row(grouping_id: int, sums: Dict[str, Any], index: int, **labels) -> Dict[str, Any]:
+        post_count = int(sums['post_count'][index])
+        rated_posts = int(sums['rated_posts'][index])
+        views = int(sums['views'][index])
+        return {
+            "grouping_id": grouping_id,
+            "platform": labels.get('platform'),
+            "content_type": labels.get('content_type'),
+            "post_hour": labels.get('post_hour'),
+            "post_day": labels.get('post_day'),
+            "views": views,
+            "likes": int(sums['likes'][index]),
+            "comments": int(sums['comments'][index]),
+            "shares": int(sums['shares'][index]),
+            "avg_engagement": float(sums['engagement_sum'][index]) / rated_posts if rated_posts else None,
+            "avg_reach": _numeric_avg(views, post_count) if post_count else None,
+            "post_count": post_count
+        }
+
+    def bundle_rows(self, creator_id: str, platform: Optional[str] = None,
+                    since: Optional[datetime] = None, totals_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        The rows of the dashboard bundle query (analytics_service.BUNDLE_QUERIES),
+        or with `totals_only` just its totals row, which over all of a creator's
+        posts comes straight from the per-creator totals.
+        """
+        if totals_only and platform is None and since is None:
+            index = self._creator_index(creator_id)
+            if index is not None:
+                totals = {name: array[index:index + 1] for name, array in self.totals.items()}
+                totals['post_count'] = np.diff(self.creator_offsets[index:index + 2])
+                return [self._bundle_row(GROUPING_TOTAL, totals, 0)]
+
+        rows = self._select(creator_id, platform, since)
+        if rows is None:
+            empty = {name: [0] for name in COUNT_COLUMNS + ('post_count', 'rated_posts', 'engagement_sum')}
+            return [self._bundle_row(GROUPING_TOTAL, empty, 0)]
+
+        total = self._group(rows, np.zeros(rows['views'].size, dtype=np.intp), 1)
+        result = [self._bundle_row(GROUPING_TOTAL, total, 0)]
+        if totals_only:
+            return result
+        for name, grouping_id in (('platform', GROUPING_PLATFORM), ('content_type', GROUPING_CONTENT_TYPE)):
+            dictionary = self.dictionaries[name]
+            sums = self._group(rows, rows[name].astype(np.intp), len(dictionary))
+            for code in np.flatnonzero(sums['post_count']):
+                result.append(self._bundle_row(grouping_id, sums, code, **{name: dictionary[code]}))
+        for name, grouping_id, size in (('post_hour', GROUPING_HOUR, 24), ('post_day', GROUPING_DAY, 7)):
+            # Shifted by one so NULL_SMALL lands in group 0
+            sums = self._group(rows, rows[name].astype(np.intp) + 1, size + 1)
+            for code in np.flatnonzero(sums['post_count']):
+                result.append(self._bundle_row(grouping_id, sums, code, **{name: int(code) - 1 if code else None}))
+        return result
+
+    def total_views(self, creator_id: str) -> Decimal:
+        """SUM(views); a Decimal like the numeric Postgres returns."""
+        index = self._creator_index(creator_id)
+        return Decimal(int(self.totals['views'][index])) if index is not None else Decimal(0)
+
+    def trend_rows(self, creator_id: str, first_day: date, today: date, window_days: int) -> List[Dict[str, Any]]:
+        """The rows of trends_service.TREND_SERIES_QUERY: one per UTC day from first_day to today."""
+        day_count = (today - first_day).days + 1
+        periods = -(-day_count // window_days)
+        days = [first_day + timedelta(days=offset) for offset in range(day_count)]
+        # Period of each day index, counted back from today
+        day_periods = (day_count - 1 - np.arange(day_count)) // window_days
+
+        since = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc)
+        rows = self._select(creator_id, since=since, until=since + timedelta(days=day_count))
+        dictionary = self.dictionaries['content_type']
+        if rows is None:
+            views = engagement = post_count = np.zeros(day_count, dtype=np.int64)
+            top_types = [None] * periods
+        else:
+            day_index = (rows['post_micros'] - to_micros(since)) // (86400 * 1000000)
+            engagement_per_post = rows['likes'].astype(np.int64) + rows['comments'] + rows['shares']
+            # Float weights are exact for sums below 2**53
+            views = np.bincount(day_index, weights=rows['views'], minlength=day_count).astype(np.int64)
+            engagement = np.bincount(day_index, weights=engagement_per_post, minlength=day_count).astype(np.int64)
+            post_count = np.bincount(day_index, minlength=day_count)
+            type_counts = np.bincount(
+                day_periods[day_index] * len(dictionary) + rows['content_type'],
+                minlength=periods * len(dictionary)
+            ).reshape(periods, len(dictionary))
+            # Ties go to the first content type in sort order; the dictionary is sorted
+            top_types = [
+                dictionary[int(np.argmax(counts))] if counts.any() else None
+                for counts in type_counts
+            ]
+
+        return [
+            {
+                "is_fresh": True,
+                "day": days[index],
+                "period": int(day_periods[index]),
+                "views": int(views[index]),
+                "engagement": int(engagement[index]),
+                "post_count": int(post_count[index]),
+                "top_content_type": top_types[day_periods[index]]
+            }
+            for index in range(day_count)
+        ]
+
+
+def build_snapshot_file(path: str) -> Dict[str, Any]:
+    """Reads posts_master and publishes it as a snapshot file at `path` (jobs.py snapshot)."""
+    if np is None:
+        raise RuntimeError("Building an analytics snapshot requires the 'numpy' package")
+    started = time.monotonic()
+    parts = []
+    with psycopg.connect(make_conninfo(**get_connection_params())) as conn:
+        with conn.transaction():
+            (as_of,) = conn.execute("SELECT NOW()").fetchone()
+            cursor = conn.cursor(name="columnar_snapshot_build")
+            cursor.execute(ALL_POSTS_QUERY)
+            while True:
+                rows = cursor.fetchmany(COLUMNAR_FETCH_SIZE)
+                if not rows:
+                    break
+                parts.append(_encode(rows))
+    snapshot = ColumnarSnapshot.from_parts(parts or [_encode([])], as_of)
+    snapshot.write(path)
+    return {
+        "rows": snapshot.row_count,
+        "creators": snapshot.creator_count,
+        "bytes": os.path.getsize(path),
+        "as_of": as_of.isoformat(),
+        "seconds": round(time.monotonic() - started, 2)
+    }
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int, int]]:
+    """Changes whenever a new snapshot is renamed into place."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ColumnarEngine:
+    """
+    Keeps this worker's ColumnarSnapshot current. Without a snapshot file:
+    a full load on start and after a listener reconnect, then every
+    COLUMNAR_REFRESH_SECONDS a reload of only the creators notified as
+    changed. With one: the published file is mapped whenever it is
+    replaced, and changed creators are reloaded into an overlay on top.
+    """
+
+    def __init__(self, snapshot_path: str = COLUMNAR_SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self.snapshot: Optional[ColumnarSnapshot] = None
+        # Creators reloaded since the mapped file was built, served from the overlay
+        self._overlay: Optional[ColumnarSnapshot] = None
+        self._overlay_creators: Set[str] = set()
+        self._mapped_identity = None
+        # creator_id -> sequence number of its latest change notification
+        self._dirty: Dict[str, int] = {}
+        self._sequence = 0
+        # Bumped when notifications may have been missed; a full load or remap clears it
+        self._reload_generation = 1
+        self._loaded_generation = 0
+        self._missing_file_logged = False
+        self._task = None
+        self._stats = {
+            "full_loads": 0,
+            "snapshots_mapped": 0,
+            "refreshes": 0,
+            "creators_reloaded": 0,
+            "refresh_errors": 0,
+            "last_refresh_ms": None,
+            "last_refresh_at": None
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return ANALYTICS_ENGINE == "columnar"
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None and self._loaded_generation == self._reload_generation
+
+    def snapshot_for(self, creator_id: str) -> Optional[ColumnarSnapshot]:
+        """The snapshot that is current for the creator, or None (use SQL)."""
+        creator_id = creator_id.lower()
+        if not self.ready or creator_id in self._dirty:
+            return None
+        if creator_id in self._overlay_creators:
+            return self._overlay
+        return self.snapshot
+
+    def attach(self, listener):
+        """Subscribes to posts_master changes; call before listener.start()."""
+        listener.subscribe(POSTS_CHANGED_CHANNEL, self.mark_changed)
+        listener.on_reconnect(self.mark_all_changed)
+
+    async def mark_changed(self, creator_id: str):
+        self._sequence += 1
+        self._dirty[creator_id.lower()] = self._sequence
+
+    async def mark_all_changed(self):
+        self._reload_generation += 1
+
+    async def start(self):
+        if np is None:
+            raise RuntimeError("ANALYTICS_ENGINE=columnar requires the 'numpy' package")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "source": self.snapshot_path or "database",
+            "as_of": snapshot.as_of.isoformat() if snapshot and snapshot.as_of else None,
+            "rows": snapshot.row_count if snapshot else 0,
+            "creators": snapshot.creator_count if snapshot else 0,
+            "memory_bytes": snapshot.nbytes if snapshot else 0,
+            "overlay_creators": len(self._overlay_creators),
+            "changed_creators": len(self._dirty),
+            **self._stats
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                logger.error(f"Columnar engine refresh failed: {e}")
+            await asyncio.sleep(COLUMNAR_REFRESH_SECONDS)
+
+    async def refresh(self):
+        started = time.monotonic()
+        if self.snapshot_path:
+            refreshed = await self._refresh_mapped()
+        else:
+            refreshed = await self._refresh_loaded()
+        if refreshed:
+            self._stats["refreshes"] += 1
+            self._stats["last_refresh_ms"] = round((time.monotonic() - started) * 1000, 1)
+            self._stats["last_refresh_at"] = datetime.now(timezone.utc).isoformat()
+
+    @staticmethod
+    async def _connect():
+        # A dedicated connection: refreshes never wait on or hold the API pool
+        return await psycopg.AsyncConnection.connect(make_conninfo(**get_connection_params()))
+
+    @staticmethod
+    async def _fetch_creators(conn, creator_ids: Iterable[str]) -> List[Tuple]:
+        cursor = conn.cursor()
+        await cursor.execute(CREATOR_POSTS_QUERY, (list(creator_ids),))
+        return await cursor.fetchall()
+
+    def _clear_dirty(self, pending: Dict[str, int]):
+        for creator_id, sequence in pending.items():
+            # Keep creators notified again while we were reading
+            if self._dirty.get(creator_id) == sequence:
+                del self._dirty[creator_id]
+
+    async def _refresh_loaded(self) -> bool:
+        generation = self._reload_generation
+        # Captured before reading, so any change notified so far is in what we read
+        pending = dict(self._dirty)
+        full = self.snapshot is None or self._loaded_generation != generation
+        if not full and not pending:
+            return False
+
+        started = time.monotonic()
+        async with await self._connect() as conn:
+            if full:
+                snapshot = await self._load_all(conn)
+            else:
+                rows = await self._fetch_creators(conn, pending)
+                snapshot = await asyncio.to_thread(self.snapshot.replace_creators, pending, rows)
+
+        self.snapshot = snapshot
+        self._clear_dirty(pending)
+        if full:
+            self._loaded_generation = generation
+            self._stats["full_loads"] += 1
+            logger.info(f"Columnar engine loaded {snapshot.row_count} posts "
+                        f"({snapshot.nbytes / 1024 / 1024:.1f} MiB) in {time.monotonic() - started:.2f}s")
+        else:
+            self._stats["creators_reloaded"] += len(pending)
+        return True
+
+    async def _refresh_mapped(self) -> bool:
+        generation = self._reload_generation
+        identity = _file_identity(self.snapshot_path)
+        if identity is None:
+            if not self._missing_file_logged:
+                logger.warning(f"No analytics snapshot at {self.snapshot_path}; run `python jobs.py snapshot`")
+                self._missing_file_logged = True
+            return False
+
+        remap = identity != self._mapped_identity or self._loaded_generation != generation
+        if not remap and not self._dirty:
+            return False
+
+        async with await self._connect() as conn:
+            if remap:
+                await self._map(conn, identity, generation)
+            pending = dict(self._dirty)
+            if pending:
+                rows = await self._fetch_creators(conn, pending)
+                base = self._overlay or ColumnarSnapshot.from_parts([_encode([])], self.snapshot.as_of)
+                self._overlay = await asyncio.to_thread(base.replace_creators, pending, rows)
+                self._overlay_creators |= set(pending)
+                self._clear_dirty(pending)
+                self._stats["creators_reloaded"] += len(pending)
+        return True
+
+    async def _map(self, conn, identity: Tuple[int, int, int], generation: int):
+        """
+        Switches to the snapshot file, marking every creator whose posts
+        changed after it was built (or who is in the old overlay) for reload.
+        """
+        snapshot = await asyncio.to_thread(ColumnarSnapshot.open, self.snapshot_path)
+        since = (snapshot.as_of or EPOCH) - timedelta(seconds=ROLLUP_SAFETY_LAG_SECONDS)
+        cursor = conn.cursor()
+        await cursor.execute(CHANGED_SINCE_QUERY, {"since": since})
+        for (creator_id,) in await cursor.fetchall():
+            await self.mark_changed(creator_id)
+        for creator_id in self._overlay_creators:
+            await self.mark_changed(creator_id)
+
+        self.snapshot = snapshot
+        self._overlay, self._overlay_creators = None, set()
+        self._mapped_identity = identity
+        self._loaded_generation = generation
+        self._missing_file_logged = False
+        self._stats["snapshots_mapped"] += 1
+        logger.info(f"Columnar engine mapped {snapshot.row_count} posts from {self.snapshot_path} "
+                    f"(as of {snapshot.as_of})")
+
+    @staticmethod
+    async def _load_all(conn) -> ColumnarSnapshot:
+        """Reads posts_master through a server-side cursor, encoding each batch off the event loop."""
+        parts = []
+        async with conn.transaction():
+            cursor = conn.cursor()
+            await cursor.execute("SELECT NOW()")
+            (as_of,) = await cursor.fetchone()
+            cursor = conn.cursor(name="columnar_engine_load")
+            await cursor.execute(ALL_POSTS_QUERY)
+            while True:
+                rows = await cursor.fetchmany(COLUMNAR_FETCH_SIZE)
+                if not rows:
+                    break
+                parts.append(await asyncio.to_thread(_encode, rows))
+        return await asyncio.to_thread(ColumnarSnapshot.from_parts, parts or [_encode([])], as_of)
+
+
+engine = ColumnarEngine()
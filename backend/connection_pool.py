@@ -0,0 +1,269 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(pool.PoolError):
+    """No connection became free within the acquire timeout."""
+
+
+class TooManyRequests(pool.PoolError):
+    """The wait queue is full."""
+
+
+class BlockingConnectionPool:
+    """
+    Thread-safe psycopg2 pool. Unlike ThreadedConnectionPool, a caller that
+    finds every connection busy waits (up to `timeout` seconds, with at most
+    `max_waiting` callers queued) instead of failing at once. Connections are
+    validated on checkout when `check` is set, closed after `max_lifetime`
+    seconds and, above `minconn`, after `max_idle` seconds unused. `minconn`
+    connections are opened in the background by open().
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 30.0, max_waiting: int = 0,
+                 max_lifetime: float = 3600.0, max_idle: float = 600.0, check: bool = True,
+                 name: str = "pool", **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check = check
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        # Idle connections; reused from the right so the left end ages out
+        self._idle: deque = deque()
+        self._in_use = set()
+        # connection -> [expires_at, returned_at]
+        self._times: Dict[Any, list] = {}
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "requests_num": 0,
+            "requests_queued": 0,
+            "requests_wait_ms": 0,
+            "requests_errors": 0,
+            "requests_rejected": 0,
+            "connections_num": 0,
+            "connections_errors": 0,
+            "connections_lost": 0,
+            "connections_recycled": 0
+        }
+
+    def open(self):
+        """Starts filling the pool up to minconn in a background thread."""
+        threading.Thread(target=self._fill, name=f"{self.name}-warmup", daemon=True).start()
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    @property
+    def available(self) -> int:
+        return len(self._idle)
+
+    def getconn(self, timeout: Optional[float] = None):
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        queued = False
+        with self._cond:
+            self._stats["requests_num"] += 1
+        while True:
+            connection, queued = self._reserve(deadline, queued)
+            if connection is None:
+                connection = self._open_reserved()
+            elif not self._usable(connection):
+                continue
+            if queued:
+                with self._cond:
+                    self._stats["requests_wait_ms"] += int((time.monotonic() - started) * 1000)
+            return connection
+
+    def putconn(self, connection, close: bool = False):
+        with self._cond:
+            self._in_use.discard(connection)
+            if self._closed:
+                close = True
+
+        if not close and not connection.closed:
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    close = True
+        if not close and self._expired(connection):
+            close = True
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+
+        if close or connection.closed:
+            self._discard(connection)
+            return
+
+        with self._cond:
+            self._times[connection][1] = time.monotonic()
+            self._idle.append(connection)
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            connections = list(self._idle) + list(self._in_use)
+            self._idle.clear()
+            self._in_use.clear()
+            self._times.clear()
+            self._cond.notify_all()
+        for connection in connections:
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters named like psycopg_pool's get_stats(), so both pools read the same."""
+        with self._cond:
+            return {
+                "pool_min": self.minconn,
+                "pool_max": self.maxconn,
+                "pool_size": self.size,
+                "pool_available": self.available,
+                "requests_waiting": self._waiting,
+                **self._stats
+            }
+
+    def _reserve(self, deadline: float, queued: bool):
+        """
+        An idle connection, or None when the caller may open a new one (a slot
+        is reserved for it), and whether the caller has queued so far. Waits
+        for a returned connection while the pool is full.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                self._prune_idle()
+                if self._idle:
+                    connection = self._idle.pop()
+                    self._in_use.add(connection)
+                    return connection, queued
+                if self.size < self.maxconn:
+                    self._opening += 1
+                    return None, queued
+
+                if self.max_waiting and self._waiting >= self.max_waiting:
+                    self._stats["requests_rejected"] += 1
+                    raise TooManyRequests(f"{self.name}: {self._waiting} requests already waiting for a connection")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["requests_errors"] += 1
+                    raise PoolTimeout(f"{self.name}: no connection available after {self.timeout:g}s")
+                if not queued:
+                    queued = True
+                    self._stats["requests_queued"] += 1
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open_reserved(self):
+        """Opens a connection in a slot reserved by _reserve; it comes back checked out."""
+        try:
+            connection = psycopg2.connect(**self._connect_kwargs)
+        except psycopg2.Error:
+            with self._cond:
+                self._opening -= 1
+                self._stats["connections_errors"] += 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        with self._cond:
+            # Counted in the pool size throughout: reserved, then in use
+            self._opening -= 1
+            self._in_use.add(connection)
+            # Up to 10% early, so connections opened together don't all expire together
+            self._times[connection] = [now + self.max_lifetime * random.uniform(0.9, 1.0), now]
+            self._stats["connections_num"] += 1
+        return connection
+
+    def _usable(self, connection) -> bool:
+        """Checks a connection just taken from the idle queue; drops it if broken or too old."""
+        if connection.closed:
+            self._discard(connection, lost=True)
+            return False
+        if self._expired(connection):
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+            self._discard(connection)
+            return False
+        if self.check:
+            try:
+                # autocommit so the probe doesn't leave a transaction open
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                connection.autocommit = False
+            except psycopg2.Error:
+                logger.warning(f"{self.name}: dropping broken connection")
+                self._discard(connection, lost=True)
+                return False
+        return True
+
+    def _expired(self, connection) -> bool:
+        times = self._times.get(connection)
+        return times is not None and time.monotonic() >= times[0]
+
+    def _prune_idle(self):
+        """Closes connections idle past max_idle while above minconn (caller holds the lock)."""
+        now = time.monotonic()
+        while self._idle and self.size > self.minconn and now - self._times[self._idle[0]][1] >= self.max_idle:
+            connection = self._idle.popleft()
+            self._times.pop(connection, None)
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+
+    def _discard(self, connection, lost: bool = False):
+        with self._cond:
+            self._in_use.discard(connection)
+            self._times.pop(connection, None)
+            if lost:
+                self._stats["connections_lost"] += 1
+            self._cond.notify()
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        if not self._closed and self.size < self.minconn:
+            self.open()
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                if self._closed or self.size >= self.minconn:
+                    return
+                self._opening += 1
+            try:
+                connection = self._open_reserved()
+            except psycopg2.Error as e:
+                logger.warning(f"{self.name}: warm-up connection failed: {e}")
+                return
+            self.putconn(connection)
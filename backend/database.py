@@ -1,13 +1,175 @@
 import psycopg2
-from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
+from psycopg import AsyncCursor, AsyncServerCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
 import os
+import time
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
+from connection_pool import BlockingConnectionPool
+from query_registry import NamedQuery
+from query_trace import QUERY_TRACE_ENABLED, tracer, explain_sync, explain_async
+from metrics import (
+    observe_query, observe_connection_held, register_collector,
+    db_pool_acquire_seconds, db_pool_exhausted_total, db_pool_connections, db_pool_requests_waiting
+)
 
 load_dotenv()
 
 
+def get_connection_params():
+    return {
+        "dbname": os.getenv("DB_NAME", "social-analytics"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "password"),
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": os.getenv("DB_PORT", "5432")
+    }
+
+
+# Seconds a caller waits for a free connection before failing
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+# Callers allowed to queue for a connection at once (0 = unbounded)
+DB_POOL_MAX_WAITING = int(os.getenv("DB_POOL_MAX_WAITING", "100"))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+# Ping each connection on checkout, so one broken by a server restart is
+# replaced instead of handed out
+DB_POOL_CHECK = os.getenv("DB_POOL_CHECK", "true").lower() == "true"
+# Server-side prepared statements on the async pool; turn off behind a
+# transaction-mode PgBouncer older than 1.21, which can't track them
+DB_PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "true").lower() == "true"
+
+
+def pool_size_limits() -> Tuple[int, int]:
+    """
+    (min, max) connections for each pool in this process. DB_POOL_MAX caps one
+    process; when DB_MAX_CONNECTIONS (the connections the API may hold in
+    total) is set, it is split between the WEB_CONCURRENCY worker processes
+    (uvicorn's default for --workers) so adding workers can't exceed the
+    server's max_connections.
+    """
+    pool_min = int(os.getenv("DB_POOL_MIN", "2"))
+    pool_max = int(os.getenv("DB_POOL_MAX", "10"))
+    total = os.getenv("DB_MAX_CONNECTIONS")
+    if total:
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        pool_max = max(1, min(pool_max, int(total) // workers))
+    return min(pool_min, pool_max), pool_max
+
+
+# Pool labels in metrics
+SYNC_POOL = "sync"
+ASYNC_POOL = "async"
+
+
+def _statement_text(query, connection) -> Optional[str]:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode(errors="replace")
+    if hasattr(query, "as_string"):
+        return query.as_string(connection)
+    return None
+
+
+def _timed_query(pool_name: str, statement: Optional[str], explainable: bool, run, *args):
+    """
+    Runs one cursor call, recorded in metrics and the query trace. Returns the
+    call's result and the SlowQuery to capture a plan for, if any.
+    """
+    started = time.perf_counter()
+    failed = True
+    slow_query = None
+    try:
+        result = run(*args)
+        failed = False
+    finally:
+        seconds = time.perf_counter() - started
+        observe_query(pool_name, seconds, failed)
+        if QUERY_TRACE_ENABLED and statement is not None:
+            slow_query = tracer.record(statement, seconds, failed, explainable)
+    return result, slow_query
+
+
+async def _timed_async_query(pool_name: str, statement: Optional[str], explainable: bool, run, *args, **kwargs):
+    started = time.perf_counter()
+    failed = True
+    slow_query = None
+    try:
+        result = await run(*args, **kwargs)
+        failed = False
+    finally:
+        seconds = time.perf_counter() - started
+        observe_query(pool_name, seconds, failed)
+        if QUERY_TRACE_ENABLED and statement is not None:
+            slow_query = tracer.record(statement, seconds, failed, explainable)
+    return result, slow_query
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that reports every query to metrics and the query trace."""
+
+    def execute(self, query, vars=None):
+        statement = _statement_text(query, self.connection)
+        result, slow_query = _timed_query(SYNC_POOL, statement, True, super().execute, query, vars)
+        if slow_query is not None:
+            tracer.attach_plan(slow_query, explain_sync(self.connection, statement, vars))
+        return result
+
+    def executemany(self, query, vars_list):
+        statement = _statement_text(query, self.connection)
+        return _timed_query(SYNC_POOL, statement, False, super().executemany, query, vars_list)[0]
+
+    def copy_expert(self, sql, file, size=8192):
+        statement = _statement_text(sql, self.connection)
+        return _timed_query(SYNC_POOL, statement, False, super().copy_expert, sql, file, size)[0]
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """
+    Async cursor that reports every query to metrics and the query trace.
+    Registered queries (query_registry) are prepared on first use per
+    connection and executed by handle afterwards.
+    """
+
+    async def execute(self, query, params=None, **kwargs):
+        if DB_PREPARE_STATEMENTS and isinstance(query, NamedQuery):
+            kwargs.setdefault("prepare", True)
+        statement = _statement_text(query, self.connection)
+        result, slow_query = await _timed_async_query(ASYNC_POOL, statement, True, super().execute, query, params, **kwargs)
+        if slow_query is not None:
+            plan_cursor = AsyncCursor(self.connection, row_factory=tuple_row)
+            tracer.attach_plan(slow_query, await explain_async(plan_cursor, statement, params))
+        return result
+
+    async def executemany(self, query, params_seq, **kwargs):
+        statement = _statement_text(query, self.connection)
+        result, _ = await _timed_async_query(ASYNC_POOL, statement, False, super().executemany, query, params_seq, **kwargs)
+        return result
+
+
+class InstrumentedAsyncServerCursor(AsyncServerCursor):
+    """
+    Named (server-side) cursor that reports its query and each fetch to
+    metrics. Its plans aren't captured: EXPLAIN ANALYZE would run a whole
+    export again.
+    """
+
+    async def execute(self, query, params=None, **kwargs):
+        statement = _statement_text(query, self.connection)
+        result, _ = await _timed_async_query(ASYNC_POOL, statement, False, super().execute, query, params, **kwargs)
+        return result
+
+    async def fetchmany(self, size=0):
+        result, _ = await _timed_async_query(ASYNC_POOL, None, False, super().fetchmany, size)
+        return result
+
+
 class Database:
     _connection_pool = None
 
@@ -15,15 +177,20 @@ class Database:
     def initialize(cls):
         if cls._connection_pool is None:
             try:
-                cls._connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                    minconn=int(os.getenv("DB_POOL_MIN", "2")),
-                    maxconn=int(os.getenv("DB_POOL_MAX", "10")),
-                    dbname=os.getenv("DB_NAME", "social-analytics"),
-                    user=os.getenv("DB_USER", "postgres"),
-                    password=os.getenv("DB_PASSWORD", "password"),
-                    host=os.getenv("DB_HOST", "localhost"),
-                    port=os.getenv("DB_PORT", "5432")
+                pool_min, pool_max = pool_size_limits()
+                connection_pool = BlockingConnectionPool(
+                    minconn=pool_min,
+                    maxconn=pool_max,
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    max_waiting=DB_POOL_MAX_WAITING,
+                    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    check=DB_POOL_CHECK,
+                    name=SYNC_POOL,
+                    **get_connection_params()
                 )
+                connection_pool.open()
+                cls._connection_pool = connection_pool
                 print("✅ Database connection pool created successfully")
             except Exception as e:
                 print(f"❌ Error creating connection pool: {e}")
@@ -33,7 +200,12 @@ class Database:
     def get_connection(cls):
         if cls._connection_pool is None:
             cls.initialize()
-        return cls._connection_pool.getconn()
+        if cls._connection_pool.available == 0:
+            db_pool_exhausted_total.inc(pool=SYNC_POOL)
+        started = time.perf_counter()
+        connection = cls._connection_pool.getconn()
+        db_pool_acquire_seconds.observe(time.perf_counter() - started, pool=SYNC_POOL)
+        return connection
 
     @classmethod
     def return_connection(cls, connection):
@@ -47,6 +219,112 @@ class Database:
             cls._connection_pool = None
             print("👋 All database connections closed")
 
+    @classmethod
+    def get_stats(cls) -> Optional[Dict[str, Any]]:
+        return cls._connection_pool.get_stats() if cls._connection_pool else None
+
+    @classmethod
+    def collect_metrics(cls):
+        _set_pool_gauges(SYNC_POOL, cls.get_stats())
+
+
+class AsyncDatabase:
+    """
+    psycopg 3 async pool used by the API routes, so a slow query awaits
+    instead of blocking the event loop.
+    """
+    _connection_pool = None
+
+    @classmethod
+    async def initialize(cls):
+        if cls._connection_pool is None:
+            try:
+                pool_min, pool_max = pool_size_limits()
+                connection_pool = AsyncConnectionPool(
+                    conninfo=make_conninfo(**get_connection_params()),
+                    min_size=pool_min,
+                    max_size=pool_max,
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    max_waiting=DB_POOL_MAX_WAITING,
+                    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    check=AsyncConnectionPool.check_connection if DB_POOL_CHECK else None,
+                    kwargs={
+                        "row_factory": dict_row,
+                        "cursor_factory": InstrumentedAsyncCursor,
+                        # None also stops psycopg auto-preparing repeated statements
+                        **({} if DB_PREPARE_STATEMENTS else {"prepare_threshold": None})
+                    },
+                    configure=cls._configure_connection,
+                    name=ASYNC_POOL,
+                    open=False
+                )
+                # Returns at once; min_size connections are opened in the background
+                await connection_pool.open(wait=False)
+                cls._connection_pool = connection_pool
+                print("✅ Async database connection pool created successfully")
+            except Exception as e:
+                print(f"❌ Error creating async connection pool: {e}")
+                raise
+
+    @staticmethod
+    async def _configure_connection(connection):
+        connection.server_cursor_factory = InstrumentedAsyncServerCursor
+
+    @classmethod
+    async def get_pool(cls):
+        if cls._connection_pool is None:
+            await cls.initialize()
+        return cls._connection_pool
+
+    @classmethod
+    async def close_all_connections(cls):
+        if cls._connection_pool:
+            await cls._connection_pool.close()
+            cls._connection_pool = None
+            print("👋 All async database connections closed")
+
+    @classmethod
+    def get_stats(cls) -> Optional[Dict[str, Any]]:
+        return cls._connection_pool.get_stats() if cls._connection_pool else None
+
+    @classmethod
+    def collect_metrics(cls):
+        _set_pool_gauges(ASYNC_POOL, cls.get_stats())
+
+
+def _set_pool_gauges(pool_name: str, stats: Optional[Dict[str, Any]]):
+    if stats is None:
+        return
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    db_pool_connections.set(size - available, pool=pool_name, state="in_use")
+    db_pool_connections.set(available, pool=pool_name, state="idle")
+    db_pool_connections.set(stats.get("pool_max", 0), pool=pool_name, state="max")
+    db_pool_requests_waiting.set(stats.get("requests_waiting", 0), pool=pool_name)
+
+
+def pool_stats() -> Dict[str, Optional[Dict[str, Any]]]:
+    """Counters of both pools (None for a pool not opened in this process)."""
+    return {SYNC_POOL: Database.get_stats(), ASYNC_POOL: AsyncDatabase.get_stats()}
+
+
+register_collector(Database.collect_metrics)
+register_collector(AsyncDatabase.collect_metrics)
+
+
+async def _checkout_async_connection(connection_pool):
+    """
+    getconn() with the wait recorded in metrics; a checkout that finds no
+    idle connection and has to queue counts as pool exhaustion.
+    """
+    if connection_pool.get_stats().get("pool_available", 0) == 0:
+        db_pool_exhausted_total.inc(pool=ASYNC_POOL)
+    started = time.perf_counter()
+    connection = await connection_pool.getconn()
+    db_pool_acquire_seconds.observe(time.perf_counter() - started, pool=ASYNC_POOL)
+    return connection
+
 
 @contextmanager
 def get_db_connection():
@@ -63,4 +341,69 @@ def get_db_connection():
 
 
 def get_db_cursor(connection):
-    return connection.cursor(cursor_factory=RealDictCursor)
+    return connection.cursor(cursor_factory=InstrumentedCursor)
+
+
+class RequestContext:
+    """
+    Per-request state shared by every service call made while handling one
+    request: a single pool connection, checked out on first use, and the
+    results of service calls already made (see request_context.memoized).
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.checked_out_at = None
+        self.memo = {}
+
+    async def get_connection(self):
+        if self.connection is None:
+            connection_pool = await AsyncDatabase.get_pool()
+            self.connection = await _checkout_async_connection(connection_pool)
+            self.checked_out_at = time.perf_counter()
+        return self.connection
+
+    async def release(self):
+        if self.connection is not None:
+            connection_pool = await AsyncDatabase.get_pool()
+            await connection_pool.putconn(self.connection)
+            observe_connection_held(time.perf_counter() - self.checked_out_at)
+            self.connection = None
+        self.memo.clear()
+
+
+current_request_context: ContextVar[Optional[RequestContext]] = ContextVar("current_request_context", default=None)
+
+
+@asynccontextmanager
+async def _pooled_connection():
+    context = current_request_context.get()
+    if context is not None:
+        # Nested blocks in the same request reuse the request's connection
+        yield await context.get_connection()
+        return
+
+    connection_pool = await AsyncDatabase.get_pool()
+    connection = await _checkout_async_connection(connection_pool)
+    checked_out_at = time.perf_counter()
+    try:
+        yield connection
+    finally:
+        await connection_pool.putconn(connection)
+        observe_connection_held(time.perf_counter() - checked_out_at)
+
+
+@asynccontextmanager
+async def get_async_db_connection():
+    async with _pooled_connection() as connection:
+        try:
+            yield connection
+            await connection.commit()
+        except Exception as e:
+            await connection.rollback()
+            print(f"Database error: {e}")
+            raise
+
+
+def get_async_db_cursor(connection):
+    return connection.cursor(row_factory=dict_row)
@@ -0,0 +1,142 @@
+"""
+Batch jobs for the analytics backend.
+
+Usage:
+    python jobs.py rollups                  # refresh rollup tables once
+    python jobs.py rollups --every 300      # keep refreshing every 5 minutes
+    python jobs.py rollups --rebuild-ranks  # also recompute every creator's percentile ranks
+    python jobs.py ingest posts.csv         # bulk-load a CSV/NDJSON export into posts_master
+    python jobs.py ingest - --format ndjson --source tiktok_export < posts.ndjson
+    python jobs.py partitions               # create upcoming monthly partitions (run daily)
+    python jobs.py check-external-ids       # fail if a (platform, external_id) is stored twice
+    python jobs.py snapshot --every 300     # publish the columnar engine's shared snapshot file
+    python jobs.py alerts                   # notify creators whose engagement dropped (after rollups)
+    python jobs.py recommendations          # regenerate changed creators' recommendations (after rollups)
+    python jobs.py insights                 # regenerate changed or expired creators' insights (after rollups)
+"""
+import argparse
+import sys
+import time
+from dotenv import load_dotenv
+
+from database import Database
+from services.rollup_service import RollupService
+from services.ingestion_service import IngestionService, INGEST_FORMATS
+from services.partition_service import PartitionService
+from services.alert_service import AlertService
+from services.recommendations_service import RecommendationsService
+from services.insights_service import InsightsService
+from columnar_engine import COLUMNAR_SNAPSHOT_PATH, build_snapshot_file
+
+load_dotenv()
+
+
+def run_rollups(args):
+    stats = RollupService.refresh_all(rebuild_ranks=args.rebuild_ranks)
+    for rollup_name, rows in stats.items():
+        print(f"   ✓ {rollup_name}: {rows} rows recomputed")
+
+
+def run_ingest(args):
+    if not args.path:
+        raise ValueError("ingest needs a file path (or - for stdin)")
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    if args.path == "-":
+        stats = IngestionService.ingest_posts(sys.stdin.buffer, format, args.source)
+    else:
+        with open(args.path, "rb") as stream:
+            stats = IngestionService.ingest_posts(stream, format, args.source)
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+
+
+def run_partitions(args):
+    stats = PartitionService.ensure_partitions()
+    for table_name, created in stats.items():
+        print(f"   ✓ {table_name}: {created} partitions created")
+
+
+def run_check_external_ids(args):
+    stats = IngestionService.check_external_ids()
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+    if any(stats.values()):
+        raise RuntimeError("posts_master and posts_external_ids disagree; see counts above")
+
+
+def run_snapshot(args):
+    path = args.path or COLUMNAR_SNAPSHOT_PATH
+    if not path:
+        raise ValueError("snapshot needs a file path (or COLUMNAR_SNAPSHOT_PATH)")
+    stats = build_snapshot_file(path)
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+
+
+def run_alerts(args):
+    stats = AlertService.detect_engagement_drops()
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+
+
+def run_recommendations(args):
+    stats = RecommendationsService.generate_recommendations()
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+
+
+def run_insights(args):
+    stats = InsightsService.generate_insights()
+    for key, value in stats.items():
+        print(f"   ✓ {key}: {value}")
+
+
+JOBS = {
+    "rollups": run_rollups,
+    "ingest": run_ingest,
+    "partitions": run_partitions,
+    "check-external-ids": run_check_external_ids,
+    "snapshot": run_snapshot,
+    "alerts": run_alerts,
+    "recommendations": run_recommendations,
+    "insights": run_insights,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analytics batch jobs")
+    parser.add_argument("job", choices=sorted(JOBS), help="Job to run")
+    parser.add_argument("path", nargs="?", help="Input file for ingest (- for stdin), or output file for snapshot")
+    parser.add_argument("--format", choices=INGEST_FORMATS, default=None,
+                        help="Input format for ingest (default: from the file extension)")
+    parser.add_argument("--source", default="bulk_ingest",
+                        help="Source label recorded with rejected rows")
+    parser.add_argument("--rebuild-ranks", action="store_true",
+                        help="Recompute percentile ranks for every creator, e.g. after category changes")
+    parser.add_argument("--every", type=int, default=None, metavar="SECONDS",
+                        help="Repeat the job on this interval instead of running once")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            started = time.monotonic()
+            print(f"⚙️  Running {args.job}...")
+            JOBS[args.job](args)
+            print(f"✅ {args.job} finished in {time.monotonic() - started:.2f}s")
+            if args.every is None:
+                break
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        Database.close_all_connections()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+from database import get_connection_params
+
+logger = logging.getLogger(__name__)
+
+NotificationHandler = Callable[[str], Awaitable[None]]
+ReconnectHandler = Callable[[], Awaitable[None]]
+
+
+class PostgresListener:
+    """
+    One LISTEN connection per worker that fans NOTIFY payloads out to
+    in-process handlers. Reconnects with backoff; handlers registered with
+    `on_reconnect` run after a reconnect because notifications sent while
+    disconnected are lost.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[NotificationHandler]] = {}
+        self._reconnect_handlers: List[ReconnectHandler] = []
+        self._task = None
+
+    def subscribe(self, channel: str, handler: NotificationHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: ReconnectHandler):
+        self._reconnect_handlers.append(handler)
+
+    async def start(self):
+        if self._task is None and self._handlers:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        backoff = 1
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    make_conninfo(**get_connection_params()), autocommit=True
+                ) as conn:
+                    for channel in self._handlers:
+                        await conn.execute(f'LISTEN "{channel}"')
+                    logger.info(f"Listening on {', '.join(self._handlers)}")
+
+                    if connected_before:
+                        for handler in self._reconnect_handlers:
+                            await handler()
+                    connected_before = True
+                    backoff = 1
+
+                    async for notify in conn.notifies():
+                        for handler in self._handlers.get(notify.channel, []):
+                            try:
+                                await handler(notify.payload)
+                            except Exception as e:
+                                logger.error(f"Error handling {notify.channel} notification: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Listener connection lost: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+listener = PostgresListener()
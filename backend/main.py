@@ -1,12 +1,22 @@
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from contextlib import asynccontextmanager
 import os
-import csv
-import io
+import tempfile
+from datetime import date
+from uuid import UUID
 from dotenv import load_dotenv
-from database import Database, get_db_connection, get_db_cursor
+from database import Database, AsyncDatabase, get_async_db_connection, get_async_db_cursor, pool_stats, DB_POOL_TIMEOUT_SECONDS
+from connection_pool import PoolTimeout, TooManyRequests
+from psycopg_pool import PoolTimeout as AsyncPoolTimeout, TooManyRequests as AsyncTooManyRequests
+from cache import POSTS_CHANGED_CHANNEL, invalidate_creator, clear_cache, cache_stats
+from listener import listener
+from notification_stream import hub as notification_hub
+from columnar_engine import engine
+from request_context import RequestContextMiddleware
+from metrics import MetricsMiddleware, render_metrics
+from query_trace import QUERY_TRACE_ENABLED, slow_query_report
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
 from pydantic import BaseModel
@@ -26,11 +36,16 @@ class ContactRequest(BaseModel):
     body: str
 
 # Import services
-from services.analytics_service import AnalyticsService
-from services.trends_service import TrendsService
-from services.recommendations_service import RecommendationsService
-from services.collaboration_service import CollaborationService
-from services.business_service import BusinessService
+from services.analytics_service import AsyncAnalyticsService
+from services.trends_service import AsyncTrendsService
+from services.recommendations_service import AsyncRecommendationsService
+from services.insights_service import AsyncInsightsService
+from services.collaboration_service import AsyncCollaborationService
+from services.business_service import AsyncBusinessService
+from services.search_service import AsyncSearchService
+from services.ranking_service import AsyncRankingService, METRICS as RANK_METRICS, DIMENSIONS as RANK_DIMENSIONS
+from services.export_service import ExportService, AsyncExportService, EXPORT_FORMATS
+from services.ingestion_service import AsyncIngestionService, INGEST_FORMATS
 
 load_dotenv()
 
@@ -38,8 +53,21 @@ load_dotenv()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting Social Media Analytics API...")
-    Database.initialize()
+    await AsyncDatabase.initialize()
+    # Drop cached analytics when a creator's posts change; notifications missed
+    # while the listener was disconnected can't be replayed, so start clean.
+    listener.subscribe(POSTS_CHANGED_CHANNEL, invalidate_creator)
+    listener.on_reconnect(clear_cache)
+    if engine.enabled:
+        engine.attach(listener)
+        await engine.start()
+    # Wake the notification streams of users with new notifications
+    notification_hub.attach(listener)
+    await listener.start()
     yield
+    await listener.stop()
+    await engine.stop()
+    await AsyncDatabase.close_all_connections()
     Database.close_all_connections()
     print("👋 Shutting down Social Media Analytics API...")
 
@@ -51,6 +79,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# One pooled connection and one memo per request, shared by every service call
+app.add_middleware(RequestContextMiddleware)
+
+# Per-route latency, query counts and pool usage; added after (so wrapping)
+# RequestContextMiddleware to see the request's connection being released
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:5174").split(","),
@@ -60,6 +95,19 @@ app.add_middleware(
 )
 
 
+async def pool_unavailable_handler(request: Request, exc: Exception):
+    """A full connection pool is a temporary overload, not a server error"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, retry shortly"},
+        headers={"Retry-After": str(max(1, int(DB_POOL_TIMEOUT_SECONDS)))}
+    )
+
+
+for pool_exception in (PoolTimeout, TooManyRequests, AsyncPoolTimeout, AsyncTooManyRequests):
+    app.add_exception_handler(pool_exception, pool_unavailable_handler)
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -74,10 +122,10 @@ async def root():
 async def health_check():
     """API health check with database connectivity"""
     try:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            cursor.execute("SELECT 1")
-            cursor.close()
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute("SELECT 1")
+            await cursor.close()
             db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -88,55 +136,144 @@ async def health_check():
     }
 
 
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Request, query and connection pool metrics in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/v1/debug/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=200)):
+    """Slowest normalized SQL statements with their calling service methods and sampled plans"""
+    if not QUERY_TRACE_ENABLED:
+        raise HTTPException(status_code=404, detail="Query tracing is disabled (QUERY_TRACE_ENABLED)")
+    return slow_query_report(limit)
+
+
+@app.get("/api/v1/pool/stats")
+async def get_pool_stats():
+    """Connection pool sizes, wait queue and error counters"""
+    return pool_stats()
+
+
+@app.get("/api/v1/engine/stats")
+async def get_engine_stats():
+    """Columnar analytics engine size and refresh counters (ANALYTICS_ENGINE=columnar)"""
+    return engine.get_stats()
+
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    """Analytics cache hit/miss counters and size"""
+    return cache_stats()
+
+
+@app.get("/api/v1/notifications/stats")
+async def get_notification_stream_stats():
+    """Open notification streams on this worker"""
+    return notification_hub.stats()
+
+
 # --- CREATOR DASHBOARD ENDPOINTS ---
 
+@app.get("/api/dashboard/bundle")
+async def get_dashboard_bundle(
+    creator_id: str, 
+    platform: Optional[str] = None, 
+    date_range: Optional[str] = None
+):
+    """
+    Overview, platform breakdown, content format comparison and posting-time
+    analysis computed in one round trip.
+    """
+    return await AsyncAnalyticsService.get_dashboard_bundle(creator_id, platform, date_range)
+
+
 @app.get("/api/dashboard/overview")
 async def get_overview(
     creator_id: str, 
     platform: Optional[str] = None, 
     date_range: Optional[str] = None
 ):
-    return AnalyticsService.get_dashboard_overview(creator_id, platform, date_range)
+    return await AsyncAnalyticsService.get_dashboard_overview(creator_id, platform, date_range)
 
 
 @app.get("/api/dashboard/platform-breakdown")
 async def get_platform_breakdown(creator_id: str):
-    return AnalyticsService.get_platform_breakdown(creator_id)
+    return await AsyncAnalyticsService.get_platform_breakdown(creator_id)
 
 
 @app.get("/api/dashboard/content-format-comparison")
 async def get_content_format_comparison(creator_id: str):
-    return AnalyticsService.get_content_format_comparison(creator_id)
+    return await AsyncAnalyticsService.get_content_format_comparison(creator_id)
 
 
 @app.get("/api/dashboard/trends")
-async def get_trends(creator_id: str):
-    return TrendsService.get_trends(creator_id)
+async def get_trends(
+    creator_id: str,
+    window_days: int = Query(7, description="Days per period, e.g. 7, 30 or 90"),
+    periods: int = Query(2, description="Number of consecutive periods to compare, newest first")
+):
+    """
+    Period comparison (latest vs previous window) and every period's totals,
+    plus the daily series across all periods for sparklines
+    """
+    try:
+        return await AsyncTrendsService.get_trends(creator_id, window_days, periods)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/api/dashboard/posting-time-analysis")
 async def get_posting_time_analysis(creator_id: str):
-    return AnalyticsService.get_posting_time_analysis(creator_id)
+    return await AsyncAnalyticsService.get_posting_time_analysis(creator_id)
 
 
 @app.get("/api/creator/profile-metrics")
 async def get_creator_profile_metrics(creator_id: str):
-    return AnalyticsService.get_profile_metrics(creator_id)
+    return await AsyncAnalyticsService.get_profile_metrics(creator_id)
 
 
 @app.get("/api/creator/audience-insights")
 async def get_audience_insights(creator_id: str):
-    return AnalyticsService.get_audience_insights(creator_id)
+    return await AsyncAnalyticsService.get_audience_insights(creator_id)
 
 
 @app.get("/api/creator/monetization")
 async def get_monetization(creator_id: str):
-    return AnalyticsService.get_monetization_metrics(creator_id)
+    return await AsyncAnalyticsService.get_monetization_metrics(creator_id)
+
+
+@app.get("/api/creator/percentile-ranks")
+async def get_percentile_ranks(creator_id: str):
+    return await AsyncRankingService.get_creator_percentiles(creator_id)
+
+
+@app.get("/api/rankings/percentile")
+async def get_percentile(
+    metric: str = Query(..., description="engagement_rate, views or posting_frequency"),
+    value: float = Query(..., description="Metric value to rank"),
+    dimension: str = Query("global", description="global, category, platform or content_type"),
+    dimension_value: str = Query("", description="Category, platform or content type to rank within")
+):
+    """
+    Where a value sits among all creators, or among creators in one category,
+    platform or content type
+    """
+    if metric not in RANK_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(RANK_METRICS)}")
+    if dimension not in RANK_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of: {', '.join(RANK_DIMENSIONS)}")
+    if dimension == 'global':
+        dimension_value = ''
+    elif not dimension_value:
+        raise HTTPException(status_code=400, detail=f"dimension_value is required for dimension '{dimension}'")
+    return await AsyncRankingService.get_percentile(metric, value, dimension, dimension_value)
 
 
 @app.get("/api/business/profile")
 async def get_business_profile(user_id: str):
-    return BusinessService.get_business_profile(user_id)
+    return await AsyncBusinessService.get_business_profile(user_id)
 
 
 # --- AI & RECOMMENDATIONS ENDPOINTS ---
@@ -144,52 +281,79 @@ async def get_business_profile(user_id: str):
 @app.post("/api/ai/explain")
 async def explain_performance(request: ExplainRequest):
     """
-    AI EXPLANATION STUB (NO MODELS)
-    Returns structured facts with placeholder explanation text.
+    Explains performance from the creator's precomputed insights
+    (`python jobs.py insights`): the metrics behind them as facts, plus the
+    leading insight and the first opportunity.
     """
-    creator_id = request.creator_id
-    trends = TrendsService.get_trends(creator_id)
-    facts = trends['facts']
-    
-    explanation = "Engagement dropped due to reduced posting frequency and increased static posts."
-    recommendation = "Increase reel frequency and post during peak hours."
-    
-    if facts['engagement_change'].startswith('+'):
-        explanation = "Engagement is up due to high-performing video content and consistent posting."
-        recommendation = "Continue with current strategy and explore more video collaborations."
-
-    return {
-        "facts": facts,
-        "explanation": explanation,
-        "recommendation": recommendation
-    }
+    return await AsyncInsightsService.get_explanation(request.creator_id)
 
 
 @app.get("/api/recommendations")
 async def get_recommendations(creator_id: str):
-    return RecommendationsService.get_recommendations(creator_id)
+    return await AsyncRecommendationsService.get_recommendations(creator_id)
 
 
 @app.get("/api/notifications")
 async def get_notifications(user_id: str):
-    return CollaborationService.get_notifications(user_id)
+    return await AsyncCollaborationService.get_notifications(user_id)
+
+
+@app.get("/api/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    user_id: UUID,
+    after: Optional[int] = Query(None, ge=0, description="Sequence number of the last notification already shown")
+):
+    """
+    Server-sent events: one `notification` event per new notification, with
+    its sequence number as the event id. A reconnecting EventSource sends
+    Last-Event-ID and resumes after it; otherwise the stream starts after
+    `after`, or at the latest notification. The hub is keyed on the
+    canonical lowercase id, which is what the trigger notifies with.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+        after = int(last_event_id)
+
+    return StreamingResponse(
+        notification_hub.stream(str(user_id), after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # --- COLLABORATION ENDPOINTS ---
 
 @app.post("/api/business/contact-creator")
 async def contact_creator(payload: ContactRequest):
-    return CollaborationService.send_email(payload.sender_id, payload.receiver_id, payload.dict())
+    return await AsyncCollaborationService.send_email(payload.sender_id, payload.receiver_id, payload.dict())
 
 
 @app.get("/api/creator/inbox")
-async def get_inbox(user_id: str):
-    return CollaborationService.get_inbox(user_id)
+async def get_inbox(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """
+    One page of the inbox, newest first, with the total and unread counts
+    """
+    try:
+        return await AsyncCollaborationService.get_inbox(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/creator/inbox/counts")
+async def get_inbox_counts(user_id: str):
+    return await AsyncCollaborationService.get_inbox_counts(user_id)
 
 
 @app.get("/api/creator/inbox/{email_id}")
 async def get_email_detail(email_id: str):
-    return CollaborationService.get_email_detail(email_id)
+    return await AsyncCollaborationService.get_email_detail(email_id)
 
 
 # --- PROFILE & REPORTS ---
@@ -197,22 +361,22 @@ async def get_email_detail(email_id: str):
 @app.get("/api/profile")
 async def get_profile(user_id: str):
     try:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            cursor.execute("""
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute("""
                 SELECT u.user_id, u.username, u.display_name, u.email, u.user_type,
                        c.bio, c.content_categories, c.verified
                 FROM users u
                 LEFT JOIN creators c ON u.user_id = c.user_id
                 WHERE u.user_id = %s
             """, (user_id,))
-            user = cursor.fetchone()
+            user = await cursor.fetchone()
             
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
                 
             # Add summary stats
-            stats = AnalyticsService.get_dashboard_overview(user_id) if user['user_type'] == 'creator' else {}
+            stats = await AsyncAnalyticsService.get_dashboard_overview(user_id) if user['user_type'] == 'creator' else {}
             
             return {
                 "user": user,
@@ -223,27 +387,50 @@ async def get_profile(user_id: str):
 
 
 @app.get("/api/reports/export")
-async def export_report(creator_id: str, format: str = "csv"):
-    if format != "csv":
-        raise HTTPException(status_code=400, detail="Only CSV format is supported")
-    
-    with get_db_connection() as conn:
-        cursor = get_db_cursor(conn)
-        cursor.execute("SELECT * FROM posts_master WHERE creator_id = %s", (creator_id,))
-        posts = cursor.fetchall()
-        
-        if not posts:
-            raise HTTPException(status_code=404, detail="No data to export")
-            
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=posts[0].keys())
-        writer.writeheader()
-        writer.writerows(posts)
-        
-        response = Response(content=output.getvalue())
-        response.headers["Content-Disposition"] = f"attachment; filename=analytics_report_{creator_id}.csv"
-        response.headers["Content-Type"] = "text/csv"
-        return response
+async def export_report(
+    creator_id: str,
+    format: str = "csv",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    platform: Optional[str] = None,
+    columns: Optional[str] = Query(None, description="Comma-separated posts_master columns")
+):
+    """
+    Streams the creator's posts as CSV, NDJSON or Parquet, read in batches
+    from a server-side cursor.
+    """
+    try:
+        selected = ExportService.validate_request(format, columns.split(",") if columns else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not await AsyncExportService.has_rows(creator_id, start_date, end_date, platform):
+        raise HTTPException(status_code=404, detail="No data to export")
+
+    return StreamingResponse(
+        AsyncExportService.stream_posts(format, selected, creator_id, start_date, end_date, platform),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=analytics_report_{creator_id}.{format}"}
+    )
+
+
+# --- INGESTION ---
+
+@app.post("/api/ingest/posts")
+async def ingest_posts(request: Request, format: str = "csv", source: str = "bulk_ingest"):
+    """
+    Bulk-loads a CSV or NDJSON platform export (raw request body) into posts_master,
+    upserting on (platform, external_id). Rejected rows are logged to ingestion_errors.
+    """
+    if format not in INGEST_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of: {', '.join(INGEST_FORMATS)}")
+
+    # Spool the upload so large exports hit disk instead of memory
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        return await AsyncIngestionService.ingest_posts(upload, format, source[:50])
 
 
 # --- LEGACY / OTHER ENDPOINTS ---
@@ -252,8 +439,8 @@ async def export_report(creator_id: str, format: str = "csv"):
 async def get_dashboard_stats(business_id: Optional[str] = None):
     # (Existing implementation kept for compatibility)
     try:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
             query = """
                 SELECT 
                     COUNT(DISTINCT c.campaign_id) as active_count,
@@ -266,10 +453,10 @@ async def get_dashboard_stats(business_id: Optional[str] = None):
             """
             if business_id:
                 query += " AND c.business_id = %s"
-                cursor.execute(query, (business_id,))
+                await cursor.execute(query, (business_id,))
             else:
-                cursor.execute(query)
-            result = cursor.fetchone()
+                await cursor.execute(query)
+            result = await cursor.fetchone()
             return {
                 "active_count": int(result['active_count'] or 0),
                 "total_spent": float(result['total_spent'] or 0),
@@ -283,58 +470,23 @@ async def get_dashboard_stats(business_id: Optional[str] = None):
 @app.get("/api/creators/search")
 async def search_creators(
     domain: Optional[str] = Query(None, description="Content niche/domain"),
-    region: Optional[str] = Query(None, description="Geographic region"),
-    min_engagement: Optional[float] = Query(None, description="Minimum engagement rate")
+    region: Optional[str] = Query(None, description="Geographic region (not supported yet; rejected with 400)"),
+    min_engagement: Optional[float] = Query(None, description="Minimum engagement rate"),
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    offset: int = Query(0, ge=0, description="Number of ranked results to skip")
 ):
     """
     Search for creators based on filters
-    Returns list of creators with calculated match scores
+    Returns one page of creators ranked by match score
     """
     try:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            
-            # Simple search logic for demo
-            query = """
-                SELECT 
-                    c.creator_id, u.user_id, u.username, u.display_name, u.email, c.bio, 
-                    c.content_categories, c.verified
-                FROM creators c
-                INNER JOIN users u ON c.user_id = u.user_id
-                WHERE u.user_type = 'creator'
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            creators = []
-            for row in results:
-                # Mock stats for search results
-                stats = AnalyticsService.get_dashboard_overview(str(row['creator_id']))
-                match_score = calculate_match_score(
-                    engagement_rate=stats['engagement_rate'],
-                    verified=row['verified'],
-                    domain_match=(domain in (row['content_categories'] or [])) if domain else False
-                )
-                
-                creators.append({
-                    **row,
-                    "stats": stats,
-                    "match_score": match_score
-                })
-            
-            return {"creators": creators, "count": len(creators)}
+        return await AsyncSearchService.search_creators(domain, region, min_engagement, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def calculate_match_score(engagement_rate: float, verified: bool, domain_match: bool) -> float:
-    score = 0.0
-    score += min(engagement_rate * 10, 50)
-    if verified: score += 20
-    if domain_match: score += 30
-    return round(min(score, 100), 2)
-
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
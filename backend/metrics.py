@@ -0,0 +1,274 @@
+"""
+In-process metrics in the Prometheus text format, served on /api/v1/metrics.
+
+Request latency is recorded per route template by MetricsMiddleware; every
+query run through get_db_cursor/get_async_db_cursor is counted and timed
+(database.py), and summed per request, so a route's queries-per-request and
+DB-time-per-request histograms show which service call is heavy on the
+database. Pool gauges are read at scrape time from collectors registered
+with register_collector().
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label value for requests that didn't match a route, so unknown paths can't
+# create unbounded label sets
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple((name, str(labels.get(name, ""))) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self.samples()
+        ]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(float(bound))))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Registers a callback that refreshes gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route, until the body is sent", ("method", "route")))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests being handled"))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Database queries run while handling one request", ("route",), QUERY_COUNT_BUCKETS))
+db_time_per_request_seconds = registry.register(Histogram(
+    "db_time_per_request_seconds", "Time spent in database queries while handling one request", ("route",)))
+db_connection_held_seconds = registry.register(Histogram(
+    "db_connection_held_seconds", "How long a request held its pooled connection", ("route",)))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "Database queries by pool", ("pool",)))
+db_query_errors_total = registry.register(Counter(
+    "db_query_errors_total", "Database queries that raised, by pool", ("pool",)))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "Database query latency by pool", ("pool",)))
+db_pool_acquire_seconds = registry.register(Histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pool connection", ("pool",)))
+db_pool_exhausted_total = registry.register(Counter(
+    "db_pool_exhausted_total", "Connection requests that found no free connection", ("pool",)))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Pool connections by state (in_use, idle, max)", ("pool", "state")))
+db_pool_requests_waiting = registry.register(Gauge(
+    "db_pool_requests_waiting", "Callers currently queued for a pool connection", ("pool",)))
+
+
+class RequestMetrics:
+    """Database work attributed to the request being handled."""
+    __slots__ = ("queries", "db_time", "connection_held")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.connection_held = 0.0
+
+
+current_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+
+def observe_query(pool: str, seconds: float, failed: bool = False):
+    db_queries_total.inc(pool=pool)
+    db_query_duration_seconds.observe(seconds, pool=pool)
+    if failed:
+        db_query_errors_total.inc(pool=pool)
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.queries += 1
+        request_metrics.db_time += seconds
+
+
+def observe_connection_held(seconds: float):
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.connection_held += seconds
+
+
+def register_collector(collector: Callable[[], None]):
+    registry.register_collector(collector)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing each request until its last body chunk is
+    sent, labelled by route template (/api/creator/inbox/{email_id}) rather
+    than the raw path. Add it outside RequestContextMiddleware so connection
+    hold time is attributed to the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_metrics.reset(token)
+            http_requests_in_progress.dec()
+
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests_total.inc(method=method, route=route, status=str(status))
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            db_queries_per_request.observe(request_metrics.queries, route=route)
+            db_time_per_request_seconds.observe(request_metrics.db_time, route=route)
+            if request_metrics.connection_held:
+                db_connection_held_seconds.observe(request_metrics.connection_held, route=route)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from request_context import outside_request_context
+from services.collaboration_service import AsyncCollaborationService
+
+load_dotenv()
+
+# Channel the notifications trigger (18_notification_push.sql) notifies on,
+# with the user id as payload
+NOTIFICATIONS_CHANNEL = "notifications_created"
+
+# Comment line sent on an idle stream so proxies keep it open and a dead
+# client is noticed
+NOTIFICATION_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "15"))
+# Rows per catch-up read
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))
+# Client reconnect delay sent in the stream's `retry:` field
+NOTIFICATION_RETRY_MS = 3000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class NotificationHub:
+    """
+    Server-sent event streams of each user's notifications, woken by the
+    worker's one LISTEN connection (listener.py). NOTIFY only says which user
+    has something new; each stream then reads the notifications after the
+    last sequence number it sent, so nothing is lost while a client is
+    disconnected (it resumes from Last-Event-ID) or while the listener is
+    (every stream re-reads after a reconnect). Streams hold no database
+    connection while they wait.
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, Set[asyncio.Event]] = {}
+
+    def attach(self, listener):
+        """Subscribes to new notifications; call before listener.start()."""
+        listener.subscribe(NOTIFICATIONS_CHANNEL, self.wake_user)
+        listener.on_reconnect(self.wake_all)
+
+    async def wake_user(self, user_id: str):
+        for wake in self._streams.get(user_id, ()):
+            wake.set()
+
+    async def wake_all(self):
+        for streams in self._streams.values():
+            for wake in streams:
+                wake.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._streams),
+            "streams": sum(len(streams) for streams in self._streams.values())
+        }
+
+    @staticmethod
+    def _event(row: Dict[str, Any]) -> str:
+        return f"id: {row['seq']}\nevent: notification\ndata: {json.dumps(row, default=_json_default)}\n\n"
+
+    async def stream(self, user_id: str, after_seq: Optional[int]) -> AsyncIterator[str]:
+        """
+        The user's notifications after `after_seq` (the last event id the
+        client saw), then each new one as it is created. Without `after_seq`
+        the stream starts at the user's latest notification.
+        """
+        wake = asyncio.Event()
+        self._streams.setdefault(user_id, set()).add(wake)
+        try:
+            yield f"retry: {NOTIFICATION_RETRY_MS}\n\n"
+            if after_seq is None:
+                async with outside_request_context():
+                    after_seq = await AsyncCollaborationService.get_latest_notification_seq(user_id)
+
+            while True:
+                # Cleared before reading: a NOTIFY that arrives during the
+                # read wakes the next iteration instead of being lost
+                wake.clear()
+                async with outside_request_context():
+                    rows = await AsyncCollaborationService.get_notifications_after(
+                        user_id, after_seq, NOTIFICATION_BATCH_SIZE
+                    )
+                for row in rows:
+                    yield self._event(row)
+                    after_seq = row['seq']
+                if len(rows) == NOTIFICATION_BATCH_SIZE:
+                    continue
+
+                try:
+                    await asyncio.wait_for(wake.wait(), NOTIFICATION_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            streams = self._streams.get(user_id)
+            if streams is not None:
+                streams.discard(wake)
+                if not streams:
+                    del self._streams[user_id]
+
+
+hub = NotificationHub()
@@ -0,0 +1,219 @@
+"""
+Prepared-statement benchmark for the registered queries (query_registry).
+
+Runs each query against the seeded database on one connection, first as
+plain statements (parsed and planned on every call) and then prepared
+(planned once, executed by handle), and reports the server's planning time
+next to the per-call latency of both.
+
+Usage:
+    python query_benchmark.py                        # 200 calls per query
+    python query_benchmark.py --iterations 1000 --only analytics.bundle,trends.series
+    python query_benchmark.py --output prepared.json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+
+from database import get_connection_params
+from query_registry import QUERIES
+# Imported for their register_query() calls
+from services.analytics_service import DATE_RANGE_DAYS
+from services.trends_service import TrendsService
+from services.collaboration_service import CollaborationService, DEFAULT_INBOX_LIMIT
+from notification_stream import NOTIFICATION_BATCH_SIZE
+import services.recommendations_service  # noqa: F401
+import services.insights_service  # noqa: F401
+
+FIXTURE_COUNT = 20
+# Executions before psycopg prepares a statement on its own; high enough that
+# only prepare=True does (None would disable prepare=True as well)
+NO_AUTO_PREPARE = 10 ** 9
+PLANNING_TIME = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def _window_start() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=DATE_RANGE_DAYS['30d'])
+
+
+# Parameters for each registered query from the fixtures, for call number i
+PARAM_BUILDERS: Dict[str, Callable[[Dict[str, List[Any]], int], Any]] = {
+    "analytics.follower_snapshots": lambda f, i: (f["creator_ids"][i],),
+    "analytics.follower_timeline": lambda f, i: (f["creator_ids"][i],),
+    "analytics.total_views": lambda f, i: (f["creator_ids"][i],),
+    "analytics.posting_heatmap": lambda f, i: (f["creator_ids"][i],),
+    "analytics.rollup_overview": lambda f, i: {"creator_id": f["creator_ids"][i], "platform": None},
+    "analytics.rollup_platform_breakdown": lambda f, i: {"creator_id": f["creator_ids"][i]},
+    "analytics.bundle": lambda f, i: [f["creator_ids"][i]],
+    "analytics.bundle_window": lambda f, i: [f["creator_ids"][i], _window_start()],
+    "analytics.bundle_platform": lambda f, i: [f["creator_ids"][i], f["platforms"][i]],
+    "analytics.bundle_platform_window": lambda f, i: [f["creator_ids"][i], f["platforms"][i], _window_start()],
+    "trends.series": lambda f, i: TrendsService._series_params(f["creator_ids"][i], 7, 2),
+    "trends.rollup_series": lambda f, i: TrendsService._series_params(f["creator_ids"][i], 7, 2),
+    "collaboration.inbox": lambda f, i: CollaborationService._inbox_params(f["user_ids"][i], DEFAULT_INBOX_LIMIT, None),
+    "collaboration.inbox_counts": lambda f, i: (f["user_ids"][i],),
+    "collaboration.notifications": lambda f, i: (f["user_ids"][i],),
+    "collaboration.notifications_after": lambda f, i: {"user_id": f["user_ids"][i], "after_seq": 0, "limit": NOTIFICATION_BATCH_SIZE},
+    "collaboration.latest_notification_seq": lambda f, i: (f["user_ids"][i],),
+    "collaboration.email_detail": lambda f, i: {"email_id": f["email_ids"][i]},
+    "rankings.creator_stats": lambda f, i: (f["creator_ids"][i],),
+    "recommendations.active": lambda f, i: (f["creator_ids"][i],),
+    "insights.active": lambda f, i: (f["creator_ids"][i],),
+}
+
+FIXTURES_QUERY = """
+    SELECT creator_id, platform
+    FROM posts_master
+    GROUP BY creator_id, platform
+    ORDER BY COUNT(*) DESC
+    LIMIT %s
+"""
+
+INBOX_FIXTURES_QUERY = """
+    SELECT receiver_user_id, email_id
+    FROM emails
+    ORDER BY created_at DESC
+    LIMIT %s
+"""
+
+CREATOR_USERS_QUERY = "SELECT user_id FROM creators ORDER BY creator_id LIMIT %s"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prepared vs. unprepared execution of the registered queries")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per query and mode")
+    parser.add_argument("--only", default=None, help="Comma-separated query names to run")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def _cycle(values: List[Any]) -> List[Any]:
+    """Fixture lists padded to FIXTURE_COUNT so call i can index them."""
+    return [values[i % len(values)] for i in range(FIXTURE_COUNT)] if values else []
+
+
+def discover_fixtures(conn) -> Dict[str, List[Any]]:
+    cursor = conn.cursor()
+    cursor.execute(FIXTURES_QUERY, (FIXTURE_COUNT,))
+    creator_rows = cursor.fetchall()
+    cursor.execute(INBOX_FIXTURES_QUERY, (FIXTURE_COUNT,))
+    inbox_rows = cursor.fetchall()
+    cursor.execute(CREATOR_USERS_QUERY, (FIXTURE_COUNT,))
+    user_rows = cursor.fetchall()
+    return {
+        "creator_ids": _cycle([row['creator_id'] for row in creator_rows]),
+        "platforms": _cycle([row['platform'] for row in creator_rows]),
+        # Inbox owners first, so the inbox queries return rows
+        "user_ids": _cycle([row['receiver_user_id'] for row in inbox_rows] + [row['user_id'] for row in user_rows]),
+        "email_ids": _cycle([row['email_id'] for row in inbox_rows]),
+    }
+
+
+def planning_ms(conn, query: str, params) -> float:
+    """Server-side planning time of one unprepared execution."""
+    cursor = conn.cursor()
+    cursor.execute("EXPLAIN (SUMMARY) " + query, params, prepare=False)
+    for row in cursor.fetchall():
+        match = PLANNING_TIME.search(next(iter(row.values())))
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+def time_calls(conn, query: str, params_for: Callable[[int], Any], iterations: int, prepare: bool) -> float:
+    """Mean milliseconds per call, fetching every row."""
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    for i in range(iterations):
+        cursor.execute(query, params_for(i % FIXTURE_COUNT), prepare=prepare)
+        cursor.fetchall()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def benchmark_query(conn, name: str, fixtures: Dict[str, List[Any]], iterations: int) -> Dict[str, Any]:
+    query = QUERIES[name]
+    builder = PARAM_BUILDERS[name]
+
+    def params_for(i):
+        return builder(fixtures, i)
+
+    # Warm the buffer cache so both modes read the same pages
+    time_calls(conn, query, params_for, min(iterations, FIXTURE_COUNT), prepare=False)
+    plan_ms = sum(planning_ms(conn, query, params_for(i)) for i in range(5)) / 5
+    plain_ms = time_calls(conn, query, params_for, iterations, prepare=False)
+    prepared_ms = time_calls(conn, query, params_for, iterations, prepare=True)
+    saved_ms = plain_ms - prepared_ms
+    return {
+        "query": name,
+        "planning_ms": round(plan_ms, 3),
+        "plain_ms": round(plain_ms, 3),
+        "prepared_ms": round(prepared_ms, 3),
+        "saved_ms": round(saved_ms, 3),
+        "saved_pct": round(saved_ms / plain_ms * 100, 1) if plain_ms else 0.0
+    }
+
+
+def select_queries(only: Optional[str]) -> List[str]:
+    names = [name for name in QUERIES if name in PARAM_BUILDERS]
+    if not only:
+        return names
+    selected = [name.strip() for name in only.split(",") if name.strip()]
+    unknown = set(selected) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown queries: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def print_results(results: List[Dict[str, Any]], iterations: int):
+    print(f"\n📊 {iterations} calls per query and mode (ms per call)\n")
+    print(f"{'query':<36} {'planning':>9} {'plain':>9} {'prepared':>9} {'saved':>9} {'saved %':>8}")
+    for result in results:
+        print(f"{result['query']:<36} {result['planning_ms']:>9.3f} {result['plain_ms']:>9.3f} "
+              f"{result['prepared_ms']:>9.3f} {result['saved_ms']:>9.3f} {result['saved_pct']:>7.1f}%")
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        names = select_queries(args.only)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    skipped = sorted(set(QUERIES) - set(PARAM_BUILDERS))
+    if skipped:
+        print(f"⚠️  No parameters for {', '.join(skipped)}; skipped")
+
+    with psycopg.connect(make_conninfo(**get_connection_params()), row_factory=dict_row,
+                         prepare_threshold=NO_AUTO_PREPARE, autocommit=True) as conn:
+        fixtures = discover_fixtures(conn)
+        if not fixtures["creator_ids"]:
+            print("❌ No posts found; seed the database first (python seed_sql.py)")
+            return 2
+
+        results = []
+        for name in names:
+            if not fixtures["email_ids"] and name == "collaboration.email_detail":
+                print(f"⚠️  No emails; skipping {name}")
+                continue
+            print(f"⏱️  {name}...")
+            results.append(benchmark_query(conn, name, fixtures, args.iterations))
+
+    print_results(results, args.iterations)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"iterations": args.iterations, "results": results}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Named SQL for the hot service queries.
+
+A registered query is still a str, so it runs wherever plain SQL does; the
+cursors from get_async_db_cursor prepare it server-side the first time a
+connection runs it and execute the prepared statement from then on, skipping
+parse and planning (psycopg keeps the per-connection handles). Statements
+run by the sync pool are sent as plain SQL.
+"""
+from typing import Dict
+
+
+class NamedQuery(str):
+    """SQL text with the name it is registered under."""
+
+    def __new__(cls, name: str, sql: str):
+        query = super().__new__(cls, sql)
+        query.name = name
+        return query
+
+
+QUERIES: Dict[str, NamedQuery] = {}
+
+
+def register_query(name: str, sql: str) -> NamedQuery:
+    if name in QUERIES and QUERIES[name] != sql:
+        raise ValueError(f"Query '{name}' is already registered with different SQL")
+    QUERIES[name] = NamedQuery(name, sql)
+    return QUERIES[name]
+
+
+def get_query(name: str) -> NamedQuery:
+    return QUERIES[name]
@@ -0,0 +1,276 @@
+"""
+Slow-query tracing for the cursors handed out by database.py.
+
+Every statement is timed and tagged with the service method that ran it
+(AnalyticsService.get_posting_time_analysis, ...); stats are kept per
+normalized statement. A statement slower than SLOW_QUERY_THRESHOLD_MS is
+added to a bounded ring buffer and, for a sample of them, its plan is
+captured with EXPLAIN (ANALYZE, BUFFERS) on the same connection. Served on
+/api/v1/debug/slow-queries.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUERY_TRACE_ENABLED = os.getenv("QUERY_TRACE_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# Share of slow statements that get an EXPLAIN; ANALYZE runs the query again
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.2"))
+# At most one captured plan per statement in this window
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+# Distinct normalized statements tracked; new ones past this are ignored
+MAX_TRACKED_STATEMENTS = 1000
+
+# Frames in these modules are skipped when looking for the calling method
+_INTERNAL_MODULES = frozenset({__name__, "database", "contextlib"})
+_MAX_CALLER_DEPTH = 40
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|VALUES|INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|INTO)\b", re.IGNORECASE)
+
+EXPLAIN_SAVEPOINT = "query_trace_explain"
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement text with literals replaced by ? and whitespace collapsed."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def explain_statement(statement: str, analyze: bool = True) -> str:
+    """
+    EXPLAIN prefix for a statement: ANALYZE (which executes it again) only for
+    plain reads, so a traced write is never applied twice.
+    """
+    if analyze and _READ_ONLY.match(statement) and not _WRITES.search(statement):
+        return "EXPLAIN (ANALYZE, BUFFERS) " + statement
+    return "EXPLAIN " + statement
+
+
+def calling_method() -> str:
+    """
+    The service method that issued the current statement, e.g.
+    "analytics_service.AnalyticsService.get_posting_time_analysis", or the
+    first frame outside the database layer when no service is involved.
+    Coroutine frames chain through their awaiting callers, so this works for
+    the async services too.
+    """
+    frame = sys._getframe(1)
+    fallback = None
+    depth = 0
+    while frame is not None and depth < _MAX_CALLER_DEPTH:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("services."):
+            return f"{module[len('services.'):]}.{frame.f_code.co_qualname}"
+        if fallback is None and module not in _INTERNAL_MODULES:
+            fallback = f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+        depth += 1
+    return fallback or "unknown"
+
+
+class StatementStats:
+    __slots__ = ("statement", "calls", "errors", "total_seconds", "max_seconds", "slow_calls", "callers", "plan", "plan_captured_at")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_calls = 0
+        self.callers: Dict[str, int] = {}
+        self.plan: Optional[str] = None
+        self.plan_captured_at = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "callers": dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+            "plan": self.plan
+        }
+
+
+class SlowQuery:
+    """One slow execution kept in the ring buffer."""
+    __slots__ = ("statement", "caller", "duration_ms", "occurred_at", "plan")
+
+    def __init__(self, statement: str, caller: str, duration_ms: float):
+        self.statement = statement
+        self.caller = caller
+        self.duration_ms = duration_ms
+        self.occurred_at = datetime.now(timezone.utc)
+        self.plan: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "caller": self.caller,
+            "duration_ms": round(self.duration_ms, 3),
+            "occurred_at": self.occurred_at.isoformat(),
+            "plan": self.plan
+        }
+
+
+class QueryTracer:
+    def __init__(self, threshold_ms: float, sample_rate: float, explain_interval: float, buffer_size: int):
+        self.threshold_seconds = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain_interval = explain_interval
+        self._statements: Dict[str, StatementStats] = {}
+        self._slow_queries: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, failed: bool = False, explainable: bool = True) -> Optional[SlowQuery]:
+        """
+        Records one execution. Returns the buffered SlowQuery when the caller
+        should capture its plan (slow, explainable, sampled and no recent plan
+        for the statement), otherwise None.
+        """
+        normalized = normalize_statement(statement)
+        caller = calling_method()
+        slow = seconds >= self.threshold_seconds
+        with self._lock:
+            stats = self._statements.get(normalized)
+            if stats is None:
+                if len(self._statements) >= MAX_TRACKED_STATEMENTS:
+                    return None
+                stats = self._statements[normalized] = StatementStats(normalized)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+            if failed:
+                stats.errors += 1
+                return None
+            if not slow:
+                return None
+
+            stats.slow_calls += 1
+            slow_query = SlowQuery(normalized, caller, seconds * 1000)
+            self._slow_queries.append(slow_query)
+            if not explainable or not _EXPLAINABLE.match(normalized):
+                return None
+
+            now = time.monotonic()
+            if stats.plan_captured_at and now - stats.plan_captured_at < self.explain_interval:
+                return None
+            if random.random() >= self.sample_rate:
+                return None
+            # Claimed now so concurrent slow runs don't all EXPLAIN
+            stats.plan_captured_at = now
+            return slow_query
+
+    def attach_plan(self, slow_query: SlowQuery, plan: str):
+        slow_query.plan = plan
+        with self._lock:
+            stats = self._statements.get(slow_query.statement)
+            if stats is not None:
+                stats.plan = plan
+
+    def slowest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Normalized statements ordered by their slowest execution."""
+        with self._lock:
+            statements = sorted(self._statements.values(), key=lambda s: s.max_seconds, reverse=True)
+            return [stats.to_dict() for stats in statements[:limit]]
+
+    def recent_slow(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [slow_query.to_dict() for slow_query in list(self._slow_queries)[-limit:][::-1]]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow_queries.clear()
+
+
+tracer = QueryTracer(
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+    SLOW_QUERY_BUFFER_SIZE
+)
+
+
+def format_plan(rows) -> str:
+    return "\n".join(row[0] for row in rows)
+
+
+def explain_sync(connection, statement: str, params) -> str:
+    """
+    EXPLAIN on a psycopg2 connection. Inside a transaction it runs in a
+    savepoint that is always rolled back, undoing whatever the re-executed
+    statement did (a SELECT can still call a function that writes) and
+    keeping a failed EXPLAIN from aborting the caller's work. Outside one it
+    is a plain EXPLAIN without ANALYZE.
+    """
+    cursor = connection.cursor()
+    in_transaction = not connection.autocommit
+    try:
+        if in_transaction:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(explain_statement(statement, analyze=in_transaction), params)
+            return format_plan(cursor.fetchall())
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        finally:
+            if in_transaction:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+
+
+async def explain_async(cursor, statement: str, params) -> str:
+    """
+    explain_sync for psycopg 3, through a plain cursor (tuple rows, not
+    traced itself).
+    """
+    in_transaction = not cursor.connection.autocommit
+    try:
+        if in_transaction:
+            await cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            await cursor.execute(explain_statement(statement, analyze=in_transaction), params)
+            return format_plan(await cursor.fetchall())
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        finally:
+            if in_transaction:
+                await cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+                await cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        await cursor.close()
+
+
+def slow_query_report(limit: int = 20) -> Dict[str, Any]:
+    return {
+        "enabled": QUERY_TRACE_ENABLED,
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "explain_sample_rate": SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        "slowest_statements": tracer.slowest(limit),
+        "recent_slow_queries": tracer.recent_slow(limit)
+    }
@@ -0,0 +1,77 @@
+import copy
+import functools
+from contextlib import asynccontextmanager
+
+from database import RequestContext, current_request_context
+
+
+@asynccontextmanager
+async def request_context():
+    """
+    Scope in which all get_async_db_connection() calls share one connection
+    and memoized service calls run at most once per set of arguments.
+    Reentrant: an inner scope joins the outer one.
+    """
+    if current_request_context.get() is not None:
+        yield current_request_context.get()
+        return
+
+    context = RequestContext()
+    token = current_request_context.set(context)
+    try:
+        yield context
+    finally:
+        current_request_context.reset(token)
+        await context.release()
+
+
+class RequestContextMiddleware:
+    """
+    Plain ASGI middleware (not BaseHTTPMiddleware) so the context stays open
+    until the response body, including streamed bodies, has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        async with request_context():
+            await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def outside_request_context():
+    """
+    Scope in which get_async_db_connection() checks out and returns its own
+    pool connection, for long-lived responses (streams) that would otherwise
+    hold the request's connection until the client goes away.
+    """
+    token = current_request_context.set(None)
+    try:
+        yield
+    finally:
+        current_request_context.reset(token)
+
+
+def memoized(namespace: str):
+    """
+    Memoizes an async service call for the rest of the current request.
+    Callers get their own copy of the result. Outside a request context
+    this is a pass-through.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            context = current_request_context.get()
+            if context is None:
+                return await func(*args, **kwargs)
+
+            key = f"{namespace}:{args!r}:{sorted(kwargs.items())!r}"
+            if key not in context.memo:
+                context.memo[key] = await func(*args, **kwargs)
+            return copy.deepcopy(context.memo[key])
+        return wrapper
+    return decorator
@@ -0,0 +1,549 @@
+"""
+Deterministic synthetic data generator for load testing.
+
+Builds a dataset of any size from a scale factor and a fixed random seed and
+loads it with COPY. The same (seed, scale, anchor date) always produces the
+same rows, UUIDs included.
+
+    python seed_sql.py --generate --scale 10            # ~10k creators, ~10M posts
+    python seed_sql.py --generate --creators 500 --posts-per-creator 200 --seed 7
+
+Distributions are skewed the way real platforms are: follower counts are
+Pareto (a few creators hold most of the audience), posting volume and reach
+are log-normal, posts cluster in recent weeks and evening hours, and
+businesses contact popular creators more often.
+"""
+import csv
+import io
+import json
+import math
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+COPY_BATCH_ROWS = 50000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+CREATORS_PER_SCALE = 1000
+DEFAULT_POSTS_PER_CREATOR = 1000
+DEFAULT_HISTORY_DAYS = 365
+# Posts this recent also get a `content` row and engagement snapshots
+SNAPSHOT_WINDOW_DAYS = 14
+SNAPSHOT_OFFSETS_HOURS = (1, 6, 24, 72, 168)
+SNAPSHOT_CURVE = (0.15, 0.45, 0.75, 0.92, 1.0)
+
+PLATFORMS = ('instagram', 'youtube', 'tiktok', 'facebook')
+PLATFORM_CONTENT_TYPES = {
+    'instagram': (('reel', 'carousel', 'static', 'video'), (45, 25, 25, 5)),
+    'youtube': (('video', 'short'), (60, 40)),
+    'tiktok': (('short', 'video'), (85, 15)),
+    'facebook': (('video', 'static', 'reel', 'carousel'), (40, 30, 20, 10))
+}
+# posts_master content types mapped onto the `content` table's vocabulary
+CONTENT_TABLE_TYPES = {'reel': 'reel', 'carousel': 'carousel', 'static': 'post', 'video': 'video', 'short': 'short'}
+# Median reach is 30% of followers before the content-type multiplier
+LOG_REACH = math.log(0.3)
+REACH_MULTIPLIER = {'reel': 1.6, 'short': 1.5, 'video': 1.2, 'carousel': 0.9, 'static': 0.7}
+# Relative posting volume per hour of day (local time), peaking in the evening
+HOUR_WEIGHTS = (2, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 7, 8, 7, 6, 6, 7, 8, 10, 12, 12, 10, 7, 4)
+CATEGORIES = (
+    'fitness', 'wellness', 'nutrition', 'food', 'travel', 'lifestyle', 'technology', 'reviews',
+    'gadgets', 'beauty', 'fashion', 'makeup', 'adventure', 'photography', 'gaming', 'esports',
+    'finance', 'investment', 'business', 'yoga', 'mindfulness', 'art', 'design', 'music', 'comedy', 'education'
+)
+INDUSTRIES = ('Consumer Electronics', 'Health & Wellness', 'Fashion & Apparel', 'Food & Beverage', 'Travel', 'Finance', 'Gaming')
+
+
+def _to_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _copy_csv(conn, table: str, columns, data: str):
+    cursor = conn.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", io.StringIO(data))
+    cursor.close()
+
+
+class _BackgroundCopier:
+    """
+    Runs COPYs on a worker thread so the next batch is generated while the
+    server ingests the previous one (psycopg2 releases the GIL while waiting).
+    Batches are copied in submission order.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=4)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def submit(self, table: str, columns, rows):
+        if self.error:
+            raise self.error
+        if rows:
+            self.queue.put((table, columns, _to_csv(rows)))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is None:
+                try:
+                    _copy_csv(self.conn, *item)
+                except Exception as e:
+                    self.error = e
+
+    def __exit__(self, exc_type, exc, tb):
+        self.queue.put(None)
+        self.thread.join()
+        if exc_type is None and self.error:
+            raise self.error
+
+
+class SyntheticDataGenerator:
+    def __init__(self, conn, seed: int = 42, creators: int = CREATORS_PER_SCALE,
+                 posts_per_creator: int = DEFAULT_POSTS_PER_CREATOR,
+                 history_days: int = DEFAULT_HISTORY_DAYS, anchor: date = None):
+        self.conn = conn
+        self.rng = random.Random(seed)
+        self.creator_count = creators
+        self.business_count = max(3, creators // 50)
+        self.total_posts = creators * posts_per_creator
+        self.history_days = history_days
+        # Every timestamp is relative to the start of the anchor day (UTC)
+        anchor = anchor or datetime.now(timezone.utc).date()
+        self.anchor = datetime.combine(anchor, time(0), tzinfo=timezone.utc)
+        self.hour_cum_weights = self._cum_weights(HOUR_WEIGHTS)
+
+        cursor = conn.cursor()
+        cursor.execute("SHOW TimeZone")
+        # post_hour/post_day match what the derived-field trigger would compute;
+        # None means UTC, which takes a fast path
+        server_tz = cursor.fetchone()[0]
+        self.local_tz = None if server_tz in ('UTC', 'Etc/UTC', 'GMT') else ZoneInfo(server_tz)
+        cursor.execute("SELECT lower(platform_name), platform_id FROM platforms")
+        self.platform_ids = dict(cursor.fetchall())
+        cursor.close()
+
+        self.creators = []
+        self.businesses = []
+        self._creator_cum_weights = None
+        self._day_prefixes = {}
+
+    @staticmethod
+    def _cum_weights(weights):
+        total, cumulative = 0, []
+        for w in weights:
+            total += w
+            cumulative.append(total)
+        return cumulative
+
+    def _uuid(self) -> str:
+        # Formatted by hand; uuid.UUID() is several times slower at this volume
+        h = '%032x' % self.rng.getrandbits(128)
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def _timestamp(self, ts: int) -> str:
+        """
+        UTC timestamp literal for epoch seconds; formatted by hand with the
+        date part cached, since datetime formatting dominates at 10M+ rows.
+        """
+        day, seconds = divmod(ts, 86400)
+        prefix = self._day_prefixes.get(day)
+        if prefix is None:
+            prefix = self._day_prefixes[day] = date.fromordinal(EPOCH_ORDINAL + day).isoformat()
+        return f"{prefix} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}+00"
+
+    def _local_parts(self, ts: int):
+        """
+        (hour, day of week with Sunday = 0, day number) in the server's time zone,
+        as the derived-field trigger would compute them.
+        """
+        if self.local_tz is not None:
+            local = datetime.fromtimestamp(ts, self.local_tz)
+            return local.hour, (local.weekday() + 1) % 7, local.toordinal() - EPOCH_ORDINAL
+        day, seconds = divmod(ts, 86400)
+        # 1970-01-01 was a Thursday
+        return seconds // 3600, (day + 4) % 7, day
+
+    def _copy(self, table: str, columns, rows):
+        if rows:
+            _copy_csv(self.conn, table, columns, _to_csv(rows))
+
+    @contextmanager
+    def _bulk_load(self, table: str):
+        """
+        Drops the table's secondary indexes, foreign keys and user triggers for
+        the load and restores them afterwards; building an index or validating
+        a foreign key once is far cheaper than doing it row by row.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        """, (table,))
+        foreign_keys = cursor.fetchall()
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+        cursor.execute("""
+            SELECT i.indexname, i.indexdef
+            FROM pg_indexes i
+            WHERE i.schemaname = current_schema() AND i.tablename = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c
+                WHERE c.conindid = format('%%I.%%I', i.schemaname, i.indexname)::regclass
+            )
+        """, (table,))
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+        cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+        # On failure the transaction rolls back, restoring indexes and triggers
+        yield
+        cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+        for _, definition in indexes:
+            # Partitioned indexes are reported as ON ONLY, which would create the
+            # parent index without building it on the partitions
+            cursor.execute(definition.replace(" ON ONLY ", " ON ", 1))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+        cursor.close()
+
+    # --- Entities ---
+
+    def generate_creators(self):
+        print(f"👥 Generating {self.creator_count} creators...")
+        rng = self.rng
+        users, creators = [], []
+        for i in range(self.creator_count):
+            user_id, creator_id = self._uuid(), self._uuid()
+            # Pareto with alpha ~1.16 gives the 80/20 split of audience
+            followers = min(int(1000 * rng.paretovariate(1.16)), 200_000_000)
+            primary = rng.choices(PLATFORMS, weights=(40, 25, 25, 10))[0]
+            others = [p for p in PLATFORMS if p != primary]
+            platforms = [primary] + rng.sample(others, rng.choices((0, 1, 2), weights=(50, 35, 15))[0])
+            categories = rng.sample(CATEGORIES, 3)
+            # Bigger accounts engage proportionally less
+            engagement_rate = min(0.25, rng.lognormvariate(math.log(0.045), 0.45) * (followers / 1000) ** -0.08)
+
+            username = f"creator_{i:07d}"
+            users.append((user_id, username, 'creator', f"{username}@example.com", f"Creator {i}"))
+            creators.append((
+                creator_id, user_id, f"{categories[0].title()} creator on {primary}",
+                self.platform_ids[primary], "{" + ",".join(categories) + "}",
+                followers > 100_000 or rng.random() < 0.05
+            ))
+            self.creators.append({
+                'creator_id': creator_id,
+                'user_id': user_id,
+                'followers': followers,
+                'platforms': platforms,
+                'platform_weights': [60] + [40 / max(1, len(platforms) - 1)] * (len(platforms) - 1),
+                'categories': categories,
+                'engagement_rate': engagement_rate
+            })
+
+        self._copy("users", ("user_id", "username", "user_type", "email", "display_name"), users)
+        self._copy("creators", ("creator_id", "user_id", "bio", "primary_platform", "content_categories", "verified"), creators)
+        self.conn.commit()
+        print(f"✅ {self.creator_count} creators\n")
+
+    def generate_businesses(self):
+        print(f"🏢 Generating {self.business_count} businesses...")
+        rng = self.rng
+        users, businesses = [], []
+        for i in range(self.business_count):
+            user_id, business_id = self._uuid(), self._uuid()
+            username = f"business_{i:06d}"
+            company_name = f"Company {i}"
+            users.append((user_id, username, 'business', f"{username}@example.com", f"{company_name} Team"))
+            businesses.append((
+                business_id, user_id, company_name, rng.choice(INDUSTRIES),
+                f"https://company{i}.example.com", "Synthetic target audience"
+            ))
+            self.businesses.append({'business_id': business_id, 'user_id': user_id, 'company_name': company_name})
+
+        self._copy("users", ("user_id", "username", "user_type", "email", "display_name"), users)
+        self._copy("businesses", ("business_id", "user_id", "company_name", "industry", "website", "target_audience_description"), businesses)
+        self.conn.commit()
+        print(f"✅ {self.business_count} businesses\n")
+
+    # --- Posts, content and engagement snapshots ---
+
+    def _posts_per_creator(self):
+        """
+        Log-normal posting volume, scaled so the total is exactly total_posts.
+        """
+        weights = [self.rng.lognormvariate(0, 1.0) for _ in self.creators]
+        scale = self.total_posts / sum(weights)
+        counts = [int(w * scale) for w in weights]
+        for i in range(self.total_posts - sum(counts)):
+            counts[i % len(counts)] += 1
+        return counts
+
+    def generate_posts(self):
+        print(f"📝 Generating {self.total_posts:,} posts...")
+        rng = self.rng
+        anchor_ts = int(self.anchor.timestamp())
+        anchor_day = self._local_parts(anchor_ts)[2]
+        # Recency skew: mean post age a quarter of the history window
+        mean_age_days = self.history_days / 4
+        hours = range(24)
+        content_type_weights = {
+            platform: (types, self._cum_weights(weights))
+            for platform, (types, weights) in PLATFORM_CONTENT_TYPES.items()
+        }
+
+        post_columns = (
+            "post_id", "platform", "external_id", "creator_id", "account_type", "caption_text",
+            "content_type", "post_datetime", "post_hour", "post_day", "days_since_post",
+            "views", "impressions", "likes", "comments", "shares", "followers_at_post"
+        )
+        content_columns = (
+            "content_id", "creator_id", "platform_id", "external_content_id", "content_type",
+            "category", "title", "posted_at", "day_of_week", "hour_of_day"
+        )
+        snapshot_columns = ("snapshot_id", "content_id", "snapshot_at", "views", "likes", "comments", "shares", "saves")
+
+        posts, contents, snapshots = [], [], []
+        post_number = 0
+        loaded = 0
+
+        # Monthly partitions for the whole history, so nothing lands in the default partitions
+        cursor = self.conn.cursor()
+        for table in ("posts_master", "content_engagement_snapshots"):
+            cursor.execute(
+                "SELECT create_monthly_partitions(%s, %s, %s)",
+                (table, self.anchor - timedelta(days=self.history_days + 1), self.anchor)
+            )
+        cursor.close()
+
+        with self._bulk_load("posts_master"), self._bulk_load("content"), \
+                self._bulk_load("content_engagement_snapshots"), _BackgroundCopier(self.conn) as copier:
+
+            def flush():
+                copier.submit("posts_master", post_columns, posts)
+                copier.submit("content", content_columns, contents)
+                copier.submit("content_engagement_snapshots", snapshot_columns, snapshots)
+                posts.clear()
+                contents.clear()
+                snapshots.clear()
+
+            for creator, count in zip(self.creators, self._posts_per_creator()):
+                creator_id = creator['creator_id']
+                followers = creator['followers']
+                er = creator['engagement_rate']
+                platforms = rng.choices(creator['platforms'], weights=creator['platform_weights'], k=count)
+                post_hours = rng.choices(hours, cum_weights=self.hour_cum_weights, k=count)
+
+                for platform, hour in zip(platforms, post_hours):
+                    post_number += 1
+                    types, type_cum_weights = content_type_weights[platform]
+                    content_type = rng.choices(types, cum_weights=type_cum_weights)[0]
+
+                    age_days = min(rng.expovariate(1 / mean_age_days), self.history_days - 1)
+                    posted_ts = anchor_ts - (int(age_days) + 1) * 86400 + hour * 3600 + rng.randrange(3600)
+                    posted_at = self._timestamp(posted_ts)
+                    local_hour, local_dow, local_day = self._local_parts(posted_ts)
+
+                    views = max(1, int(followers * rng.lognormvariate(LOG_REACH, 0.9) * REACH_MULTIPLIER[content_type]))
+                    likes = int(views * er * rng.lognormvariate(0, 0.3))
+                    comments = int(likes * (0.02 + 0.06 * rng.random()))
+                    shares = int(likes * (0.01 + 0.05 * rng.random()))
+                    external_id = f"gen-{post_number}"
+                    category = creator['categories'][post_number % 3]
+                    caption = f"{content_type.title()} about {category}"
+
+                    posts.append((
+                        self._uuid(), platform, external_id, creator_id, 'creator', caption, content_type,
+                        posted_at, local_hour, local_dow, anchor_day - local_day,
+                        views, int(views * (1.1 + 0.5 * rng.random())), likes, comments, shares, followers
+                    ))
+
+                    if age_days < SNAPSHOT_WINDOW_DAYS:
+                        content_id = self._uuid()
+                        contents.append((
+                            content_id, creator_id, self.platform_ids[platform], external_id,
+                            CONTENT_TABLE_TYPES[content_type], category, caption,
+                            posted_at, local_dow, local_hour
+                        ))
+                        for offset, share in zip(SNAPSHOT_OFFSETS_HOURS, SNAPSHOT_CURVE):
+                            snapshot_ts = posted_ts + offset * 3600
+                            if snapshot_ts >= anchor_ts:
+                                break
+                            snapshots.append((
+                                self._uuid(), content_id, self._timestamp(snapshot_ts),
+                                int(views * share), int(likes * share), int(comments * share), int(shares * share),
+                                int(likes * share * 0.1)
+                            ))
+
+                if len(posts) >= COPY_BATCH_ROWS:
+                    loaded += len(posts)
+                    flush()
+                    print(f"   ✓ {loaded:,} posts")
+
+            loaded += len(posts)
+            flush()
+
+        # The heatmap and external id triggers were disabled for the load
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT rebuild_posting_heatmap()")
+        cursor.execute("SELECT rebuild_posts_external_ids()")
+        cursor.close()
+        self.conn.commit()
+        print(f"✅ {loaded:,} posts\n")
+
+    def generate_follower_snapshots(self):
+        print("📈 Generating follower snapshots...")
+        rng = self.rng
+        rows = []
+        count = 0
+        weeks = max(1, self.history_days // 7)
+        columns = ("snapshot_id", "creator_id", "platform_id", "snapshot_at", "follower_count", "total_posts")
+
+        with self._bulk_load("follower_growth_snapshots"):
+            for creator in self.creators:
+                for platform, weight in zip(creator['platforms'], creator['platform_weights']):
+                    final = max(1, int(creator['followers'] * weight / 100))
+                    # Median 1% a week, fast growers up to 20%
+                    weekly_growth = min(0.2, rng.lognormvariate(math.log(0.01), 0.8))
+                    followers = final
+                    # Walk backwards from today's count
+                    for week in range(weeks):
+                        snapshot_at = self.anchor - timedelta(days=7 * week, hours=rng.randrange(24))
+                        rows.append((
+                            self._uuid(), creator['creator_id'], self.platform_ids[platform],
+                            snapshot_at.isoformat(), followers, 0
+                        ))
+                        followers = max(0, int(followers / (1 + weekly_growth * rng.uniform(0.5, 1.5))))
+                if len(rows) >= COPY_BATCH_ROWS:
+                    count += len(rows)
+                    self._copy("follower_growth_snapshots", columns, rows)
+                    rows.clear()
+            count += len(rows)
+            self._copy("follower_growth_snapshots", columns, rows)
+
+        self.conn.commit()
+        print(f"✅ {count:,} follower snapshots\n")
+
+    # --- Campaigns, events and outreach ---
+
+    def _popular_creators(self, k: int):
+        """
+        Samples distinct creators with probability proportional to followers.
+        """
+        if self._creator_cum_weights is None:
+            self._creator_cum_weights = self._cum_weights([c['followers'] for c in self.creators])
+        k = min(k, max(1, len(self.creators) // 2))
+        chosen = {}
+        while len(chosen) < k:
+            creator = self.rng.choices(self.creators, cum_weights=self._creator_cum_weights)[0]
+            chosen[creator['creator_id']] = creator
+        return list(chosen.values())
+
+    def generate_campaigns(self):
+        print("📣 Generating campaigns and events...")
+        rng = self.rng
+        anchor_date = self.anchor.date()
+        campaigns, members, events = [], [], []
+        event_columns = ("event_id", "campaign_id", "event_type", "event_at", "platform_id", "amount", "metadata")
+
+        for business in self.businesses:
+            for n in range(rng.choices((1, 2, 3, 4, 5), weights=(30, 30, 20, 12, 8))[0]):
+                campaign_id = self._uuid()
+                start = anchor_date - timedelta(days=rng.randrange(max(1, self.history_days)))
+                duration = rng.randint(14, 90)
+                end = start + timedelta(days=duration)
+                status = 'completed' if end < anchor_date else rng.choice(('active', 'active', 'paused'))
+                budget = round(rng.lognormvariate(math.log(10000), 1.0), 2)
+                campaigns.append((
+                    campaign_id, business['business_id'], f"{business['company_name']} campaign {n + 1}",
+                    start.isoformat(), end.isoformat(), budget, status
+                ))
+
+                for creator in self._popular_creators(rng.randint(2, 10)):
+                    members.append((
+                        campaign_id, creator['creator_id'],
+                        round(max(100.0, creator['followers'] * rng.uniform(0.005, 0.02)), 2),
+                        rng.randint(1, 6), 'completed' if status == 'completed' else 'active'
+                    ))
+
+                # Daily event stream until the campaign ends or today
+                daily_spend = budget / duration
+                platform_id = self.platform_ids[rng.choice(PLATFORMS)]
+                for day in range(min(duration, (anchor_date - start).days)):
+                    event_at = datetime.combine(start + timedelta(days=day), time(12), tzinfo=timezone.utc)
+                    impressions = int(rng.lognormvariate(math.log(20000), 0.8))
+                    clicks = int(impressions * rng.uniform(0.005, 0.03))
+                    conversions = int(clicks * rng.uniform(0.01, 0.08))
+                    for event_type, amount in (
+                        ('impression', impressions), ('click', clicks),
+                        ('conversion', conversions), ('spend', round(daily_spend * rng.uniform(0.7, 1.3), 2))
+                    ):
+                        events.append((
+                            self._uuid(), campaign_id, event_type, event_at.isoformat(), platform_id, amount,
+                            json.dumps({"synthetic": True})
+                        ))
+
+        self._copy("campaigns", ("campaign_id", "business_id", "campaign_name", "start_date", "end_date", "budget", "status"), campaigns)
+        self._copy("campaign_creators", ("campaign_id", "creator_id", "contracted_rate", "deliverables_count", "status"), members)
+        with self._bulk_load("campaign_performance_events"):
+            for i in range(0, len(events), COPY_BATCH_ROWS):
+                self._copy("campaign_performance_events", event_columns, events[i:i + COPY_BATCH_ROWS])
+        self.conn.commit()
+        print(f"✅ {len(campaigns):,} campaigns, {len(members):,} campaign creators, {len(events):,} events\n")
+
+    def generate_outreach(self):
+        print("✉️ Generating emails and notifications...")
+        rng = self.rng
+        emails, notifications = [], []
+        for business in self.businesses:
+            for creator in self._popular_creators(rng.randint(5, 30)):
+                sent_at = self.anchor - timedelta(seconds=rng.randrange(self.history_days * 86400))
+                emails.append((
+                    self._uuid(), business['user_id'], creator['user_id'], business['company_name'],
+                    "Brand Awareness", json.dumps({"engagement_rate": f"{creator['engagement_rate'] * 100:.1f}%"}),
+                    "Collaboration Opportunity", "We love your content and want to work with you!",
+                    rng.random() < 0.6, sent_at.isoformat()
+                ))
+                notifications.append((
+                    self._uuid(), creator['user_id'], "New Collaboration Request",
+                    f"You received a new campaign request from {business['company_name']}.",
+                    'business_contact', rng.random() < 0.6, sent_at.isoformat()
+                ))
+
+        self._copy("emails", (
+            "email_id", "sender_user_id", "receiver_user_id", "business_name", "campaign_goal",
+            "metrics_justification", "subject", "body", "is_read", "created_at"
+        ), emails)
+        self._copy("notifications", ("notification_id", "user_id", "title", "message", "type", "is_read", "created_at"), notifications)
+        self.conn.commit()
+        print(f"✅ {len(emails):,} emails\n")
+
+    def generate(self):
+        self.generate_creators()
+        self.generate_businesses()
+        self.generate_posts()
+        self.generate_follower_snapshots()
+        self.generate_campaigns()
+        self.generate_outreach()
+
+        print("🔎 Analyzing tables...")
+        self.conn.commit()
+        old_autocommit = self.conn.autocommit
+        self.conn.autocommit = True
+        cursor = self.conn.cursor()
+        cursor.execute("ANALYZE")
+        cursor.close()
+        self.conn.autocommit = old_autocommit
@@ -4,8 +4,12 @@ import uuid
 from datetime import datetime, timedelta, date
 import random
 import os
+import argparse
+import time
 from dotenv import load_dotenv
 
+from seed_generator import SyntheticDataGenerator, CREATORS_PER_SCALE, DEFAULT_POSTS_PER_CREATOR, DEFAULT_HISTORY_DAYS
+
 load_dotenv()
 
 
@@ -27,7 +31,18 @@ def clear_existing_data(conn):
     
     tables = [
         'notifications',
+        'notification_sequences',
+        'inbox_counters',
         'emails',
+        'rollup_watermarks',
+        'percentile_sketch_buckets',
+        'creator_rank_stats',
+        'posts_master_changes',
+        'posts_external_ids',
+        'creator_posting_heatmap',
+        'creator_engagement_alerts',
+        'creator_totals',
+        'creator_daily_summary',
         'posts_master',
         'recommendation_sources',
         'recommendations',
@@ -260,8 +275,27 @@ def seed_collaboration(conn, creator_ids, business_ids):
     print("✅ Collaboration data seeded\n")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild the schema and seed data")
+    parser.add_argument("--generate", action="store_true",
+                        help="Generate a synthetic load-testing dataset instead of the demo data")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"Generator scale factor: {CREATORS_PER_SCALE} creators per unit")
+    parser.add_argument("--creators", type=int, default=None, help="Override the number of creators")
+    parser.add_argument("--posts-per-creator", type=int, default=DEFAULT_POSTS_PER_CREATOR,
+                        help="Average posts per creator")
+    parser.add_argument("--history-days", type=int, default=DEFAULT_HISTORY_DAYS,
+                        help="How far back generated posts go")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="Date generated data is relative to (default: today, UTC)")
+    return parser.parse_args()
+
+
 def main():
     """Main seeding function"""
+    args = parse_args()
+
     print("=" * 60)
     print("🌱 SOCIAL MEDIA ANALYTICS - DATABASE SEEDING")
     print("=" * 60)
@@ -274,10 +308,23 @@ def main():
         clear_existing_data(conn)
         reapply_migrations(conn)
         
-        creator_ids = seed_creators(conn)
-        business_ids = seed_businesses(conn)
-        seed_posts_master(conn, creator_ids)
-        seed_collaboration(conn, creator_ids, business_ids)
+        if args.generate:
+            started = time.monotonic()
+            SyntheticDataGenerator(
+                conn,
+                seed=args.seed,
+                creators=args.creators or max(1, int(CREATORS_PER_SCALE * args.scale)),
+                posts_per_creator=args.posts_per_creator,
+                history_days=args.history_days,
+                anchor=args.anchor
+            ).generate()
+            print(f"⏱️  Generated in {time.monotonic() - started:.0f}s")
+            print("💡 Run `python jobs.py rollups` to build the rollup tables\n")
+        else:
+            creator_ids = seed_creators(conn)
+            business_ids = seed_businesses(conn)
+            seed_posts_master(conn, creator_ids)
+            seed_collaboration(conn, creator_ids, business_ids)
         
         conn.close()
         
@@ -0,0 +1,178 @@
+from database import get_db_connection, get_db_cursor
+from services.rollup_service import UPSERT_WATERMARK_QUERY
+from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A creator is in a drop when their engagement rate over the last
+# ENGAGEMENT_DROP_WINDOW_DAYS UTC days is more than ENGAGEMENT_DROP_THRESHOLD
+# (a fraction) below their rate over the ENGAGEMENT_DROP_BASELINE_DAYS before it.
+# Both windows need at least ENGAGEMENT_DROP_MIN_POSTS posts.
+ENGAGEMENT_DROP_WINDOW_DAYS = int(os.getenv("ENGAGEMENT_DROP_WINDOW_DAYS", "7"))
+ENGAGEMENT_DROP_BASELINE_DAYS = int(os.getenv("ENGAGEMENT_DROP_BASELINE_DAYS", "28"))
+ENGAGEMENT_DROP_THRESHOLD = float(os.getenv("ENGAGEMENT_DROP_THRESHOLD", "0.3"))
+ENGAGEMENT_DROP_MIN_POSTS = int(os.getenv("ENGAGEMENT_DROP_MIN_POSTS", "3"))
+# No second notification for a creator within this many days of the last one
+ENGAGEMENT_DROP_COOLDOWN_DAYS = int(os.getenv("ENGAGEMENT_DROP_COOLDOWN_DAYS", "7"))
+
+WATERMARK_NAME = 'engagement_drop_alerts'
+
+# Creators whose creator_daily_summary rows were recomputed since the last run.
+# Rollup refreshes rewrite every affected day, so computed_at moves with new,
+# updated and deleted posts (except a deletion that empties a whole day).
+AFFECTED_CREATORS_QUERY = """
+    CREATE TEMP TABLE alert_affected_creators ON COMMIT DROP AS
+    SELECT DISTINCT creator_id
+    FROM creator_daily_summary
+    WHERE computed_at > COALESCE(%(old_watermark)s, '-infinity'::timestamptz)
+    AND computed_at <= %(new_watermark)s
+"""
+
+# Both windows of every affected creator in one pass over their daily rows: the
+# current one is (window_start, today], the baseline (baseline_start, window_start].
+# The bounds are passed in as constants (see _window_params) so the aggregate
+# filters don't recompute them per row. should_alert: entering a drop, outside
+# the cooldown.
+EVALUATE_QUERY = """
+    CREATE TEMP TABLE alert_evaluations ON COMMIT DROP AS
+    WITH windows AS (
+        SELECT
+            a.creator_id,
+            SUM(d.total_posts) FILTER (WHERE d.summary_date > %(window_start)s) as current_posts,
+            SUM(d.total_views) FILTER (WHERE d.summary_date > %(window_start)s) as current_views,
+            SUM(d.total_likes + d.total_comments + d.total_shares)
+                FILTER (WHERE d.summary_date > %(window_start)s) as current_engagement,
+            SUM(d.total_posts) FILTER (WHERE d.summary_date <= %(window_start)s) as baseline_posts,
+            SUM(d.total_views) FILTER (WHERE d.summary_date <= %(window_start)s) as baseline_views,
+            SUM(d.total_likes + d.total_comments + d.total_shares)
+                FILTER (WHERE d.summary_date <= %(window_start)s) as baseline_engagement
+        FROM alert_affected_creators a
+        LEFT JOIN creator_daily_summary d
+            ON d.creator_id = a.creator_id
+            AND d.summary_date > %(baseline_start)s
+            AND d.summary_date <= %(today)s
+        GROUP BY a.creator_id
+    ),
+    rates AS (
+        SELECT
+            creator_id,
+            current_engagement::float / NULLIF(current_views, 0) as current_rate,
+            baseline_engagement::float / NULLIF(baseline_views, 0) as baseline_rate,
+            COALESCE(current_posts >= %(min_posts)s AND baseline_posts >= %(min_posts)s, FALSE) as has_enough_posts
+        FROM windows
+    ),
+    verdicts AS (
+        SELECT
+            creator_id, current_rate, baseline_rate,
+            COALESCE(
+                has_enough_posts AND baseline_rate > 0
+                AND current_rate < baseline_rate * (1 - %(threshold)s),
+                FALSE
+            ) as is_dropped
+        FROM rates
+    )
+    SELECT
+        v.*,
+        v.is_dropped
+            AND NOT COALESCE(s.is_dropped, FALSE)
+            AND (s.alerted_at IS NULL OR s.alerted_at <= NOW() - %(cooldown_days)s * INTERVAL '1 day') as should_alert
+    FROM verdicts v
+    LEFT JOIN creator_engagement_alerts s ON s.creator_id = v.creator_id
+"""
+
+INSERT_NOTIFICATIONS_QUERY = """
+    INSERT INTO notifications (user_id, title, message, type)
+    SELECT
+        c.user_id,
+        'Engagement Drop Detected',
+        'Your engagement rate over the last ' || %(window_days)s || ' days is '
+            || round((e.current_rate * 100)::numeric, 1) || '%%, down '
+            || round(((1 - e.current_rate / e.baseline_rate) * 100)::numeric, 0) || '%% from '
+            || round((e.baseline_rate * 100)::numeric, 1) || '%% over the '
+            || %(baseline_days)s || ' days before.',
+        'engagement_drop'
+    FROM alert_evaluations e
+    JOIN creators c ON c.creator_id = e.creator_id
+    WHERE e.should_alert
+    ORDER BY e.creator_id
+"""
+
+UPSERT_STATE_QUERY = """
+    INSERT INTO creator_engagement_alerts (
+        creator_id, is_dropped, current_rate, baseline_rate, evaluated_at, alerted_at
+    )
+    SELECT
+        creator_id, is_dropped, current_rate, baseline_rate, NOW(),
+        CASE WHEN should_alert THEN NOW() END
+    FROM alert_evaluations
+    ORDER BY creator_id
+    ON CONFLICT (creator_id) DO UPDATE SET
+        is_dropped = EXCLUDED.is_dropped,
+        current_rate = EXCLUDED.current_rate,
+        baseline_rate = EXCLUDED.baseline_rate,
+        evaluated_at = EXCLUDED.evaluated_at,
+        alerted_at = COALESCE(EXCLUDED.alerted_at, creator_engagement_alerts.alerted_at)
+"""
+
+class AlertService:
+    """
+    Set-based engagement-drop detector over creator_daily_summary. Each run
+    only evaluates creators whose rollup rows changed since the previous
+    one, so it is meant to run after `python jobs.py rollups`.
+    """
+    @staticmethod
+    def _window_params() -> Dict[str, Any]:
+        """UTC day bounds of the current and baseline windows, ending today."""
+        today = datetime.now(timezone.utc).date()
+        window_start = today - timedelta(days=ENGAGEMENT_DROP_WINDOW_DAYS)
+        return {
+            "today": today,
+            "window_start": window_start,
+            "baseline_start": window_start - timedelta(days=ENGAGEMENT_DROP_BASELINE_DAYS)
+        }
+
+    @staticmethod
+    def detect_engagement_drops() -> Dict[str, Any]:
+        """
+        Evaluates the affected creators, bulk-inserts a notification for
+        each one newly in a drop and records every verdict, in one
+        transaction. Holds the rollup engine's advisory lock so no refresh
+        commits rollup rows behind the new watermark.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('rollup_engine'))")
+
+            cursor.execute("SELECT watermark FROM rollup_watermarks WHERE rollup_name = %s", (WATERMARK_NAME,))
+            row = cursor.fetchone()
+            # A refresh stamping computed_at at or before this has committed by
+            # the time the lock is granted; later ones are left for the next run
+            cursor.execute("SELECT NOW() as watermark")
+            params = {
+                "old_watermark": row['watermark'] if row else None,
+                "new_watermark": cursor.fetchone()['watermark'],
+                "window_days": ENGAGEMENT_DROP_WINDOW_DAYS,
+                "baseline_days": ENGAGEMENT_DROP_BASELINE_DAYS,
+                "threshold": ENGAGEMENT_DROP_THRESHOLD,
+                "min_posts": ENGAGEMENT_DROP_MIN_POSTS,
+                "cooldown_days": ENGAGEMENT_DROP_COOLDOWN_DAYS,
+                **AlertService._window_params()
+            }
+
+            cursor.execute(AFFECTED_CREATORS_QUERY, params)
+            evaluated = max(cursor.rowcount, 0)
+            cursor.execute("ANALYZE alert_affected_creators")
+            cursor.execute(EVALUATE_QUERY, params)
+            cursor.execute("SELECT COUNT(*) FILTER (WHERE is_dropped) as dropped FROM alert_evaluations")
+            dropped = cursor.fetchone()['dropped']
+            cursor.execute(INSERT_NOTIFICATIONS_QUERY, params)
+            notified = max(cursor.rowcount, 0)
+            cursor.execute(UPSERT_STATE_QUERY)
+            cursor.execute(UPSERT_WATERMARK_QUERY, (WATERMARK_NAME, params["new_watermark"], notified))
+
+            stats = {"creators_evaluated": evaluated, "creators_in_drop": dropped, "notifications_sent": notified}
+            logger.info(f"Engagement drops detected: {stats}")
+            return stats
@@ -1,156 +1,450 @@
-from database import get_db_connection, get_db_cursor
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from cache import cached
+from request_context import memoized
+from query_registry import register_query
+from services.ranking_service import RankingService, AsyncRankingService, CREATOR_RANK_STATS_QUERY
+from columnar_engine import engine
+import os
+
+# Dashboard date_range windows
+DATE_RANGE_DAYS = {'7d': 7, '30d': 30}
+
+# Posting-time heatmap days, in EXTRACT(DOW) order
+DAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+# Pseudo-posts at the creator's average engagement added to every heatmap cell:
+# a cell's score only moves away from the average as its own posts accumulate
+POSTING_HEATMAP_PRIOR_POSTS = int(os.getenv("POSTING_HEATMAP_PRIOR_POSTS", "5"))
+
+# GROUPING(platform, content_type, post_hour, post_day) bitmasks for the
+# dashboard bundle query: a bit is set for every column rolled up in the row.
+GROUPING_TOTAL = 0b1111
+GROUPING_PLATFORM = 0b0111
+GROUPING_CONTENT_TYPE = 0b1011
+GROUPING_HOUR = 0b1101
+GROUPING_DAY = 0b1110
+
+FOLLOWER_SNAPSHOTS_QUERY = register_query("analytics.follower_snapshots", """
+    SELECT follower_count, snapshot_at
+    FROM follower_growth_snapshots
+    WHERE creator_id = %s
+    ORDER BY snapshot_at DESC
+    LIMIT 2
+""")
+
+FOLLOWER_TIMELINE_QUERY = register_query("analytics.follower_timeline", """
+    SELECT p.platform_name as platform, f.follower_count, f.snapshot_at
+    FROM follower_growth_snapshots f
+    JOIN platforms p ON f.platform_id = p.platform_id
+    WHERE f.creator_id = %s
+    ORDER BY f.snapshot_at ASC
+""")
+
+TOTAL_VIEWS_QUERY = register_query(
+    "analytics.total_views",
+    "SELECT COALESCE(SUM(views), 0) as total_views FROM posts_master WHERE creator_id = %s"
+)
+
+# The creator's time zone and populated posting-time heatmap cells
+# (14_posting_heatmap.sql); no rows for an unknown creator
+POSTING_HEATMAP_QUERY = register_query("analytics.posting_heatmap", """
+    SELECT
+        c.timezone, h.post_day, h.post_hour,
+        h.post_count, h.total_views, h.engagement_rate_sum, h.rated_posts
+    FROM creators c
+    LEFT JOIN creator_posting_heatmap h
+        ON h.creator_id = c.creator_id
+        AND h.post_count > 0
+    WHERE c.creator_id = %s
+""")
+
+# Best posting-time heatmap cell of every creator in the `{creators}` table,
+# scored like _shape_posting_time; for the batch jobs (recommendations, insights).
+# Takes %(prior)s = POSTING_HEATMAP_PRIOR_POSTS.
+BEST_POSTING_SLOTS_SQL = """
+        SELECT DISTINCT ON (c.creator_id)
+            c.creator_id, c.post_day, c.post_hour, c.post_count,
+            c.engagement_rate_sum / NULLIF(c.rated_posts, 0) as avg_engagement,
+            c.baseline,
+            c.rated_posts::float / (c.rated_posts + %(prior)s) as confidence,
+            (c.engagement_rate_sum + %(prior)s * COALESCE(c.baseline, 0)) / (c.rated_posts + %(prior)s) as score
+        FROM (
+            SELECT
+                h.*,
+                SUM(h.engagement_rate_sum) OVER w / NULLIF(SUM(h.rated_posts) OVER w, 0) as baseline
+            FROM {creators} a
+            JOIN creator_posting_heatmap h ON h.creator_id = a.creator_id AND h.post_count > 0
+            WINDOW w AS (PARTITION BY h.creator_id)
+        ) c
+        ORDER BY c.creator_id, score DESC, c.post_day, c.post_hour
+"""
+
+# All-time totals from the weekly rollup, plus whether it covers the creator's
+# latest posts. The creator's creator_rank_stats rows come along as JSON, so the
+# overview's percentile ranks don't cost a second round trip.
+ROLLUP_OVERVIEW_QUERY = register_query("analytics.rollup_overview", """
+    SELECT
+        rollup_is_fresh('creator_weekly_summary', %(creator_id)s) as is_fresh,
+        COALESCE(SUM(w.total_views), 0) as views,
+        COALESCE(SUM(w.total_likes), 0) as likes,
+        COALESCE(SUM(w.total_comments), 0) as comments,
+        COALESCE(SUM(w.total_shares), 0) as shares,
+        COALESCE(SUM(w.total_posts), 0) as post_count,
+        (
+            SELECT COALESCE(json_agg(json_build_object(
+                'metric', r.metric,
+                'dimension', r.dimension,
+                'dimension_value', r.dimension_value,
+                'value', r.value
+            )), '[]'::json)
+            FROM creator_rank_stats r
+            WHERE r.creator_id = %(creator_id)s
+        ) as rank_stats
+    FROM creator_weekly_summary w
+    JOIN platforms p ON p.platform_id = w.platform_id
+    WHERE w.creator_id = %(creator_id)s
+    AND (%(platform)s::text IS NULL OR lower(p.platform_name) = %(platform)s::text)
+""")
+
+ROLLUP_PLATFORM_BREAKDOWN_QUERY = register_query("analytics.rollup_platform_breakdown", """
+    WITH freshness AS (
+        SELECT rollup_is_fresh('creator_weekly_summary', %(creator_id)s) as is_fresh
+    )
+    SELECT f.is_fresh, b.*
+    FROM freshness f
+    LEFT JOIN LATERAL (
+        SELECT
+            lower(p.platform_name) as platform,
+            SUM(w.total_views) as views,
+            SUM(w.total_likes) as likes,
+            SUM(w.total_comments) as comments,
+            SUM(w.total_shares) as shares,
+            SUM(w.total_posts) as post_count
+        FROM creator_weekly_summary w
+        JOIN platforms p ON p.platform_id = w.platform_id
+        WHERE w.creator_id = %(creator_id)s
+        GROUP BY lower(p.platform_name)
+    ) b ON f.is_fresh
+""")
+
+# The dashboard bundle: every dashboard aggregate (overview, platform and
+# format comparison, hourly and daily posting times) from one scan of
+# posts_master. Registered once per filter combination, keyed by
+# (platform filter, date window), so each variant is a static statement.
+BUNDLE_SELECT = """
+    SELECT
+        GROUPING(platform, content_type, post_hour, post_day) as grouping_id,
+        platform,
+        content_type,
+        post_hour,
+        post_day,
+        COALESCE(SUM(views), 0) as views,
+        COALESCE(SUM(likes), 0) as likes,
+        COALESCE(SUM(comments), 0) as comments,
+        COALESCE(SUM(shares), 0) as shares,
+        AVG((likes + comments + shares)::float / NULLIF(views, 0)) as avg_engagement,
+        AVG(views) as avg_reach,
+        COUNT(*) as post_count
+    FROM posts_master
+    WHERE creator_id = %s
+"""
+BUNDLE_GROUP_BY = """
+    GROUP BY GROUPING SETS ((), (platform), (content_type), (post_hour), (post_day))
+"""
+# A bound computed in Python rather than NOW() - INTERVAL lets the planner
+# prune posts_master partitions outside the window
+BUNDLE_QUERIES = {
+    (by_platform, in_window): register_query(
+        "analytics.bundle" + ("_platform" if by_platform else "") + ("_window" if in_window else ""),
+        BUNDLE_SELECT
+        + ("    AND platform = %s\n" if by_platform else "")
+        + ("    AND post_datetime >= %s\n" if in_window else "")
+        + BUNDLE_GROUP_BY
+    )
+    for by_platform in (False, True)
+    for in_window in (False, True)
+}
 
 class AnalyticsService:
     @staticmethod
-    def get_dashboard_overview(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Dict[str, Any]:
+    def _window_start(date_range: Optional[str]) -> Optional[datetime]:
+        if date_range not in DATE_RANGE_DAYS:
+            return None
+        return datetime.now(timezone.utc) - timedelta(days=DATE_RANGE_DAYS[date_range])
+
+    @staticmethod
+    def _bundle_query(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Tuple[str, List[Any]]:
+        params = [creator_id]
+        if platform:
+            params.append(platform)
+        window_start = AnalyticsService._window_start(date_range)
+        if window_start is not None:
+            params.append(window_start)
+        return BUNDLE_QUERIES[(bool(platform), window_start is not None)], params
+
+    @staticmethod
+    def _engine_bundle(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The bundle from the columnar engine, or None when it can't answer for the creator."""
+        snapshot = engine.snapshot_for(creator_id)
+        if snapshot is None:
+            return None
+        rows = snapshot.bundle_rows(creator_id, platform or None, AnalyticsService._window_start(date_range))
+        return AnalyticsService._shape_bundle(rows)
+
+    @staticmethod
+    def _engine_overview(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Just the bundle's overview from the columnar engine, or None when it can't answer for the creator."""
+        snapshot = engine.snapshot_for(creator_id)
+        if snapshot is None:
+            return None
+        rows = snapshot.bundle_rows(creator_id, platform or None, AnalyticsService._window_start(date_range), totals_only=True)
+        return AnalyticsService._shape_bundle(rows)["overview"]
+
+    @staticmethod
+    def _shape_bundle(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        bundle = {
+            "overview": None,
+            "platform_breakdown": [],
+            "content_format_comparison": [],
+            "posting_time_analysis": {"hourly_analysis": [], "daily_analysis": []}
+        }
+
+        for row in rows:
+            grouping_id = row['grouping_id']
+            if grouping_id == GROUPING_TOTAL:
+                bundle["overview"] = AnalyticsService._shape_overview(row)
+            elif grouping_id == GROUPING_PLATFORM:
+                bundle["platform_breakdown"].append(AnalyticsService._shape_platform(row))
+            elif grouping_id == GROUPING_CONTENT_TYPE:
+                bundle["content_format_comparison"].append({
+                    "content_type": row['content_type'],
+                    "avg_engagement_score": float(row['avg_engagement'] or 0),
+                    "avg_reach": float(row['avg_reach'] or 0),
+                    "post_count": int(row['post_count'])
+                })
+            elif grouping_id == GROUPING_HOUR:
+                bundle["posting_time_analysis"]["hourly_analysis"].append({
+                    "hour": row['post_hour'],
+                    "avg_engagement": float(row['avg_engagement'] or 0)
+                })
+            elif grouping_id == GROUPING_DAY:
+                bundle["posting_time_analysis"]["daily_analysis"].append({
+                    "day": row['post_day'],
+                    "avg_engagement": float(row['avg_engagement'] or 0)
+                })
+
+        # Grouped rows come back in hash order; sort so every path returns the same lists
+        bundle["platform_breakdown"].sort(key=lambda x: x['platform'] or '')
+        bundle["content_format_comparison"].sort(key=lambda x: x['content_type'] or '')
+        bundle["posting_time_analysis"]["hourly_analysis"].sort(key=lambda x: (x['hour'] is None, x['hour']))
+        bundle["posting_time_analysis"]["daily_analysis"].sort(key=lambda x: (x['day'] is None, x['day']))
+
+        if bundle["overview"] is None:
+            bundle["overview"] = AnalyticsService._shape_overview(None)
+
+        return bundle
+
+    @staticmethod
+    def get_dashboard_bundle(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Dict[str, Any]:
         """
-        Computes total engagement, engagement rate, and platform metrics.
-        engagement_score = (likes + comments + shares) / views
+        Computes every creator dashboard aggregate in a single scan of posts_master.
+        GROUPING SETS yields the totals row plus per-platform, per-content_type,
+        per-hour and per-day groups; GROUPING() tells the rows apart.
         """
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            query = """
-                SELECT 
-                    COALESCE(SUM(views), 0) as total_views,
-                    COALESCE(SUM(likes), 0) as total_likes,
-                    COALESCE(SUM(comments), 0) as total_comments,
-                    COALESCE(SUM(shares), 0) as total_shares,
-                    COUNT(*) as total_posts
-                FROM posts_master
-                WHERE creator_id = %s
-            """
-            params = [creator_id]
-            
-            if platform:
-                query += " AND platform = %s"
-                params.append(platform)
-            
-            if date_range == '7d':
-                query += " AND post_datetime >= NOW() - INTERVAL '7 days'"
-            elif date_range == '30d':
-                query += " AND post_datetime >= NOW() - INTERVAL '30 days'"
-            
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            
-            if not result or not result['total_views']:
-                return {
-                    "total_engagement": 0,
-                    "engagement_rate": 0,
-                    "total_views": 0,
-                    "total_posts": 0
-                }
-            
-            total_engagement = (result['total_likes'] or 0) + (result['total_comments'] or 0) + (result['total_shares'] or 0)
-            engagement_rate = (total_engagement / result['total_views']) if result['total_views'] > 0 else 0
-            
+            cursor.execute(*AnalyticsService._bundle_query(creator_id, platform, date_range))
+            return AnalyticsService._shape_bundle(cursor.fetchall())
+
+    @staticmethod
+    def _shape_platform(row: Dict[str, Any]) -> Dict[str, Any]:
+        engagement = row['likes'] + row['comments'] + row['shares']
+        er = (engagement / row['views']) if row['views'] > 0 else 0
+        return {
+            "platform": row['platform'],
+            "views": int(row['views']),
+            "engagement": int(engagement),
+            "engagement_rate": float(er),
+            "post_count": int(row['post_count'])
+        }
+
+    @staticmethod
+    def _shape_rollup_platform_breakdown(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [AnalyticsService._shape_platform(row) for row in rows if row['platform'] is not None]
+
+    @staticmethod
+    def _shape_overview(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        engagement_score = (likes + comments + shares) / views
+        """
+        if not result or not result['views']:
             return {
-                "total_engagement": int(total_engagement),
-                "engagement_rate": float(engagement_rate),
-                "total_views": int(result['total_views']),
-                "total_likes": int(result['total_likes'] or 0),
-                "total_comments": int(result['total_comments'] or 0),
-                "total_shares": int(result['total_shares'] or 0),
-                "total_posts": int(result['total_posts'])
+                "total_engagement": 0,
+                "engagement_rate": 0,
+                "total_views": 0,
+                "total_posts": 0
             }
 
+        total_engagement = (result['likes'] or 0) + (result['comments'] or 0) + (result['shares'] or 0)
+        engagement_rate = (total_engagement / result['views']) if result['views'] > 0 else 0
+
+        return {
+            "total_engagement": int(total_engagement),
+            "engagement_rate": float(engagement_rate),
+            "total_views": int(result['views']),
+            "total_likes": int(result['likes'] or 0),
+            "total_comments": int(result['comments'] or 0),
+            "total_shares": int(result['shares'] or 0),
+            "total_posts": int(result['post_count'])
+        }
+
+    @staticmethod
+    def get_dashboard_overview(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Computes total engagement, engagement rate, and platform metrics.
+        All-time totals come from creator_weekly_summary while it is fresh for the creator.
+        percentile_ranks place the creator's all-time values among all creators;
+        their rank stats ride along with the rollup totals when those are read.
+        """
+        sketches = RankingService.get_sketches()
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            overview = rank_stats = None
+            if date_range is None:
+                cursor.execute(ROLLUP_OVERVIEW_QUERY, {"creator_id": creator_id, "platform": platform})
+                result = cursor.fetchone()
+                rank_stats = result['rank_stats']
+                if result['is_fresh']:
+                    overview = AnalyticsService._shape_overview(result)
+
+            if overview is None:
+                cursor.execute(*AnalyticsService._bundle_query(creator_id, platform, date_range))
+                overview = AnalyticsService._shape_bundle(cursor.fetchall())["overview"]
+
+            if rank_stats is None:
+                cursor.execute(CREATOR_RANK_STATS_QUERY, (creator_id,))
+                rank_stats = cursor.fetchall()
+            overview["percentile_ranks"] = sketches.creator_percentiles(rank_stats)
+            return overview
+
     @staticmethod
     def get_platform_breakdown(creator_id: str) -> List[Dict[str, Any]]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            query = """
-                SELECT 
-                    platform,
-                    SUM(views) as views,
-                    SUM(likes + comments + shares) as engagement,
-                    COUNT(*) as post_count
-                FROM posts_master
-                WHERE creator_id = %s
-                GROUP BY platform
-            """
-            cursor.execute(query, (creator_id,))
-            results = cursor.fetchall()
-            
-            breakdown = []
-            for row in results:
-                er = (row['engagement'] / row['views']) if row['views'] > 0 else 0
-                breakdown.append({
-                    "platform": row['platform'],
-                    "views": int(row['views']),
-                    "engagement": int(row['engagement']),
-                    "engagement_rate": float(er),
-                    "post_count": int(row['post_count'])
-                })
-            return breakdown
+            cursor.execute(ROLLUP_PLATFORM_BREAKDOWN_QUERY, {"creator_id": creator_id})
+            rows = cursor.fetchall()
+            if rows[0]['is_fresh']:
+                return AnalyticsService._shape_rollup_platform_breakdown(rows)
+
+            cursor.execute(*AnalyticsService._bundle_query(creator_id))
+            return AnalyticsService._shape_bundle(cursor.fetchall())["platform_breakdown"]
 
     @staticmethod
     def get_content_format_comparison(creator_id: str) -> List[Dict[str, Any]]:
         """
         Compare Reels vs Carousels vs Static posts
         """
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            
-            query = """
-                SELECT 
-                    content_type,
-                    AVG((likes + comments + shares)::float / NULLIF(views, 0)) as avg_engagement_score,
-                    AVG(views) as avg_reach,
-                    COUNT(*) as post_count
-                FROM posts_master
-                WHERE creator_id = %s
-                GROUP BY content_type
-            """
-            cursor.execute(query, (creator_id,))
-            results = cursor.fetchall()
-            
-            comparison = []
-            for row in results:
-                comparison.append({
-                    "content_type": row['content_type'],
-                    "avg_engagement_score": float(row['avg_engagement_score'] or 0),
-                    "avg_reach": float(row['avg_reach'] or 0),
-                    "post_count": int(row['post_count'])
+        return AnalyticsService.get_dashboard_bundle(creator_id)["content_format_comparison"]
+
+    @staticmethod
+    def _shape_posting_time(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        The 7x24 heatmap in the creator's time zone plus its hour and day
+        marginals. A cell's confidence is the weight of its own posts
+        against POSTING_HEATMAP_PRIOR_POSTS; its score is its average
+        engagement shrunk towards the creator's by the same weights, so
+        a single lucky post doesn't make the best slot.
+        """
+        cells = {(row['post_day'], row['post_hour']): row for row in rows if row['post_day'] is not None}
+        rate_sum = sum(row['engagement_rate_sum'] for row in cells.values())
+        rated_posts = sum(row['rated_posts'] for row in cells.values())
+        baseline = rate_sum / rated_posts if rated_posts else 0.0
+        prior = POSTING_HEATMAP_PRIOR_POSTS
+
+        def shape_cell(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            post_count = int(row['post_count']) if row else 0
+            rated = int(row['rated_posts']) if row else 0
+            cell_rate_sum = float(row['engagement_rate_sum']) if row else 0.0
+            return {
+                "post_count": post_count,
+                "avg_engagement": cell_rate_sum / rated if rated else 0.0,
+                "avg_reach": float(row['total_views']) / post_count if post_count else 0.0,
+                "confidence": rated / (rated + prior) if rated else 0.0,
+                "score": (cell_rate_sum + prior * baseline) / (rated + prior) if rated + prior else 0.0
+            }
+
+        heatmap = [
+            {"day": day, "hour": hour, **shape_cell(cells.get((day, hour)))}
+            for day in range(7) for hour in range(24)
+        ]
+
+        def marginal(position: int, key: str) -> List[Dict[str, Any]]:
+            groups: Dict[int, List[Dict[str, Any]]] = {}
+            for cell, row in cells.items():
+                groups.setdefault(cell[position], []).append(row)
+            result = []
+            for value, group in sorted(groups.items()):
+                rated = sum(row['rated_posts'] for row in group)
+                result.append({
+                    key: value,
+                    "avg_engagement": sum(row['engagement_rate_sum'] for row in group) / rated if rated else 0.0,
+                    "post_count": sum(int(row['post_count']) for row in group)
                 })
-            return comparison
+            return result
+
+        populated = [cell for cell in heatmap if cell['post_count']]
+        return {
+            "timezone": rows[0]['timezone'] if rows else "UTC",
+            "hourly_analysis": marginal(1, 'hour'),
+            "daily_analysis": marginal(0, 'day'),
+            "heatmap": heatmap,
+            "best_slot": max(populated, key=lambda x: x['score']) if populated else None
+        }
 
     @staticmethod
     def get_posting_time_analysis(creator_id: str) -> Dict[str, Any]:
+        """Reads the creator's precomputed posting-time heatmap (one primary key range)."""
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            # Engagement by Hour
-            cursor.execute("""
-                SELECT 
-                    post_hour,
-                    AVG((likes + comments + shares)::float / NULLIF(views, 0)) as avg_engagement
-                FROM posts_master
-                WHERE creator_id = %s
-                GROUP BY post_hour
-                ORDER BY post_hour
-            """, (creator_id,))
-            hour_results = cursor.fetchall()
-            
-            # Engagement by Day
-            cursor.execute("""
-                SELECT 
-                    post_day,
-                    AVG((likes + comments + shares)::float / NULLIF(views, 0)) as avg_engagement
-                FROM posts_master
-                WHERE creator_id = %s
-                GROUP BY post_day
-                ORDER BY post_day
-            """, (creator_id,))
-            day_results = cursor.fetchall()
-            
-            return {
-                "hourly_analysis": [{ "hour": r['post_hour'], "avg_engagement": float(r['avg_engagement'] or 0) } for r in hour_results],
-                "daily_analysis": [{ "day": r['post_day'], "avg_engagement": float(r['avg_engagement'] or 0) } for r in day_results]
+            cursor.execute(POSTING_HEATMAP_QUERY, (creator_id,))
+            return AnalyticsService._shape_posting_time(cursor.fetchall())
+
+    @staticmethod
+    def _shape_profile_metrics(follower_snapshots: List[Dict[str, Any]], bundle: Dict[str, Any]) -> Dict[str, Any]:
+        # 1. Follower Count & Growth
+        curr_followers = follower_snapshots[0]['follower_count'] if len(follower_snapshots) > 0 else 0
+        prev_followers = follower_snapshots[1]['follower_count'] if len(follower_snapshots) > 1 else curr_followers
+        follower_growth = ((curr_followers - prev_followers) / prev_followers * 100) if prev_followers > 0 else 0
+
+        # 2. Performance Stats & 3. Best Content Format (one scan)
+        overview = bundle["overview"]
+        formats = bundle["content_format_comparison"]
+        best_format = max(formats, key=lambda x: x['avg_engagement_score']) if formats else {"content_type": "N/A", "avg_engagement_score": 0}
+
+        # 4. Audience Retention & Sentiment (Stubs for future DB expansion)
+        audience_retention = 96.8
+        audience_sentiment = {"positive": 78.5, "negative": 12.3, "neutral": 9.2}
+
+        return {
+            "follower_count": {
+                "value": curr_followers,
+                "growth": f"{follower_growth:+.1f}%"
+            },
+            "engagement_rate": {
+                "value": f"{overview['engagement_rate'] * 100:.1f}%",
+                "growth": "+2.1%"
+            },
+            "audience_retention": {
+                "value": f"{audience_retention:.1f}%",
+                "growth": "+0.8%"
+            },
+            "audience_sentiment": audience_sentiment,
+            "best_format": {
+                "name": best_format['content_type'].capitalize() if isinstance(best_format['content_type'], str) else "N/A",
+                "performance": f"{best_format['avg_engagement_score'] * 100:.1f}%"
             }
+        }
 
     @staticmethod
     def get_profile_metrics(creator_id: str) -> Dict[str, Any]:
@@ -159,114 +453,182 @@ class AnalyticsService:
         """
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            # 1. Follower Count & Growth
-            cursor.execute("""
-                SELECT follower_count, snapshot_at
-                FROM follower_growth_snapshots
-                WHERE creator_id = %s
-                ORDER BY snapshot_at DESC
-                LIMIT 2
-            """, (creator_id,))
+            cursor.execute(FOLLOWER_SNAPSHOTS_QUERY, (creator_id,))
             follower_snapshots = cursor.fetchall()
-            
-            curr_followers = follower_snapshots[0]['follower_count'] if len(follower_snapshots) > 0 else 0
-            prev_followers = follower_snapshots[1]['follower_count'] if len(follower_snapshots) > 1 else curr_followers
-            follower_growth = ((curr_followers - prev_followers) / prev_followers * 100) if prev_followers > 0 else 0
-            
-            # 2. Performance Stats
-            overview = AnalyticsService.get_dashboard_overview(creator_id)
-            
-            # 3. Best Content Format
-            formats = AnalyticsService.get_content_format_comparison(creator_id)
-            best_format = max(formats, key=lambda x: x['avg_engagement_score']) if formats else {"content_type": "N/A", "avg_engagement_score": 0}
-            
-            # 4. Audience Retention & Sentiment (Stubs for future DB expansion)
-            audience_retention = 96.8 
-            audience_sentiment = {"positive": 78.5, "negative": 12.3, "neutral": 9.2}
-            
-            return {
-                "follower_count": {
-                    "value": curr_followers,
-                    "growth": f"{follower_growth:+.1f}%"
-                },
-                "engagement_rate": {
-                    "value": f"{overview['engagement_rate'] * 100:.1f}%",
-                    "growth": "+2.1%" 
-                },
-                "audience_retention": {
-                    "value": f"{audience_retention:.1f}%",
-                    "growth": "+0.8%"
-                },
-                "audience_sentiment": audience_sentiment,
-                "best_format": {
-                    "name": best_format['content_type'].capitalize() if isinstance(best_format['content_type'], str) else "N/A",
-                    "performance": f"{best_format['avg_engagement_score'] * 100:.1f}%"
-                }
+
+            cursor.execute(*AnalyticsService._bundle_query(creator_id))
+            bundle = AnalyticsService._shape_bundle(cursor.fetchall())
+            return AnalyticsService._shape_profile_metrics(follower_snapshots, bundle)
+
+    @staticmethod
+    def _shape_audience_insights(creator_id: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        timeline = {}
+        for row in rows:
+            p = row['platform'].lower()
+            if p not in timeline: timeline[p] = []
+            timeline[p].append({
+                "month": row['snapshot_at'].strftime('%b'),
+                "followers": row['follower_count']
+            })
+
+        # Simple hash-based seed for audience composition for consistency across calls
+        seed = sum(ord(c) for c in creator_id)
+        returning = 65 + (seed % 15)
+        new = 100 - returning
+
+        return {
+            "growth_timeline": timeline,
+            "composition": {"returning": returning, "new": new},
+            "behavior": {
+                "instagram": {"avgSessionDuration": "4.2 min", "bounceRate": 32, "returningRate": returning},
+                "youtube": {"avgSessionDuration": "12.5 min", "bounceRate": 28, "returningRate": returning - 5},
+                "facebook": {"avgSessionDuration": "3.1 min", "bounceRate": 45, "returningRate": returning - 10}
             }
+        }
 
     @staticmethod
     def get_audience_insights(creator_id: str) -> Dict[str, Any]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
+
             # Follower Growth Timeline (Last 6 snapshots)
-            cursor.execute("""
-                SELECT p.platform_name as platform, f.follower_count, f.snapshot_at
-                FROM follower_growth_snapshots f
-                JOIN platforms p ON f.platform_id = p.platform_id
-                WHERE f.creator_id = %s
-                ORDER BY f.snapshot_at ASC
-            """, (creator_id,))
-            rows = cursor.fetchall()
-            
-            timeline = {}
-            for row in rows:
-                p = row['platform'].lower()
-                if p not in timeline: timeline[p] = []
-                timeline[p].append({
-                    "month": row['snapshot_at'].strftime('%b'),
-                    "followers": row['follower_count']
-                })
-            
-            # Simple hash-based seed for audience composition for consistency across calls
-            seed = sum(ord(c) for c in creator_id)
-            returning = 65 + (seed % 15)
-            new = 100 - returning
-            
-            return {
-                "growth_timeline": timeline,
-                "composition": {"returning": returning, "new": new},
-                "behavior": {
-                    "instagram": {"avgSessionDuration": "4.2 min", "bounceRate": 32, "returningRate": returning},
-                    "youtube": {"avgSessionDuration": "12.5 min", "bounceRate": 28, "returningRate": returning - 5},
-                    "facebook": {"avgSessionDuration": "3.1 min", "bounceRate": 45, "returningRate": returning - 10}
+            cursor.execute(FOLLOWER_TIMELINE_QUERY, (creator_id,))
+            return AnalyticsService._shape_audience_insights(creator_id, cursor.fetchall())
+
+    @staticmethod
+    def _shape_monetization_metrics(total_views) -> Dict[str, Any]:
+        # Base logic: Scale mock values by actual views
+        scale = (total_views / 150000) or 1.0 # 150k is base per-creator seed approx
+
+        return {
+            "revenue": {
+                "total": round(8700 * scale),
+                "growth": 6.2,
+                "platforms": {
+                    "instagram": round(2890 * scale),
+                    "youtube": round(4250 * scale),
+                    "facebook": round(1560 * scale)
                 }
-            }
+            },
+            "content_performance": [
+                {"type": "Long-form", "revenue": round(4100 * scale), "conversion": 5.8, "platform": "YouTube"},
+                {"type": "Reels", "revenue": round(3200 * scale), "conversion": 4.2, "platform": "Instagram"},
+                {"type": "Carousels", "revenue": round(1800 * scale), "conversion": 3.1, "platform": "Instagram"}
+            ]
+        }
 
     @staticmethod
     def get_monetization_metrics(creator_id: str) -> Dict[str, Any]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            # Base logic: Scale mock values by actual views
-            cursor.execute("SELECT COALESCE(SUM(views), 0) as total_views FROM posts_master WHERE creator_id = %s", (creator_id,))
-            total_views = cursor.fetchone()['total_views']
-            scale = (total_views / 150000) or 1.0 # 150k is base per-creator seed approx
-            
-            return {
-                "revenue": {
-                    "total": round(8700 * scale),
-                    "growth": 6.2,
-                    "platforms": {
-                        "instagram": round(2890 * scale),
-                        "youtube": round(4250 * scale),
-                        "facebook": round(1560 * scale)
-                    }
-                },
-                "content_performance": [
-                    {"type": "Long-form", "revenue": round(4100 * scale), "conversion": 5.8, "platform": "YouTube"},
-                    {"type": "Reels", "revenue": round(3200 * scale), "conversion": 4.2, "platform": "Instagram"},
-                    {"type": "Carousels", "revenue": round(1800 * scale), "conversion": 3.1, "platform": "Instagram"}
-                ]
-            }
+            cursor.execute(TOTAL_VIEWS_QUERY, (creator_id,))
+            return AnalyticsService._shape_monetization_metrics(cursor.fetchone()['total_views'])
+
+
+class AsyncAnalyticsService:
+    """
+    Awaitable variants of AnalyticsService for the API routes.
+    Shares the SQL and result shaping with the sync service.
+    """
+    @staticmethod
+    @memoized("analytics.dashboard_bundle")
+    @cached("analytics.dashboard_bundle")
+    async def get_dashboard_bundle(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Dict[str, Any]:
+        bundle = AnalyticsService._engine_bundle(creator_id, platform, date_range)
+        if bundle is not None:
+            return bundle
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(*AnalyticsService._bundle_query(creator_id, platform, date_range))
+            return AnalyticsService._shape_bundle(await cursor.fetchall())
+
+    @staticmethod
+    @memoized("analytics.dashboard_overview")
+    @cached("analytics.dashboard_overview")
+    async def get_dashboard_overview(creator_id: str, platform: Optional[str] = None, date_range: Optional[str] = None) -> Dict[str, Any]:
+        sketches = await AsyncRankingService.get_sketches()
+        overview = AnalyticsService._engine_overview(creator_id, platform, date_range)
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            rank_stats = None
+            if overview is None and date_range is None:
+                await cursor.execute(ROLLUP_OVERVIEW_QUERY, {"creator_id": creator_id, "platform": platform})
+                result = await cursor.fetchone()
+                rank_stats = result['rank_stats']
+                if result['is_fresh']:
+                    overview = AnalyticsService._shape_overview(result)
+
+            if overview is None:
+                await cursor.execute(*AnalyticsService._bundle_query(creator_id, platform, date_range))
+                overview = AnalyticsService._shape_bundle(await cursor.fetchall())["overview"]
+
+            if rank_stats is None:
+                await cursor.execute(CREATOR_RANK_STATS_QUERY, (creator_id,))
+                rank_stats = await cursor.fetchall()
+            overview["percentile_ranks"] = sketches.creator_percentiles(rank_stats)
+            return overview
+
+    @staticmethod
+    @memoized("analytics.platform_breakdown")
+    @cached("analytics.platform_breakdown")
+    async def get_platform_breakdown(creator_id: str) -> List[Dict[str, Any]]:
+        bundle = AnalyticsService._engine_bundle(creator_id)
+        if bundle is not None:
+            return bundle["platform_breakdown"]
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(ROLLUP_PLATFORM_BREAKDOWN_QUERY, {"creator_id": creator_id})
+            rows = await cursor.fetchall()
+            if rows[0]['is_fresh']:
+                return AnalyticsService._shape_rollup_platform_breakdown(rows)
+
+            await cursor.execute(*AnalyticsService._bundle_query(creator_id))
+            return AnalyticsService._shape_bundle(await cursor.fetchall())["platform_breakdown"]
+
+    @staticmethod
+    @memoized("analytics.content_format_comparison")
+    async def get_content_format_comparison(creator_id: str) -> List[Dict[str, Any]]:
+        return (await AsyncAnalyticsService.get_dashboard_bundle(creator_id))["content_format_comparison"]
+
+    @staticmethod
+    @memoized("analytics.posting_time_analysis")
+    @cached("analytics.posting_time_analysis")
+    async def get_posting_time_analysis(creator_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(POSTING_HEATMAP_QUERY, (creator_id,))
+            return AnalyticsService._shape_posting_time(await cursor.fetchall())
+
+    @staticmethod
+    @memoized("analytics.profile_metrics")
+    async def get_profile_metrics(creator_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(FOLLOWER_SNAPSHOTS_QUERY, (creator_id,))
+            follower_snapshots = await cursor.fetchall()
+
+            bundle = AnalyticsService._engine_bundle(creator_id)
+            if bundle is None:
+                await cursor.execute(*AnalyticsService._bundle_query(creator_id))
+                bundle = AnalyticsService._shape_bundle(await cursor.fetchall())
+            return AnalyticsService._shape_profile_metrics(follower_snapshots, bundle)
+
+    @staticmethod
+    @memoized("analytics.audience_insights")
+    async def get_audience_insights(creator_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(FOLLOWER_TIMELINE_QUERY, (creator_id,))
+            return AnalyticsService._shape_audience_insights(creator_id, await cursor.fetchall())
+
+    @staticmethod
+    @memoized("analytics.monetization_metrics")
+    @cached("analytics.monetization_metrics")
+    async def get_monetization_metrics(creator_id: str) -> Dict[str, Any]:
+        snapshot = engine.snapshot_for(creator_id)
+        if snapshot is not None:
+            return AnalyticsService._shape_monetization_metrics(snapshot.total_views(creator_id))
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(TOTAL_VIEWS_QUERY, (creator_id,))
+            return AnalyticsService._shape_monetization_metrics((await cursor.fetchone())['total_views'])
@@ -1,70 +1,253 @@
-from database import get_db_connection, get_db_cursor
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from psycopg2.extras import Json
+from psycopg.types.json import Jsonb
 from typing import List, Dict, Any, Optional
+from datetime import datetime
+import base64
+import binascii
 import uuid
+from query_registry import register_query
+
+INSERT_EMAIL_QUERY = """
+    INSERT INTO emails (
+        email_id, sender_user_id, receiver_user_id, business_name, 
+        campaign_goal, metrics_justification, best_content_type, 
+        best_posting_time, subject, body
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING email_id
+"""
+
+INSERT_CONTACT_NOTIFICATION_QUERY = """
+    INSERT INTO notifications (user_id, title, message, type)
+    VALUES (%s, %s, %s, 'business_contact')
+"""
+
+DEFAULT_INBOX_LIMIT = 20
+MAX_INBOX_LIMIT = 100
+
+# One page of the inbox, newest first, after the (created_at, email_id) of the
+# previous page's last email; a range scan of idx_emails_receiver_created
+# (17_inbox.sql) that stops after limit + 1 rows, however deep the page.
+# The first page starts after ('infinity', the largest UUID).
+INBOX_QUERY = register_query("collaboration.inbox", """
+    SELECT email_id, sender_user_id, business_name, subject, is_read, created_at
+    FROM emails
+    WHERE receiver_user_id = %(user_id)s
+    AND (created_at, email_id) < (%(before_created_at)s::timestamptz, %(before_email_id)s::uuid)
+    ORDER BY created_at DESC, email_id DESC
+    LIMIT %(limit)s
+""")
+
+# Maintained by triggers on emails; no row until the user's first email
+INBOX_COUNTS_QUERY = register_query("collaboration.inbox_counts", """
+    SELECT total_count, unread_count
+    FROM inbox_counters
+    WHERE user_id = %s
+""")
+
+# Marks the email read and returns it in one statement. An email that is
+# already read is returned as is, without rewriting the row.
+EMAIL_DETAIL_QUERY = register_query("collaboration.email_detail", """
+    WITH marked AS (
+        UPDATE emails SET is_read = TRUE
+        WHERE email_id = %(email_id)s AND NOT is_read
+        RETURNING *
+    )
+    SELECT * FROM marked
+    UNION ALL
+    SELECT * FROM emails
+    WHERE email_id = %(email_id)s
+    AND NOT EXISTS (SELECT 1 FROM marked)
+""")
+
+# Latest first, by idx_notifications_user_seq (18_notification_push.sql)
+NOTIFICATIONS_QUERY = register_query("collaboration.notifications", """
+    SELECT * FROM notifications 
+    WHERE user_id = %s 
+    ORDER BY seq DESC LIMIT 20
+""")
+
+# The user's notifications after the last one a stream delivered, oldest first
+NOTIFICATIONS_AFTER_QUERY = register_query("collaboration.notifications_after", """
+    SELECT notification_id, seq, title, message, type, is_read, created_at
+    FROM notifications
+    WHERE user_id = %(user_id)s
+    AND seq > %(after_seq)s
+    ORDER BY seq
+    LIMIT %(limit)s
+""")
+
+LATEST_NOTIFICATION_SEQ_QUERY = register_query("collaboration.latest_notification_seq", """
+    SELECT COALESCE(MAX(seq), 0) as seq
+    FROM notifications
+    WHERE user_id = %s
+""")
 
 class CollaborationService:
+    @staticmethod
+    def _email_params(email_id: str, sender_id: str, receiver_id: str, payload: Dict[str, Any], json_adapter) -> tuple:
+        metrics_justification = payload.get('metrics_justification')
+        return (
+            email_id, sender_id, receiver_id, 
+            payload.get('business_name'), 
+            payload.get('campaign_goal'),
+            json_adapter(metrics_justification) if metrics_justification is not None else None,
+            payload.get('best_content_type'),
+            payload.get('best_posting_time'),
+            payload.get('subject'),
+            payload.get('body')
+        )
+
+    @staticmethod
+    def _notification_params(receiver_id: str, payload: Dict[str, Any]) -> tuple:
+        return (receiver_id, "New Collaboration Request", f"You received a new campaign request from {payload.get('business_name')}.")
+
     @staticmethod
     def send_email(sender_id: str, receiver_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
             
             email_id = str(uuid.uuid4())
-            cursor.execute("""
-                INSERT INTO emails (
-                    email_id, sender_user_id, receiver_user_id, business_name, 
-                    campaign_goal, metrics_justification, best_content_type, 
-                    best_posting_time, subject, body
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING email_id
-            """, (
-                email_id, sender_id, receiver_id, 
-                payload.get('business_name'), 
-                payload.get('campaign_goal'),
-                payload.get('metrics_justification'),
-                payload.get('best_content_type'),
-                payload.get('best_posting_time'),
-                payload.get('subject'),
-                payload.get('body')
-            ))
+            cursor.execute(INSERT_EMAIL_QUERY, CollaborationService._email_params(email_id, sender_id, receiver_id, payload, Json))
             
             # Also create a notification for the creator
-            cursor.execute("""
-                INSERT INTO notifications (user_id, title, message, type)
-                VALUES (%s, %s, %s, 'business_contact')
-            """, (receiver_id, "New Collaboration Request", f"You received a new campaign request from {payload.get('business_name')}."))
+            cursor.execute(INSERT_CONTACT_NOTIFICATION_QUERY, CollaborationService._notification_params(receiver_id, payload))
             
             return {"email_id": email_id, "status": "sent"}
 
     @staticmethod
-    def get_inbox(user_id: str) -> List[Dict[str, Any]]:
+    def _encode_cursor(row: Dict[str, Any]) -> str:
+        position = f"{row['created_at'].isoformat()}|{row['email_id']}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _inbox_params(user_id: str, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+        """
+        Query params for one page after `cursor` (a page's next_cursor). The
+        limit includes one extra row, which tells whether another page follows.
+        """
+        params = {
+            "user_id": user_id,
+            "limit": max(1, min(limit, MAX_INBOX_LIMIT)) + 1,
+            "before_created_at": "infinity",
+            "before_email_id": "ffffffff-ffff-ffff-ffff-ffffffffffff"
+        }
+        if cursor:
+            try:
+                created_at, email_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+                params["before_created_at"] = datetime.fromisoformat(created_at)
+                params["before_email_id"] = str(uuid.UUID(email_id))
+            except (ValueError, binascii.Error):
+                raise ValueError("Invalid inbox cursor")
+        return params
+
+    @staticmethod
+    def _shape_inbox(rows: List[Dict[str, Any]], counts: Optional[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+        emails = rows[:params["limit"] - 1]
+        return {
+            "emails": emails,
+            "next_cursor": CollaborationService._encode_cursor(emails[-1]) if len(rows) == params["limit"] else None,
+            **CollaborationService._shape_counts(counts)
+        }
+
+    @staticmethod
+    def _shape_counts(counts: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        return {
+            "total_count": int(counts['total_count']) if counts else 0,
+            "unread_count": int(counts['unread_count']) if counts else 0
+        }
+
+    @staticmethod
+    def get_inbox(user_id: str, limit: int = DEFAULT_INBOX_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of the user's inbox, newest first, with their total and
+        unread counts. Pass the returned next_cursor to get the following
+        page; it is None on the last one. Raises ValueError for a malformed
+        cursor.
+        """
+        params = CollaborationService._inbox_params(user_id, limit, cursor)
+        with get_db_connection() as conn:
+            db_cursor = get_db_cursor(conn)
+            db_cursor.execute(INBOX_QUERY, params)
+            rows = db_cursor.fetchall()
+            db_cursor.execute(INBOX_COUNTS_QUERY, (user_id,))
+            return CollaborationService._shape_inbox(rows, db_cursor.fetchone(), params)
+
+    @staticmethod
+    def get_inbox_counts(user_id: str) -> Dict[str, int]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            cursor.execute("""
-                SELECT email_id, sender_user_id, business_name, subject, is_read, created_at
-                FROM emails
-                WHERE receiver_user_id = %s
-                ORDER BY created_at DESC
-            """, (user_id,))
-            return cursor.fetchall()
+            cursor.execute(INBOX_COUNTS_QUERY, (user_id,))
+            return CollaborationService._shape_counts(cursor.fetchone())
 
     @staticmethod
     def get_email_detail(email_id: str) -> Dict[str, Any]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            
-            # Mark as read
-            cursor.execute("UPDATE emails SET is_read = TRUE WHERE email_id = %s", (email_id,))
-            
-            cursor.execute("SELECT * FROM emails WHERE email_id = %s", (email_id,))
+            cursor.execute(EMAIL_DETAIL_QUERY, {"email_id": email_id})
             return cursor.fetchone()
 
     @staticmethod
     def get_notifications(user_id: str) -> List[Dict[str, Any]]:
         with get_db_connection() as conn:
             cursor = get_db_cursor(conn)
-            cursor.execute("""
-                SELECT * FROM notifications 
-                WHERE user_id = %s 
-                ORDER BY created_at DESC LIMIT 20
-            """, (user_id,))
+            cursor.execute(NOTIFICATIONS_QUERY, (user_id,))
             return cursor.fetchall()
+
+
+class AsyncCollaborationService:
+    @staticmethod
+    async def send_email(sender_id: str, receiver_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            
+            email_id = str(uuid.uuid4())
+            await cursor.execute(INSERT_EMAIL_QUERY, CollaborationService._email_params(email_id, sender_id, receiver_id, payload, Jsonb))
+            await cursor.execute(INSERT_CONTACT_NOTIFICATION_QUERY, CollaborationService._notification_params(receiver_id, payload))
+            
+            return {"email_id": email_id, "status": "sent"}
+
+    @staticmethod
+    async def get_inbox(user_id: str, limit: int = DEFAULT_INBOX_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+        params = CollaborationService._inbox_params(user_id, limit, cursor)
+        async with get_async_db_connection() as conn:
+            db_cursor = get_async_db_cursor(conn)
+            await db_cursor.execute(INBOX_QUERY, params)
+            rows = await db_cursor.fetchall()
+            await db_cursor.execute(INBOX_COUNTS_QUERY, (user_id,))
+            return CollaborationService._shape_inbox(rows, await db_cursor.fetchone(), params)
+
+    @staticmethod
+    async def get_inbox_counts(user_id: str) -> Dict[str, int]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(INBOX_COUNTS_QUERY, (user_id,))
+            return CollaborationService._shape_counts(await cursor.fetchone())
+
+    @staticmethod
+    async def get_email_detail(email_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(EMAIL_DETAIL_QUERY, {"email_id": email_id})
+            return await cursor.fetchone()
+
+    @staticmethod
+    async def get_notifications(user_id: str) -> List[Dict[str, Any]]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(NOTIFICATIONS_QUERY, (user_id,))
+            return await cursor.fetchall()
+
+    @staticmethod
+    async def get_notifications_after(user_id: str, after_seq: int, limit: int) -> List[Dict[str, Any]]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(NOTIFICATIONS_AFTER_QUERY, {"user_id": user_id, "after_seq": after_seq, "limit": limit})
+            return await cursor.fetchall()
+
+    @staticmethod
+    async def get_latest_notification_seq(user_id: str) -> int:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(LATEST_NOTIFICATION_SEQ_QUERY, (user_id,))
+            return (await cursor.fetchone())['seq']
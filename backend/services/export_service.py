@@ -0,0 +1,221 @@
+from database import get_async_db_connection, get_async_db_cursor
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from datetime import date, datetime, timedelta
+from psycopg.rows import dict_row
+import csv
+import io
+import json
+import os
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# Exportable posts_master columns and their Parquet types
+EXPORT_COLUMNS = {
+    "post_id": "string",
+    "platform": "string",
+    "external_id": "string",
+    "creator_id": "string",
+    "account_type": "string",
+    "caption_text": "string",
+    "hashtags": "list<string>",
+    "content_type": "string",
+    "duration": "int32",
+    "content_length_bucket": "string",
+    "post_datetime": "timestamp",
+    "post_hour": "int32",
+    "post_day": "int32",
+    "days_since_post": "int32",
+    "views": "int64",
+    "impressions": "int64",
+    "likes": "int64",
+    "comments": "int64",
+    "shares": "int64",
+    "followers_at_post": "int64",
+    "created_at": "timestamp",
+    "updated_at": "timestamp"
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+
+class _ChunkSink:
+    """
+    Write-only file for ParquetWriter that hands back what was written since
+    the last drain. Tracks its own position so footer offsets stay correct.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportService:
+    @staticmethod
+    def validate_request(format: str, columns: Optional[List[str]]) -> List[str]:
+        """
+        Returns the columns to export; raises ValueError for an unknown
+        format or column.
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format '{format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+        if format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Parquet export requires the 'pyarrow' package")
+
+        if not columns:
+            return list(EXPORT_COLUMNS)
+        unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        return columns
+
+    @staticmethod
+    def _filters(creator_id: str, start_date: Optional[date], end_date: Optional[date], platform: Optional[str]) -> Tuple[str, List[Any]]:
+        where = "WHERE creator_id = %s"
+        params: List[Any] = [creator_id]
+        if start_date:
+            where += " AND post_datetime >= %s"
+            params.append(start_date)
+        if end_date:
+            # end_date is inclusive
+            where += " AND post_datetime < %s"
+            params.append(end_date + timedelta(days=1))
+        if platform:
+            where += " AND platform = %s"
+            params.append(platform)
+        return where, params
+
+    @staticmethod
+    def _export_query(columns: List[str], creator_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None, platform: Optional[str] = None) -> Tuple[str, List[Any]]:
+        # Column names come from the EXPORT_COLUMNS allow-list
+        where, params = ExportService._filters(creator_id, start_date, end_date, platform)
+        return f"SELECT {', '.join(columns)} FROM posts_master {where} ORDER BY post_datetime, post_id", params
+
+    @staticmethod
+    def _exists_query(creator_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None, platform: Optional[str] = None) -> Tuple[str, List[Any]]:
+        where, params = ExportService._filters(creator_id, start_date, end_date, platform)
+        return f"SELECT EXISTS (SELECT 1 FROM posts_master {where}) as has_rows", params
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def _csv_chunk(rows: List[Dict[str, Any]], columns: List[str], header: bool) -> bytes:
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=columns)
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+        return output.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _ndjson_chunk(rows: List[Dict[str, Any]]) -> bytes:
+        return "".join(
+            json.dumps(row, default=ExportService._json_default) + "\n" for row in rows
+        ).encode("utf-8")
+
+    @staticmethod
+    def _arrow_schema(columns: List[str]):
+        import pyarrow as pa
+        types = {
+            "string": pa.string(),
+            "list<string>": pa.list_(pa.string()),
+            "int32": pa.int32(),
+            "int64": pa.int64(),
+            "timestamp": pa.timestamp("us", tz="UTC")
+        }
+        return pa.schema([(c, types[EXPORT_COLUMNS[c]]) for c in columns])
+
+    @staticmethod
+    def _arrow_batch(rows: List[Dict[str, Any]], columns: List[str], schema):
+        import pyarrow as pa
+        # UUIDs come back as uuid.UUID; Parquet stores them as strings
+        string_columns = [c for c in columns if EXPORT_COLUMNS[c] == "string"]
+        for row in rows:
+            for c in string_columns:
+                if row[c] is not None:
+                    row[c] = str(row[c])
+        return pa.Table.from_pylist(rows, schema=schema)
+
+
+class AsyncExportService:
+    @staticmethod
+    async def has_rows(creator_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None, platform: Optional[str] = None) -> bool:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(*ExportService._exists_query(creator_id, start_date, end_date, platform))
+            return (await cursor.fetchone())['has_rows']
+
+    @staticmethod
+    async def _batches(columns: List[str], creator_id: str, start_date: Optional[date], end_date: Optional[date], platform: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Reads the export through a server-side cursor, EXPORT_BATCH_SIZE rows at a time.
+        """
+        async with get_async_db_connection() as conn:
+            async with conn.cursor(name="posts_export", row_factory=dict_row) as cursor:
+                cursor.itersize = EXPORT_BATCH_SIZE
+                await cursor.execute(*ExportService._export_query(columns, creator_id, start_date, end_date, platform))
+                while True:
+                    rows = await cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    yield rows
+
+    @staticmethod
+    async def stream_posts(format: str, columns: List[str], creator_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None, platform: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Yields the export as encoded chunks, one per batch, so memory stays
+        flat regardless of how many posts the creator has.
+        """
+        batches = AsyncExportService._batches(columns, creator_id, start_date, end_date, platform)
+
+        if format == "parquet":
+            import pyarrow.parquet as pq
+            schema = ExportService._arrow_schema(columns)
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema)
+            async for rows in batches:
+                # One row group per batch
+                writer.write_table(ExportService._arrow_batch(rows, columns, schema))
+                yield sink.drain()
+            writer.close()
+            yield sink.drain()
+            return
+
+        header = True
+        async for rows in batches:
+            if format == "csv":
+                yield ExportService._csv_chunk(rows, columns, header)
+                header = False
+            else:
+                yield ExportService._ndjson_chunk(rows)
@@ -0,0 +1,576 @@
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from request_context import outside_request_context
+from psycopg2.extras import Json
+from psycopg.types.json import Jsonb
+import psycopg
+import psycopg2
+from typing import List, Dict, Any, Optional, Tuple, Iterator, IO
+from datetime import datetime, timedelta, timezone
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "10000"))
+INGEST_FORMATS = ("csv", "ndjson")
+# Accepted post_datetime window; each month in it can get its own posts_master
+# partition, so a stray year-1900 or year-9999 row is rejected instead
+INGEST_EARLIEST_POST_DATE = datetime.fromisoformat(
+    os.getenv("INGEST_EARLIEST_POST_DATE", "2005-01-01")
+).replace(tzinfo=timezone.utc)
+INGEST_MAX_FUTURE_DAYS = int(os.getenv("INGEST_MAX_FUTURE_DAYS", "1"))
+# How long creating a month's partition may wait for its lock on posts_master;
+# past it the month's rows go to the default partition until the partitions job
+INGEST_PARTITION_LOCK_TIMEOUT_MS = int(os.getenv("INGEST_PARTITION_LOCK_TIMEOUT_MS", "2000"))
+
+ACCOUNT_TYPES = ('creator', 'business')
+CONTENT_TYPES = ('reel', 'carousel', 'static', 'video', 'short')
+CONTENT_LENGTH_BUCKETS = ('short', 'medium', 'long')
+
+INT_MAX = 2 ** 31 - 1
+BIGINT_MAX = 2 ** 63 - 1
+
+# VARCHAR sizes of the staging and posts_master columns; a longer value would
+# fail the whole batch's COPY, so the row is rejected as too_long instead
+COLUMN_MAX_LENGTHS = {
+    "platform": 50,
+    "external_id": 255,
+    "account_type": 20,
+    "content_type": 50,
+    "content_length_bucket": 20,
+}
+
+# Staging columns, in COPY order
+STAGING_COLUMNS = (
+    "line_no", "platform", "external_id", "creator_id", "account_type",
+    "caption_text", "hashtags", "content_type", "duration", "content_length_bucket",
+    "post_datetime", "views", "impressions", "likes", "comments", "shares", "followers_at_post"
+)
+
+CREATE_STAGING_QUERY = """
+    CREATE TEMP TABLE posts_ingest_staging (
+        line_no INTEGER NOT NULL,
+        platform VARCHAR(50) NOT NULL,
+        external_id VARCHAR(255) NOT NULL,
+        creator_id UUID NOT NULL,
+        account_type VARCHAR(20) NOT NULL,
+        caption_text TEXT,
+        hashtags TEXT[],
+        content_type VARCHAR(50) NOT NULL,
+        duration INTEGER,
+        content_length_bucket VARCHAR(20),
+        post_datetime TIMESTAMPTZ NOT NULL,
+        views BIGINT NOT NULL,
+        impressions BIGINT,
+        likes BIGINT NOT NULL,
+        comments BIGINT NOT NULL,
+        shares BIGINT NOT NULL,
+        followers_at_post BIGINT
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING_QUERY = f"COPY posts_ingest_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+INSERT_INGESTION_ERROR_QUERY = """
+    INSERT INTO ingestion_errors (error_type, payload, error_message, source)
+    VALUES (%s, %s, %s, %s)
+"""
+
+# Rows that passed validation but point at a creator or platform we don't know
+REJECT_UNKNOWN_REFERENCES_QUERY = """
+    WITH rejected AS (
+        DELETE FROM posts_ingest_staging s
+        WHERE NOT EXISTS (SELECT 1 FROM creators c WHERE c.creator_id = s.creator_id)
+        OR NOT EXISTS (SELECT 1 FROM platforms p WHERE lower(p.platform_name) = s.platform)
+        RETURNING s.*
+    )
+    INSERT INTO ingestion_errors (error_type, payload, error_message, source)
+    SELECT
+        CASE WHEN c.creator_id IS NULL THEN 'unknown_creator' ELSE 'unknown_platform' END,
+        to_jsonb(r) - 'line_no',
+        CASE
+            WHEN c.creator_id IS NULL THEN format('Line %%s: unknown creator_id %%s', r.line_no, r.creator_id)
+            ELSE format('Line %%s: unknown platform %%s', r.line_no, r.platform)
+        END,
+        %(source)s
+    FROM rejected r
+    LEFT JOIN creators c ON c.creator_id = r.creator_id
+"""
+
+# Months present in the batch that have no monthly partition yet, so merged
+# rows don't land in the default partition. Only the distinct months, never
+# the whole MIN..MAX range in between.
+MISSING_PARTITION_MONTHS_QUERY = """
+    SELECT m.month
+    FROM (
+        SELECT DISTINCT date_trunc('month', post_datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' as month
+        FROM posts_ingest_staging
+    ) m
+    WHERE to_regclass('posts_master_p' || to_char(m.month AT TIME ZONE 'UTC', 'YYYY_MM')) IS NULL
+    ORDER BY m.month
+"""
+
+# Creating a partition locks posts_master ACCESS EXCLUSIVE, so each month is
+# created in its own short transaction on another connection, never in the
+# ingest transaction, and gives up rather than queue dashboard reads behind it
+PARTITION_LOCK_TIMEOUT_QUERY = "SELECT set_config('lock_timeout', %s, true)"
+CREATE_PARTITION_QUERY = "SELECT create_monthly_partitions('posts_master', %s, %s) as created"
+
+# The merge below matches on (platform, external_id, post_datetime), since unique
+# keys of the partitioned posts_master must include post_datetime. Posts whose
+# post_datetime changed since they were last ingested are moved first, with the
+# whole row updated here so the merge then finds nothing left to change.
+RELOCATE_STAGING_QUERY = """
+    WITH latest AS (
+        SELECT DISTINCT ON (platform, external_id) *
+        FROM posts_ingest_staging
+        ORDER BY platform, external_id, line_no DESC
+    ),
+    moved AS (
+        UPDATE posts_master p SET
+            creator_id = s.creator_id,
+            account_type = s.account_type,
+            caption_text = s.caption_text,
+            hashtags = s.hashtags,
+            content_type = s.content_type,
+            duration = s.duration,
+            content_length_bucket = s.content_length_bucket,
+            post_datetime = s.post_datetime,
+            post_hour = EXTRACT(HOUR FROM s.post_datetime)::int,
+            post_day = EXTRACT(DOW FROM s.post_datetime)::int,
+            days_since_post = CURRENT_DATE - s.post_datetime::date,
+            views = s.views,
+            impressions = s.impressions,
+            likes = s.likes,
+            comments = s.comments,
+            shares = s.shares,
+            followers_at_post = s.followers_at_post,
+            updated_at = NOW()
+        FROM latest s
+        WHERE p.platform = s.platform
+        AND p.external_id = s.external_id
+        AND p.post_datetime <> s.post_datetime
+        RETURNING 1
+    )
+    SELECT COUNT(*) as moved FROM moved
+"""
+
+# Last occurrence of a (platform, external_id) in the batch wins. Derived fields
+# are computed here, so the per-row derived-field trigger is skipped, and rows
+# whose values didn't change are left alone so rollups don't recompute them.
+MERGE_STAGING_QUERY = """
+    WITH merged AS (
+        INSERT INTO posts_master (
+            platform, external_id, creator_id, account_type, caption_text, hashtags,
+            content_type, duration, content_length_bucket,
+            post_datetime, post_hour, post_day, days_since_post,
+            views, impressions, likes, comments, shares, followers_at_post, updated_at
+        )
+        SELECT DISTINCT ON (s.platform, s.external_id)
+            s.platform, s.external_id, s.creator_id, s.account_type, s.caption_text, s.hashtags,
+            s.content_type, s.duration, s.content_length_bucket,
+            s.post_datetime,
+            EXTRACT(HOUR FROM s.post_datetime)::int,
+            EXTRACT(DOW FROM s.post_datetime)::int,
+            CURRENT_DATE - s.post_datetime::date,
+            s.views, s.impressions, s.likes, s.comments, s.shares, s.followers_at_post, NOW()
+        FROM posts_ingest_staging s
+        ORDER BY s.platform, s.external_id, s.line_no DESC
+        ON CONFLICT (platform, external_id, post_datetime) WHERE external_id IS NOT NULL DO UPDATE SET
+            creator_id = EXCLUDED.creator_id,
+            account_type = EXCLUDED.account_type,
+            caption_text = EXCLUDED.caption_text,
+            hashtags = EXCLUDED.hashtags,
+            content_type = EXCLUDED.content_type,
+            duration = EXCLUDED.duration,
+            content_length_bucket = EXCLUDED.content_length_bucket,
+            post_hour = EXCLUDED.post_hour,
+            post_day = EXCLUDED.post_day,
+            days_since_post = EXCLUDED.days_since_post,
+            views = EXCLUDED.views,
+            impressions = EXCLUDED.impressions,
+            likes = EXCLUDED.likes,
+            comments = EXCLUDED.comments,
+            shares = EXCLUDED.shares,
+            followers_at_post = EXCLUDED.followers_at_post,
+            updated_at = EXCLUDED.updated_at
+        WHERE (
+            posts_master.creator_id, posts_master.account_type, posts_master.caption_text,
+            posts_master.hashtags, posts_master.content_type, posts_master.duration,
+            posts_master.content_length_bucket,
+            posts_master.views, posts_master.impressions, posts_master.likes,
+            posts_master.comments, posts_master.shares, posts_master.followers_at_post
+        ) IS DISTINCT FROM (
+            EXCLUDED.creator_id, EXCLUDED.account_type, EXCLUDED.caption_text,
+            EXCLUDED.hashtags, EXCLUDED.content_type, EXCLUDED.duration,
+            EXCLUDED.content_length_bucket,
+            EXCLUDED.views, EXCLUDED.impressions, EXCLUDED.likes,
+            EXCLUDED.comments, EXCLUDED.shares, EXCLUDED.followers_at_post
+        )
+        -- xmax can't be read back from a partitioned table; new rows are the
+        -- ones created by this transaction
+        RETURNING (created_at = NOW()) as inserted
+    )
+    SELECT
+        COUNT(*) FILTER (WHERE inserted) as inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) as updated
+    FROM merged
+"""
+
+# Consistency check for (platform, external_id) uniqueness, which the partitioned
+# posts_master can't enforce itself: posts_external_ids (19_post_external_ids.sql)
+# does. Both counts are zero while its triggers have seen every write.
+CHECK_EXTERNAL_IDS_QUERY = """
+    SELECT
+        (
+            SELECT COUNT(*)
+            FROM (
+                SELECT 1
+                FROM posts_master
+                WHERE external_id IS NOT NULL
+                GROUP BY platform, external_id
+                HAVING COUNT(*) > 1
+            ) d
+        ) as duplicate_keys,
+        (
+            SELECT COUNT(*)
+            FROM posts_master p
+            WHERE p.external_id IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM posts_external_ids e
+                WHERE e.platform = p.platform
+                AND e.external_id = p.external_id
+                AND e.post_datetime = p.post_datetime
+            )
+        ) as untracked_posts
+"""
+
+
+class RejectedRow(ValueError):
+    """A row rejected under its own ingestion_errors error_type rather than invalid_row."""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class IngestionService:
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value or None
+
+    @staticmethod
+    def _int(record: Dict[str, Any], field: str, default: Optional[int] = None, maximum: int = BIGINT_MAX) -> Optional[int]:
+        value = record.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return default
+        if isinstance(value, bool):
+            raise ValueError(f"{field} must be an integer")
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be an integer, got {value!r}")
+        if number < 0 or number > maximum:
+            raise ValueError(f"{field} out of range: {number}")
+        return number
+
+    @staticmethod
+    def _choice(record: Dict[str, Any], field: str, choices: Tuple[str, ...], default: Optional[str] = None) -> Optional[str]:
+        value = IngestionService._text(record.get(field))
+        if value is None:
+            return default
+        value = value.lower()
+        if value not in choices:
+            raise ValueError(f"{field} must be one of {', '.join(choices)}, got {value!r}")
+        return value
+
+    @staticmethod
+    def _hashtags(value) -> Optional[List[str]]:
+        """
+        NDJSON sends a list; CSV sends one string separated by spaces or commas.
+        """
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.replace(",", " ").split()
+        elif not isinstance(value, list):
+            raise ValueError("hashtags must be a list or a space-separated string")
+        tags = [str(tag).strip() for tag in value if str(tag).strip()]
+        return tags or None
+
+    @staticmethod
+    def _array_literal(values: Optional[List[str]]) -> Optional[str]:
+        if values is None:
+            return None
+        escaped = ('"' + v.replace('\\', '\\\\').replace('"', '\\"') + '"' for v in values)
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _validate(line_no: int, record: Dict[str, Any]) -> List[Any]:
+        """
+        Normalizes one input record into staging column order.
+        Raises ValueError with a readable message when the row is unusable
+        (RejectedRow when it is recorded under a more specific error_type).
+        """
+        platform = IngestionService._text(record.get('platform'))
+        external_id = IngestionService._text(record.get('external_id'))
+        raw_creator_id = IngestionService._text(record.get('creator_id'))
+        raw_datetime = IngestionService._text(record.get('post_datetime'))
+
+        missing = [name for name, value in (
+            ('platform', platform), ('external_id', external_id),
+            ('creator_id', raw_creator_id), ('post_datetime', raw_datetime)
+        ) if value is None]
+        if missing:
+            raise ValueError(f"missing required field(s): {', '.join(missing)}")
+        for field, max_length in COLUMN_MAX_LENGTHS.items():
+            value = IngestionService._text(record.get(field))
+            if value is not None and len(value) > max_length:
+                raise RejectedRow('too_long', f"{field} longer than {max_length} characters ({len(value)})")
+
+        try:
+            creator_id = str(uuid.UUID(raw_creator_id))
+        except ValueError:
+            raise ValueError(f"creator_id is not a UUID: {raw_creator_id!r}")
+
+        try:
+            post_datetime = datetime.fromisoformat(raw_datetime)
+        except ValueError:
+            raise ValueError(f"post_datetime is not ISO 8601: {raw_datetime!r}")
+        if post_datetime.tzinfo is None:
+            post_datetime = post_datetime.replace(tzinfo=timezone.utc)
+        latest = datetime.now(timezone.utc) + timedelta(days=INGEST_MAX_FUTURE_DAYS)
+        if not INGEST_EARLIEST_POST_DATE <= post_datetime <= latest:
+            raise ValueError(
+                f"post_datetime {raw_datetime!r} outside the accepted window "
+                f"({INGEST_EARLIEST_POST_DATE.date().isoformat()} to {latest.date().isoformat()})"
+            )
+
+        content_type = IngestionService._choice(record, 'content_type', CONTENT_TYPES)
+        if content_type is None:
+            raise ValueError("missing required field(s): content_type")
+
+        return [
+            line_no,
+            platform.lower(),
+            external_id,
+            creator_id,
+            IngestionService._choice(record, 'account_type', ACCOUNT_TYPES, default='creator'),
+            IngestionService._text(record.get('caption_text')),
+            IngestionService._array_literal(IngestionService._hashtags(record.get('hashtags'))),
+            content_type,
+            IngestionService._int(record, 'duration', maximum=INT_MAX),
+            IngestionService._choice(record, 'content_length_bucket', CONTENT_LENGTH_BUCKETS),
+            post_datetime.isoformat(),
+            IngestionService._int(record, 'views', default=0),
+            IngestionService._int(record, 'impressions'),
+            IngestionService._int(record, 'likes', default=0),
+            IngestionService._int(record, 'comments', default=0),
+            IngestionService._int(record, 'shares', default=0),
+            IngestionService._int(record, 'followers_at_post')
+        ]
+
+    @staticmethod
+    def _records(stream: IO[bytes], format: str) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """
+        Yields (line number, record, parse error) for every input row.
+        """
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record, None
+            return
+
+        for line_no, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line), None
+            except json.JSONDecodeError as e:
+                yield line_no, {"raw": line}, f"invalid JSON: {e.msg}"
+
+    @staticmethod
+    def _prepare_batches(stream: IO[bytes], format: str, source: str) -> Iterator[Tuple[str, int, int, List[tuple]]]:
+        """
+        Validates records and yields (COPY csv data, rows received, rows valid,
+        ingestion_errors rows) for every INGEST_BATCH_SIZE records.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        received = valid = 0
+        errors: List[tuple] = []
+
+        for line_no, record, parse_error in IngestionService._records(stream, format):
+            received += 1
+            try:
+                if parse_error:
+                    raise ValueError(parse_error)
+                if not isinstance(record, dict):
+                    raise ValueError("row is not a JSON object")
+                writer.writerow(IngestionService._validate(line_no, record))
+                valid += 1
+            except ValueError as e:
+                error_type = e.error_type if isinstance(e, RejectedRow) else 'invalid_row'
+                errors.append((error_type, record, f"Line {line_no}: {e}", source))
+
+            if received >= INGEST_BATCH_SIZE:
+                yield buffer.getvalue(), received, valid, errors
+                buffer.seek(0)
+                buffer.truncate()
+                received = valid = 0
+                errors = []
+
+        if received:
+            yield buffer.getvalue(), received, valid, errors
+
+    @staticmethod
+    def _error_params(errors: List[tuple], json_adapter) -> List[tuple]:
+        return [(error_type, json_adapter(payload), message, source) for error_type, payload, message, source in errors]
+
+    @staticmethod
+    def _summary(received: int, valid: int, invalid: int, unknown_references: int, moved: Dict[str, Any], merged: Dict[str, Any]) -> Dict[str, Any]:
+        inserted = int(merged['inserted'])
+        updated = int(moved['moved']) + int(merged['updated'])
+        return {
+            "received": received,
+            "inserted": inserted,
+            "updated": updated,
+            # Unchanged rows plus earlier duplicates of a key within the batch
+            "skipped": valid - unknown_references - inserted - updated,
+            "rejected": invalid + unknown_references
+        }
+
+    @staticmethod
+    def ingest_posts(stream: IO[bytes], format: str, source: str = "bulk_ingest") -> Dict[str, Any]:
+        """
+        Bulk-loads a CSV or NDJSON export into posts_master: validated rows are
+        COPYed into a staging table and merged on (platform, external_id); rejected rows go to ingestion_errors. One transaction,
+        apart from the missing monthly partitions (see _create_partitions).
+        A key already stored under another post_datetime is moved rather than
+        inserted again, which posts_external_ids would reject.
+        """
+        received = valid = invalid = 0
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(CREATE_STAGING_QUERY)
+
+            for data, batch_received, batch_valid, errors in IngestionService._prepare_batches(stream, format, source):
+                if batch_valid:
+                    cursor.copy_expert(COPY_STAGING_QUERY, io.StringIO(data))
+                if errors:
+                    cursor.executemany(INSERT_INGESTION_ERROR_QUERY, IngestionService._error_params(errors, Json))
+                received += batch_received
+                valid += batch_valid
+                invalid += len(errors)
+
+            cursor.execute("ANALYZE posts_ingest_staging")
+            cursor.execute(REJECT_UNKNOWN_REFERENCES_QUERY, {"source": source})
+            unknown_references = cursor.rowcount
+            cursor.execute(MISSING_PARTITION_MONTHS_QUERY)
+            IngestionService._create_partitions([row['month'] for row in cursor.fetchall()])
+            cursor.execute(RELOCATE_STAGING_QUERY)
+            moved = cursor.fetchone()
+            cursor.execute(MERGE_STAGING_QUERY)
+            return IngestionService._summary(received, valid, invalid, unknown_references, moved, cursor.fetchone())
+
+
+    @staticmethod
+    def _create_partitions(months: List[datetime]) -> int:
+        """
+        Creates posts_master's partitions for `months`, each in its own
+        transaction on a second connection. A month whose lock isn't granted
+        within INGEST_PARTITION_LOCK_TIMEOUT_MS is skipped.
+        """
+        created = 0
+        if not months:
+            return created
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            for month in months:
+                try:
+                    cursor.execute(PARTITION_LOCK_TIMEOUT_QUERY, (f"{INGEST_PARTITION_LOCK_TIMEOUT_MS}ms",))
+                    cursor.execute(CREATE_PARTITION_QUERY, (month, month))
+                    created += cursor.fetchone()['created']
+                    conn.commit()
+                except psycopg2.errors.LockNotAvailable:
+                    conn.rollback()
+                    logger.warning(f"Partition for {month:%Y-%m} not created (lock timeout); its rows go to the default partition")
+        return created
+
+    @staticmethod
+    def check_external_ids() -> Dict[str, int]:
+        """
+        Counts (platform, external_id) keys stored more than once in posts_master
+        and posts missing from posts_external_ids.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(CHECK_EXTERNAL_IDS_QUERY)
+            return {key: int(value) for key, value in cursor.fetchone().items()}
+
+
+class AsyncIngestionService:
+    @staticmethod
+    async def _create_partitions(months: List[datetime]) -> int:
+        created = 0
+        if not months:
+            return created
+        # Not the request's connection, which holds the ingest transaction
+        async with outside_request_context():
+            async with get_async_db_connection() as conn:
+                cursor = get_async_db_cursor(conn)
+                for month in months:
+                    try:
+                        await cursor.execute(PARTITION_LOCK_TIMEOUT_QUERY, (f"{INGEST_PARTITION_LOCK_TIMEOUT_MS}ms",))
+                        await cursor.execute(CREATE_PARTITION_QUERY, (month, month))
+                        created += (await cursor.fetchone())['created']
+                        await conn.commit()
+                    except psycopg.errors.LockNotAvailable:
+                        await conn.rollback()
+                        logger.warning(f"Partition for {month:%Y-%m} not created (lock timeout); its rows go to the default partition")
+        return created
+
+    @staticmethod
+    async def ingest_posts(stream: IO[bytes], format: str, source: str = "bulk_ingest") -> Dict[str, Any]:
+        received = valid = invalid = 0
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(CREATE_STAGING_QUERY)
+
+            # Parsing and validating a batch is CPU-bound (and reads the spooled
+            # upload), so each batch is prepared in a worker thread instead of
+            # blocking the event loop; batches are still taken one at a time.
+            batches = IngestionService._prepare_batches(stream, format, source)
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                data, batch_received, batch_valid, errors = batch
+                if batch_valid:
+                    async with cursor.copy(COPY_STAGING_QUERY) as copy:
+                        await copy.write(data)
+                if errors:
+                    await cursor.executemany(INSERT_INGESTION_ERROR_QUERY, IngestionService._error_params(errors, Jsonb))
+                received += batch_received
+                valid += batch_valid
+                invalid += len(errors)
+
+            await cursor.execute("ANALYZE posts_ingest_staging")
+            await cursor.execute(REJECT_UNKNOWN_REFERENCES_QUERY, {"source": source})
+            unknown_references = cursor.rowcount
+            await cursor.execute(MISSING_PARTITION_MONTHS_QUERY)
+            await AsyncIngestionService._create_partitions([row['month'] for row in await cursor.fetchall()])
+            await cursor.execute(RELOCATE_STAGING_QUERY)
+            moved = await cursor.fetchone()
+            await cursor.execute(MERGE_STAGING_QUERY)
+            return IngestionService._summary(received, valid, invalid, unknown_references, moved, await cursor.fetchone())
@@ -0,0 +1,507 @@
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from query_registry import register_query
+from services.analytics_service import DAY_NAMES, POSTING_HEATMAP_PRIOR_POSTS, BEST_POSTING_SLOTS_SQL
+from services.rollup_service import ROLLUP_SAFETY_LAG_SECONDS, UPSERT_WATERMARK_QUERY
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# source_model of the rule-based insights
+INSIGHTS_MODEL = 'insight_rules_v1'
+WATERMARK_NAME = 'insights'
+# Insights are regenerated once they expire, even without new data, since
+# their windows end today
+INSIGHT_TTL_DAYS = int(os.getenv("INSIGHT_TTL_DAYS", "7"))
+# Creators per transaction
+INSIGHT_BATCH_SIZE = int(os.getenv("INSIGHT_BATCH_SIZE", "5000"))
+# Rated posts a content type needs over the 90 days to be compared in the
+# content_strategy insight
+INSIGHT_MIN_POSTS = int(os.getenv("INSIGHT_MIN_POSTS", "3"))
+
+# Creators with new rollup rows, follower snapshots or campaigns since the last
+# run, plus those whose insights have expired
+AFFECTED_CREATORS_QUERY = """
+    SELECT creator_id
+    FROM creator_daily_summary
+    WHERE computed_at > %(old_watermark)s AND computed_at <= %(new_watermark)s
+    UNION
+    SELECT creator_id
+    FROM follower_growth_snapshots
+    WHERE created_at > %(old_watermark)s AND created_at <= %(new_watermark)s
+    UNION
+    SELECT creator_id
+    FROM campaign_creators
+    WHERE created_at > %(old_watermark)s AND created_at <= %(new_watermark)s
+    UNION
+    SELECT c.creator_id
+    FROM insights i
+    JOIN creators c ON c.user_id = i.user_id
+    WHERE i.source_model = %(source_model)s
+    AND i.expires_at <= NOW()
+    ORDER BY 1
+"""
+
+BATCH_QUERIES = ("""
+    CREATE TEMP TABLE insight_batch ON COMMIT DROP AS
+    SELECT c.creator_id, c.user_id, c.timezone
+    FROM creators c
+    WHERE c.creator_id = ANY(%(creator_ids)s::uuid[])
+""", """
+    CREATE TEMP TABLE insight_candidates (
+        insight_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+        user_id UUID NOT NULL,
+        insight_type VARCHAR(50) NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT NOT NULL,
+        severity VARCHAR(20) NOT NULL,
+        confidence_score DECIMAL(3, 2) NOT NULL,
+        sources JSONB NOT NULL -- [{source_table, source_record_id, metric_name, metric_value}]
+    ) ON COMMIT DROP
+""")
+
+# One pass per insight type over the whole batch. Each one inserts
+# (user_id, insight_type, title, description, severity, confidence_score, sources)
+# into insight_candidates; a creator without enough data gets no row.
+INSIGHT_PASSES = {
+    # The latest 7 UTC days against the 7 before, like the default trends
+    "performance": """
+        WITH weeks AS (
+            SELECT
+                b.creator_id, b.user_id,
+                SUM(d.total_posts) FILTER (WHERE d.summary_date > %(today)s - 7) as current_posts,
+                SUM(d.total_posts) FILTER (WHERE d.summary_date <= %(today)s - 7) as previous_posts,
+                SUM(d.total_likes + d.total_comments + d.total_shares)
+                    FILTER (WHERE d.summary_date > %(today)s - 7)::float
+                    / NULLIF(SUM(d.total_views) FILTER (WHERE d.summary_date > %(today)s - 7), 0) as current_rate,
+                SUM(d.total_likes + d.total_comments + d.total_shares)
+                    FILTER (WHERE d.summary_date <= %(today)s - 7)::float
+                    / NULLIF(SUM(d.total_views) FILTER (WHERE d.summary_date <= %(today)s - 7), 0) as previous_rate
+            FROM insight_batch b
+            JOIN creator_daily_summary d
+                ON d.creator_id = b.creator_id
+                AND d.summary_date > %(today)s - 14
+                AND d.summary_date <= %(today)s
+            GROUP BY b.creator_id, b.user_id
+        ),
+        changes AS (
+            SELECT *, (current_rate - previous_rate) / previous_rate as change
+            FROM weeks
+            WHERE current_rate IS NOT NULL AND previous_rate > 0
+        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            user_id,
+            'performance',
+            CASE
+                WHEN abs(change) < 0.05 THEN 'Engagement steady this week'
+                WHEN change > 0 THEN 'Engagement up ' || round((change * 100)::numeric, 1) || '%% this week'
+                ELSE 'Engagement down ' || round((-change * 100)::numeric, 1) || '%% this week'
+            END,
+            'Your posts earned a ' || round((current_rate * 100)::numeric, 1) || '%% engagement rate over the last 7 days, vs '
+                || round((previous_rate * 100)::numeric, 1) || '%% the 7 days before, across '
+                || current_posts || ' posts (' || previous_posts || ' the week before).',
+            CASE WHEN change <= -0.1 THEN 'warning' ELSE 'info' END,
+            round(LEAST(1, (current_posts + previous_posts) / 10.0), 2),
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'current_engagement_rate', 'metric_value', current_rate),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'previous_engagement_rate', 'metric_value', previous_rate),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'engagement_change_pct', 'metric_value', change * 100),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'current_post_count', 'metric_value', current_posts),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'previous_post_count', 'metric_value', previous_posts)
+            )
+        FROM changes
+    """,
+    # The best posting-time heatmap cell against the creator's average
+    "timing": """
+        WITH slots AS ({best_slots}        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            b.user_id,
+            'timing',
+            (%(day_names)s::text[])[s.post_day + 1] || 's at ' || s.post_hour || ':00 is your best posting time',
+            'Posts on ' || (%(day_names)s::text[])[s.post_day + 1] || 's at ' || s.post_hour || ':00 (' || b.timezone
+                || ') average a ' || round((s.avg_engagement * 100)::numeric, 1) || '%% engagement rate, '
+                || round(((s.avg_engagement / s.baseline - 1) * 100)::numeric) || '%% above your overall '
+                || round((s.baseline * 100)::numeric, 1) || '%%.',
+            CASE WHEN s.score >= s.baseline * 1.1 THEN 'opportunity' ELSE 'info' END,
+            round(s.confidence::numeric, 2),
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'creator_posting_heatmap', 'source_record_id', s.creator_id,
+                                   'metric_name', 'post_day', 'metric_value', s.post_day),
+                jsonb_build_object('source_table', 'creator_posting_heatmap', 'source_record_id', s.creator_id,
+                                   'metric_name', 'post_hour', 'metric_value', s.post_hour),
+                jsonb_build_object('source_table', 'creator_posting_heatmap', 'source_record_id', s.creator_id,
+                                   'metric_name', 'slot_engagement_rate', 'metric_value', s.avg_engagement),
+                jsonb_build_object('source_table', 'creator_posting_heatmap', 'source_record_id', s.creator_id,
+                                   'metric_name', 'overall_engagement_rate', 'metric_value', s.baseline),
+                jsonb_build_object('source_table', 'creator_posting_heatmap', 'source_record_id', s.creator_id,
+                                   'metric_name', 'slot_post_count', 'metric_value', s.post_count)
+            )
+        FROM slots s
+        JOIN insight_batch b ON b.creator_id = s.creator_id
+        WHERE s.baseline > 0 AND s.avg_engagement > s.baseline
+    """.format(best_slots=BEST_POSTING_SLOTS_SQL.format(creators="insight_batch")),
+    # Best against worst content type over the last 90 days, each with INSIGHT_MIN_POSTS rated posts
+    "content_strategy": """
+        WITH formats AS (
+            SELECT
+                b.creator_id, b.user_id, d.content_type,
+                SUM(d.engagement_rate_sum) / SUM(d.rated_posts) as rate,
+                SUM(d.rated_posts) as rated_posts
+            FROM insight_batch b
+            JOIN creator_daily_summary d
+                ON d.creator_id = b.creator_id
+                AND d.summary_date > %(today)s - 90
+                AND d.summary_date <= %(today)s
+            GROUP BY b.creator_id, b.user_id, d.content_type
+            HAVING SUM(d.rated_posts) >= %(min_posts)s
+        ),
+        ranked AS (
+            SELECT
+                f.*,
+                ROW_NUMBER() OVER (PARTITION BY creator_id ORDER BY rate DESC, content_type) as best_rank,
+                ROW_NUMBER() OVER (PARTITION BY creator_id ORDER BY rate ASC, content_type) as worst_rank
+            FROM formats f
+        ),
+        pairs AS (
+            SELECT
+                best.creator_id, best.user_id,
+                best.content_type as best_type, best.rate as best_rate, best.rated_posts as best_posts,
+                worst.content_type as worst_type, worst.rate as worst_rate, worst.rated_posts as worst_posts
+            FROM ranked best
+            JOIN ranked worst ON worst.creator_id = best.creator_id AND worst.worst_rank = 1
+            WHERE best.best_rank = 1
+            AND best.content_type <> worst.content_type
+            AND worst.rate > 0
+        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            user_id,
+            'content_strategy',
+            initcap(best_type) || 's outperform ' || worst_type || 's ' || round((best_rate / worst_rate)::numeric, 1) || 'x',
+            'Over the last 90 days your ' || best_type || 's averaged a ' || round((best_rate * 100)::numeric, 1)
+                || '%% engagement rate across ' || best_posts || ' posts, vs '
+                || round((worst_rate * 100)::numeric, 1) || '%% for your ' || worst_type || 's.',
+            CASE WHEN best_rate >= worst_rate * 1.2 THEN 'opportunity' ELSE 'info' END,
+            round(LEAST(1, LEAST(best_posts, worst_posts) / 10.0), 2),
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', best_type || '_engagement_rate', 'metric_value', best_rate),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', worst_type || '_engagement_rate', 'metric_value', worst_rate),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', best_type || '_post_count', 'metric_value', best_posts),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', worst_type || '_post_count', 'metric_value', worst_posts)
+            )
+        FROM pairs
+    """,
+    # Where the creator's followers are, from the latest snapshot per platform
+    "audience": """
+        WITH latest AS (
+            SELECT DISTINCT ON (f.creator_id, f.platform_id)
+                b.creator_id, b.user_id, f.snapshot_id, p.platform_name, f.follower_count
+            FROM insight_batch b
+            JOIN follower_growth_snapshots f ON f.creator_id = b.creator_id
+            JOIN platforms p ON p.platform_id = f.platform_id
+            ORDER BY f.creator_id, f.platform_id, f.snapshot_at DESC
+        ),
+        shares AS (
+            SELECT
+                l.*,
+                SUM(l.follower_count) OVER w as total_followers,
+                COUNT(*) OVER w as platforms,
+                ROW_NUMBER() OVER (PARTITION BY l.creator_id ORDER BY l.follower_count DESC, l.platform_name) as rank
+            FROM latest l
+            WINDOW w AS (PARTITION BY l.creator_id)
+        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            user_id,
+            'audience',
+            round(follower_count * 100.0 / total_followers) || '%% of your followers are on ' || platform_name,
+            platform_name || ' has ' || to_char(follower_count, 'FM999,999,999,999') || ' of your '
+                || to_char(total_followers, 'FM999,999,999,999') || ' followers across ' || platforms || ' platforms.',
+            'info',
+            1.00,
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', snapshot_id,
+                                   'metric_name', 'platform_followers', 'metric_value', follower_count),
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', snapshot_id,
+                                   'metric_name', 'total_followers', 'metric_value', total_followers),
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', snapshot_id,
+                                   'metric_name', 'platform_share_pct', 'metric_value', follower_count * 100.0 / total_followers)
+            )
+        FROM shares
+        WHERE rank = 1 AND total_followers > 0
+    """,
+    # Followers now against 30 days ago, summed over the platforms tracked then
+    "growth": """
+        WITH per_platform AS (
+            SELECT
+                b.creator_id, b.user_id, f.platform_id,
+                (array_agg(f.follower_count ORDER BY f.snapshot_at DESC))[1] as current_followers,
+                (array_agg(f.follower_count ORDER BY f.snapshot_at DESC)
+                    FILTER (WHERE f.snapshot_at <= %(now)s - INTERVAL '30 days'))[1] as previous_followers
+            FROM insight_batch b
+            JOIN follower_growth_snapshots f ON f.creator_id = b.creator_id
+            GROUP BY b.creator_id, b.user_id, f.platform_id
+        ),
+        totals AS (
+            SELECT
+                creator_id, user_id,
+                SUM(current_followers) as current_followers,
+                SUM(previous_followers) as previous_followers
+            FROM per_platform
+            WHERE previous_followers IS NOT NULL
+            GROUP BY creator_id, user_id
+        ),
+        changes AS (
+            SELECT *, (current_followers - previous_followers)::float / previous_followers as change
+            FROM totals
+            WHERE previous_followers > 0
+        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            user_id,
+            'growth',
+            'Followers ' || CASE WHEN change >= 0 THEN 'up ' ELSE 'down ' END
+                || round((abs(change) * 100)::numeric, 1) || '%% in 30 days',
+            'You have ' || to_char(current_followers, 'FM999,999,999,999') || ' followers, '
+                || CASE WHEN change >= 0 THEN 'up from ' ELSE 'down from ' END
+                || to_char(previous_followers, 'FM999,999,999,999') || ' 30 days ago.',
+            CASE WHEN change < 0 THEN 'warning' ELSE 'info' END,
+            1.00,
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', creator_id,
+                                   'metric_name', 'current_followers', 'metric_value', current_followers),
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', creator_id,
+                                   'metric_name', 'previous_followers', 'metric_value', previous_followers),
+                jsonb_build_object('source_table', 'follower_growth_snapshots', 'source_record_id', creator_id,
+                                   'metric_name', 'follower_growth_pct', 'metric_value', change * 100)
+            )
+        FROM changes
+    """,
+    # Contracted campaign rates against the creator's recent reach
+    "monetization": """
+        WITH campaigns AS (
+            SELECT b.creator_id, b.user_id, COUNT(*) as campaign_count, AVG(cc.contracted_rate) as avg_rate
+            FROM insight_batch b
+            JOIN campaign_creators cc ON cc.creator_id = b.creator_id
+            WHERE cc.contracted_rate > 0
+            GROUP BY b.creator_id, b.user_id
+        ),
+        reach AS (
+            SELECT
+                c.*,
+                (
+                    SELECT SUM(d.total_views)::float / NULLIF(SUM(d.total_posts), 0)
+                    FROM creator_daily_summary d
+                    WHERE d.creator_id = c.creator_id
+                    AND d.summary_date > %(today)s - 90
+                    AND d.summary_date <= %(today)s
+                ) as avg_views
+            FROM campaigns c
+        )
+        INSERT INTO insight_candidates (user_id, insight_type, title, description, severity, confidence_score, sources)
+        SELECT
+            user_id,
+            'monetization',
+            'Campaigns pay you $' || to_char(avg_rate, 'FM999,999,990.00') || ' on average',
+            'Across ' || campaign_count || CASE WHEN campaign_count = 1 THEN ' campaign' ELSE ' campaigns' END
+                || ' your average contracted rate is $'
+                || to_char(avg_rate, 'FM999,999,990.00') || ', about $'
+                || to_char(avg_rate / avg_views * 1000, 'FM999,999,990.00') || ' per 1,000 views at your 90-day average of '
+                || to_char(round(avg_views), 'FM999,999,999,999') || ' views per post.',
+            'info',
+            round(LEAST(1, campaign_count / 5.0), 2),
+            jsonb_build_array(
+                jsonb_build_object('source_table', 'campaign_creators', 'source_record_id', creator_id,
+                                   'metric_name', 'campaign_count', 'metric_value', campaign_count),
+                jsonb_build_object('source_table', 'campaign_creators', 'source_record_id', creator_id,
+                                   'metric_name', 'avg_contracted_rate', 'metric_value', avg_rate),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'avg_views_per_post', 'metric_value', avg_views),
+                jsonb_build_object('source_table', 'creator_daily_summary', 'source_record_id', creator_id,
+                                   'metric_name', 'rate_per_thousand_views', 'metric_value', avg_rate / avg_views * 1000)
+            )
+        FROM reach
+        WHERE avg_views > 0
+    """,
+}
+
+# An insight the user dismissed is not shown again until it expires
+SKIP_DISMISSED_QUERY = """
+    DELETE FROM insight_candidates c
+    USING insights i
+    WHERE i.user_id = c.user_id
+    AND i.insight_type = c.insight_type
+    AND i.source_model = %(source_model)s
+    AND i.is_dismissed
+    AND i.expires_at > NOW()
+"""
+
+# Replaces the batch's insights, keeping dismissed ones until they expire;
+# their insight_sources go with them (ON DELETE CASCADE)
+DELETE_REPLACED_QUERY = """
+    DELETE FROM insights i
+    USING insight_batch b
+    WHERE i.user_id = b.user_id
+    AND i.source_model = %(source_model)s
+    AND (i.is_dismissed IS NOT TRUE OR i.expires_at <= NOW())
+"""
+
+INSERT_INSIGHTS_QUERY = """
+    INSERT INTO insights (
+        insight_id, user_id, insight_type, title, description, severity,
+        generated_at, expires_at, source_model, confidence_score
+    )
+    SELECT
+        insight_id, user_id, insight_type, title, description, severity,
+        NOW(), %(expires_at)s, %(source_model)s, confidence_score
+    FROM insight_candidates
+"""
+
+INSERT_SOURCES_QUERY = """
+    INSERT INTO insight_sources (insight_id, source_table, source_record_id, metric_name, metric_value)
+    SELECT c.insight_id, s.source_table, s.source_record_id, s.metric_name, s.metric_value
+    FROM insight_candidates c
+    CROSS JOIN jsonb_to_recordset(c.sources)
+        AS s(source_table TEXT, source_record_id UUID, metric_name TEXT, metric_value DECIMAL(20, 6))
+"""
+
+# The creator's current insights with the metrics behind each, served by
+# idx_insights_active
+ACTIVE_INSIGHTS_QUERY = register_query("insights.active", """
+    SELECT
+        i.insight_id, i.insight_type, i.title, i.description, i.severity,
+        i.confidence_score, i.generated_at, i.expires_at,
+        COALESCE((
+            SELECT json_agg(json_build_object(
+                'source_table', s.source_table,
+                'metric_name', s.metric_name,
+                'metric_value', s.metric_value
+            ) ORDER BY s.created_at, s.metric_name)
+            FROM insight_sources s
+            WHERE s.insight_id = i.insight_id
+        ), '[]'::json) as sources
+    FROM insights i
+    WHERE i.user_id = (SELECT user_id FROM creators WHERE creator_id = %s)
+    AND i.is_dismissed = FALSE
+    AND i.expires_at > NOW()
+    ORDER BY i.generated_at DESC, i.insight_type
+""")
+
+# Order in which insights explain a creator's performance
+EXPLANATION_TYPES = ('performance', 'content_strategy', 'timing', 'growth', 'audience', 'monetization')
+
+class InsightsService:
+    @staticmethod
+    def _run_batch(cursor, params: Dict[str, Any]) -> int:
+        for query in BATCH_QUERIES:
+            cursor.execute(query, params)
+        cursor.execute("ANALYZE insight_batch")
+        for query in INSIGHT_PASSES.values():
+            cursor.execute(query, params)
+        cursor.execute(SKIP_DISMISSED_QUERY, params)
+        cursor.execute(DELETE_REPLACED_QUERY, params)
+        cursor.execute(INSERT_INSIGHTS_QUERY, params)
+        generated = max(cursor.rowcount, 0)
+        cursor.execute(INSERT_SOURCES_QUERY)
+        return generated
+
+    @staticmethod
+    def generate_insights() -> Dict[str, int]:
+        """
+        Regenerates the insights of every creator with new rollups, follower
+        snapshots or campaigns since the last run, or with expired insights.
+        Creators are processed INSIGHT_BATCH_SIZE at a time, one transaction
+        per batch, each running one set-based pass per insight type. The
+        watermark only moves once every batch has committed; a failed run is
+        simply repeated.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            # Only while the affected creators are read, as in the other jobs
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('rollup_engine'))")
+            cursor.execute("SELECT watermark FROM rollup_watermarks WHERE rollup_name = %s", (WATERMARK_NAME,))
+            row = cursor.fetchone()
+            # Snapshots and campaigns aren't written under the lock; rows from
+            # transactions still in flight are picked up by the next run
+            cursor.execute("SELECT NOW() as now, NOW() - %s * INTERVAL '1 second' as watermark", (ROLLUP_SAFETY_LAG_SECONDS,))
+            now = cursor.fetchone()
+            params = {
+                "old_watermark": row['watermark'] if row else datetime.min.replace(tzinfo=timezone.utc),
+                "new_watermark": now['watermark'],
+                "source_model": INSIGHTS_MODEL
+            }
+            cursor.execute(AFFECTED_CREATORS_QUERY, params)
+            creator_ids = [str(row['creator_id']) for row in cursor.fetchall()]
+            conn.commit()
+
+            params.update({
+                "now": now['now'],
+                "today": now['now'].astimezone(timezone.utc).date(),
+                "expires_at": now['now'] + timedelta(days=INSIGHT_TTL_DAYS),
+                "prior": POSTING_HEATMAP_PRIOR_POSTS,
+                "day_names": list(DAY_NAMES),
+                "min_posts": INSIGHT_MIN_POSTS
+            })
+            generated = 0
+            for start in range(0, len(creator_ids), INSIGHT_BATCH_SIZE):
+                params["creator_ids"] = creator_ids[start:start + INSIGHT_BATCH_SIZE]
+                generated += InsightsService._run_batch(cursor, params)
+                conn.commit()
+
+            cursor.execute(UPSERT_WATERMARK_QUERY, (WATERMARK_NAME, params["new_watermark"], generated))
+
+            stats = {"creators_evaluated": len(creator_ids), "insights_generated": generated}
+            logger.info(f"Insights generated: {stats}")
+            return stats
+
+    @staticmethod
+    def _shape_explanation(insights: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        The explain response from the creator's precomputed insights: their
+        metrics as facts, the highest-ranked one as the explanation and the
+        first opportunity as the recommendation.
+        """
+        by_type = {insight['insight_type']: insight for insight in insights}
+        ranked = [by_type[insight_type] for insight_type in EXPLANATION_TYPES if insight_type in by_type]
+        opportunities = [insight for insight in ranked if insight['severity'] == 'opportunity']
+        return {
+            "facts": {
+                insight['insight_type']: {
+                    source['metric_name']: float(source['metric_value']) if source['metric_value'] is not None else None
+                    for source in insight['sources']
+                }
+                for insight in ranked
+            },
+            "explanation": ranked[0]['description'] if ranked else "Not enough recent activity to explain performance yet.",
+            "recommendation": opportunities[0]['description'] if opportunities else "Keep posting consistently; insights refresh as new data arrives.",
+            "insights": insights
+        }
+
+    @staticmethod
+    def get_explanation(creator_id: str) -> Dict[str, Any]:
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(ACTIVE_INSIGHTS_QUERY, (creator_id,))
+            return InsightsService._shape_explanation(cursor.fetchall())
+
+
+class AsyncInsightsService:
+    @staticmethod
+    async def get_explanation(creator_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(ACTIVE_INSIGHTS_QUERY, (creator_id,))
+            return InsightsService._shape_explanation(await cursor.fetchall())
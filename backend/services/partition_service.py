@@ -0,0 +1,32 @@
+from database import get_db_connection, get_db_cursor
+from typing import Dict
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Months of empty partitions kept ahead of today
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Monthly range-partitioned tables (12_partitioning.sql)
+PARTITIONED_TABLES = ('posts_master', 'content_engagement_snapshots')
+
+ENSURE_PARTITIONS_QUERY = "SELECT ensure_monthly_partitions(%s, 0, %s) as created"
+
+
+class PartitionService:
+    @staticmethod
+    def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> Dict[str, int]:
+        """
+        Creates the monthly partitions up to `months_ahead` months from now and
+        moves rows that landed in a default partition into their own month.
+        Returns the number of partitions created per table.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            stats = {}
+            for table in PARTITIONED_TABLES:
+                cursor.execute(ENSURE_PARTITIONS_QUERY, (table, months_ahead))
+                stats[table] = cursor.fetchone()['created']
+            logger.info(f"Partitions ensured: {stats}")
+            return stats
@@ -0,0 +1,306 @@
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import math
+import os
+import time
+from query_registry import register_query
+
+METRICS = ('engagement_rate', 'views', 'posting_frequency')
+DIMENSIONS = ('global', 'category', 'platform', 'content_type')
+
+# Must match sketch_bucket() in 13_percentile_sketches.sql
+SKETCH_RELATIVE_ACCURACY = 0.01
+LOG_GAMMA = math.log((1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY))
+ZERO_BUCKET = -32768
+
+# How long a worker serves its loaded sketches before reading them again
+SKETCH_REFRESH_SECONDS = int(os.getenv("SKETCH_REFRESH_SECONDS", "60"))
+
+SketchKey = Tuple[str, str, str]
+
+# Creators whose rank stats are recomputed: those touched by the rollup run
+# (rollup_affected_days, see rollup_service.py), or every creator on a rebuild
+AFFECTED_CREATORS_QUERY = """
+    CREATE TEMP TABLE rank_affected_creators ON COMMIT DROP AS
+    SELECT DISTINCT creator_id FROM rollup_affected_days
+"""
+
+ALL_CREATORS_QUERY = """
+    CREATE TEMP TABLE rank_affected_creators ON COMMIT DROP AS
+    SELECT creator_id FROM creators
+"""
+
+# Current values from creator_daily_summary, once per dimension. Posting
+# frequency is posts per week between the creator's first and latest post
+# (at least one week), so it only changes when their posts do.
+NEW_RANK_STATS_QUERY = """
+    CREATE TEMP TABLE rank_new_stats ON COMMIT DROP AS
+    WITH totals AS (
+        SELECT
+            d.creator_id,
+            GROUPING(d.platform, d.content_type) as grouping_id,
+            d.platform,
+            d.content_type,
+            SUM(d.total_posts) as posts,
+            SUM(d.total_views) as views,
+            SUM(d.total_likes + d.total_comments + d.total_shares) as engagement,
+            MAX(d.summary_date) - MIN(d.summary_date) + 1 as active_days
+        FROM rank_affected_creators a
+        JOIN creator_daily_summary d ON d.creator_id = a.creator_id
+        GROUP BY GROUPING SETS ((d.creator_id), (d.creator_id, d.platform), (d.creator_id, d.content_type))
+    ),
+    per_dimension AS (
+        SELECT
+            creator_id,
+            CASE grouping_id WHEN 3 THEN 'global' WHEN 1 THEN 'platform' ELSE 'content_type' END as dimension,
+            CASE grouping_id WHEN 3 THEN '' WHEN 1 THEN platform ELSE content_type END as dimension_value,
+            posts, views, engagement, active_days
+        FROM totals
+        UNION ALL
+        SELECT t.creator_id, 'category', cat.category, t.posts, t.views, t.engagement, t.active_days
+        FROM totals t
+        JOIN creators c ON c.creator_id = t.creator_id
+        CROSS JOIN LATERAL (SELECT DISTINCT unnest(c.content_categories) as category) cat
+        WHERE t.grouping_id = 3 AND cat.category IS NOT NULL
+    )
+    SELECT s.creator_id, m.metric, s.dimension, s.dimension_value, m.value, sketch_bucket(m.value) as bucket
+    FROM per_dimension s
+    CROSS JOIN LATERAL (VALUES
+        ('engagement_rate', CASE WHEN s.views > 0 THEN s.engagement::float / s.views ELSE 0 END),
+        ('views', s.views::float),
+        ('posting_frequency', s.posts::float / GREATEST(s.active_days / 7.0, 1))
+    ) m(metric, value)
+"""
+
+# Moves the affected creators out of their old buckets and into their new ones
+APPLY_SKETCH_DELTAS_QUERIES = ("""
+    INSERT INTO percentile_sketch_buckets (metric, dimension, dimension_value, bucket, creator_count)
+    SELECT metric, dimension, dimension_value, bucket, SUM(delta)
+    FROM (
+        SELECT s.metric, s.dimension, s.dimension_value, s.bucket, -1 as delta
+        FROM creator_rank_stats s
+        JOIN rank_affected_creators a ON a.creator_id = s.creator_id
+        UNION ALL
+        SELECT metric, dimension, dimension_value, bucket, 1
+        FROM rank_new_stats
+    ) deltas
+    GROUP BY metric, dimension, dimension_value, bucket
+    HAVING SUM(delta) <> 0
+    ON CONFLICT (metric, dimension, dimension_value, bucket) DO UPDATE SET
+        creator_count = percentile_sketch_buckets.creator_count + EXCLUDED.creator_count
+""", """
+    DELETE FROM percentile_sketch_buckets WHERE creator_count <= 0
+""", """
+    DELETE FROM creator_rank_stats s
+    USING rank_affected_creators a
+    WHERE s.creator_id = a.creator_id
+""", """
+    INSERT INTO creator_rank_stats (creator_id, metric, dimension, dimension_value, value, bucket)
+    SELECT creator_id, metric, dimension, dimension_value, value, bucket
+    FROM rank_new_stats
+""")
+
+CLEAR_SKETCHES_QUERIES = (
+    "DELETE FROM percentile_sketch_buckets",
+    "DELETE FROM creator_rank_stats"
+)
+
+SKETCH_BUCKETS_QUERY = """
+    SELECT metric, dimension, dimension_value, bucket, creator_count
+    FROM percentile_sketch_buckets
+"""
+
+CREATOR_RANK_STATS_QUERY = register_query("rankings.creator_stats", """
+    SELECT metric, dimension, dimension_value, value
+    FROM creator_rank_stats
+    WHERE creator_id = %s
+""")
+
+
+def sketch_bucket(value: Optional[float]) -> int:
+    if value is None or value <= 0:
+        return ZERO_BUCKET
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+
+class PercentileSketch:
+    """
+    One distribution as cumulative creator counts over log-spaced buckets.
+    percentile() is a bucket computation and two array reads, so it costs
+    the same for 100 or 1M creators; ranks are exact up to the 1% bucket width.
+    """
+    __slots__ = ("total", "zero_count", "min_bucket", "max_bucket", "counts", "below")
+
+    def __init__(self, bucket_counts: Dict[int, int]):
+        bucket_counts = dict(bucket_counts)
+        self.zero_count = bucket_counts.pop(ZERO_BUCKET, 0)
+        self.total = self.zero_count + sum(bucket_counts.values())
+        self.min_bucket = min(bucket_counts) if bucket_counts else 0
+        self.max_bucket = max(bucket_counts) if bucket_counts else -1
+        self.counts = [bucket_counts.get(b, 0) for b in range(self.min_bucket, self.max_bucket + 1)]
+        # below[i]: creators in buckets before min_bucket + i
+        self.below = []
+        running = self.zero_count
+        for count in self.counts:
+            self.below.append(running)
+            running += count
+
+    def percentile(self, value: Optional[float]) -> Optional[float]:
+        """
+        Share of creators below `value` (half of those in the same bucket
+        count as below), 0-100.
+        """
+        if not self.total:
+            return None
+        bucket = sketch_bucket(value)
+        if bucket == ZERO_BUCKET:
+            below, same = 0, self.zero_count
+        elif bucket < self.min_bucket:
+            below, same = self.zero_count, 0
+        elif bucket > self.max_bucket:
+            below, same = self.total, 0
+        else:
+            index = bucket - self.min_bucket
+            below, same = self.below[index], self.counts[index]
+        return round(100.0 * (below + same / 2) / self.total, 1)
+
+
+class SketchSet:
+    """Every loaded sketch, keyed by (metric, dimension, dimension_value)."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        buckets: Dict[SketchKey, Dict[int, int]] = {}
+        for row in rows:
+            key = (row['metric'], row['dimension'], row['dimension_value'])
+            buckets.setdefault(key, {})[row['bucket']] = row['creator_count']
+        self.sketches = {key: PercentileSketch(counts) for key, counts in buckets.items()}
+        self.loaded_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= SKETCH_REFRESH_SECONDS
+
+    def percentile(self, metric: str, value: Optional[float], dimension: str = 'global',
+                   dimension_value: str = '') -> Optional[float]:
+        sketch = self.sketches.get((metric, dimension, dimension_value))
+        return sketch.percentile(value) if sketch else None
+
+    def creator_percentiles(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Ranks for a creator's creator_rank_stats rows:
+        {metric: {"global": p, "category": {name: p}, "platform": {...}, "content_type": {...}}}
+        """
+        ranks: Dict[str, Any] = {}
+        for row in rows:
+            percentile = self.percentile(row['metric'], row['value'], row['dimension'], row['dimension_value'])
+            metric_ranks = ranks.setdefault(row['metric'], {})
+            if row['dimension'] == 'global':
+                metric_ranks['global'] = percentile
+            else:
+                metric_ranks.setdefault(row['dimension'], {})[row['dimension_value']] = percentile
+        return ranks
+
+    def search_percentiles(self, engagement_rate: float, views: float, domain: Optional[str]) -> Dict[str, Any]:
+        """Ranks for a search result's totals, also within `domain` when one was searched."""
+        ranks = {}
+        for metric, value in (('engagement_rate', engagement_rate), ('views', views)):
+            ranks[metric] = {"global": self.percentile(metric, value)}
+            if domain:
+                ranks[metric]["category"] = {domain: self.percentile(metric, value, 'category', domain)}
+        return ranks
+
+
+_sketches: Optional[SketchSet] = None
+_sketches_lock = asyncio.Lock()
+
+
+class RankingService:
+    @staticmethod
+    def refresh_sketches(cursor, rebuild: bool = False) -> Dict[str, int]:
+        """
+        Moves the creators touched by the current rollup run to their new
+        buckets; must run inside RollupService.refresh_all after the posts
+        rollups. With `rebuild` (or before the first build) every creator is
+        recomputed from scratch.
+        """
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM creator_rank_stats) as built")
+        if rebuild or not cursor.fetchone()['built']:
+            for query in CLEAR_SKETCHES_QUERIES:
+                cursor.execute(query)
+            cursor.execute(ALL_CREATORS_QUERY)
+        else:
+            cursor.execute(AFFECTED_CREATORS_QUERY)
+
+        cursor.execute(NEW_RANK_STATS_QUERY)
+        for query in APPLY_SKETCH_DELTAS_QUERIES:
+            cursor.execute(query)
+        cursor.execute("SELECT COUNT(*) as row_count FROM rank_new_stats")
+        return {"creator_rank_stats": cursor.fetchone()["row_count"]}
+
+    @staticmethod
+    def get_sketches() -> SketchSet:
+        global _sketches
+        if _sketches is None or _sketches.is_stale():
+            with get_db_connection() as conn:
+                cursor = get_db_cursor(conn)
+                cursor.execute(SKETCH_BUCKETS_QUERY)
+                _sketches = SketchSet(cursor.fetchall())
+        return _sketches
+
+    @staticmethod
+    def get_creator_percentiles(creator_id: str) -> Dict[str, Any]:
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(CREATOR_RANK_STATS_QUERY, (creator_id,))
+            rows = cursor.fetchall()
+        return RankingService.get_sketches().creator_percentiles(rows)
+
+    @staticmethod
+    def get_percentile(metric: str, value: float, dimension: str = 'global', dimension_value: str = '') -> Dict[str, Any]:
+        return RankingService._shape_percentile(
+            metric, value, dimension, dimension_value,
+            RankingService.get_sketches().percentile(metric, value, dimension, dimension_value)
+        )
+
+    @staticmethod
+    def _shape_percentile(metric: str, value: float, dimension: str, dimension_value: str,
+                          percentile: Optional[float]) -> Dict[str, Any]:
+        return {
+            "metric": metric,
+            "value": value,
+            "dimension": dimension,
+            "dimension_value": dimension_value or None,
+            "percentile": percentile,
+            "top_percent": round(100 - percentile, 1) if percentile is not None else None
+        }
+
+
+class AsyncRankingService:
+    @staticmethod
+    async def get_sketches() -> SketchSet:
+        global _sketches
+        if _sketches is None or _sketches.is_stale():
+            # One reload per worker, however many requests find it stale
+            async with _sketches_lock:
+                if _sketches is None or _sketches.is_stale():
+                    async with get_async_db_connection() as conn:
+                        cursor = get_async_db_cursor(conn)
+                        await cursor.execute(SKETCH_BUCKETS_QUERY)
+                        _sketches = SketchSet(await cursor.fetchall())
+        return _sketches
+
+    @staticmethod
+    async def get_creator_percentiles(creator_id: str) -> Dict[str, Any]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(CREATOR_RANK_STATS_QUERY, (creator_id,))
+            rows = await cursor.fetchall()
+        return (await AsyncRankingService.get_sketches()).creator_percentiles(rows)
+
+    @staticmethod
+    async def get_percentile(metric: str, value: float, dimension: str = 'global', dimension_value: str = '') -> Dict[str, Any]:
+        sketches = await AsyncRankingService.get_sketches()
+        return RankingService._shape_percentile(
+            metric, value, dimension, dimension_value,
+            sketches.percentile(metric, value, dimension, dimension_value)
+        )
@@ -1,47 +1,251 @@
-from database import get_db_connection, get_db_cursor
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
 from typing import List, Dict, Any
-from services.analytics_service import AnalyticsService
-from services.trends_service import TrendsService
+from datetime import timedelta
+from query_registry import register_query
+from services.analytics_service import DAY_NAMES, POSTING_HEATMAP_PRIOR_POSTS, BEST_POSTING_SLOTS_SQL
+from services.rollup_service import UPSERT_WATERMARK_QUERY
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# source_model of the rule-based recommendations; a run replaces the active
+# ones of this model for every creator it evaluates
+RULES_MODEL = 'rules_v1'
+WATERMARK_NAME = 'recommendations'
+# Active recommendations are re-evaluated once they are this old, even without
+# new data: the content fatigue rule's windows end today, and a time zone
+# change moves the posting-time rule's heatmap without touching the rollups
+RECOMMENDATION_TTL_DAYS = int(os.getenv("RECOMMENDATION_TTL_DAYS", "1"))
+
+# Creators whose creator_daily_summary rows were recomputed since the last run
+# (see alert_service.py), plus those whose active recommendations are older
+# than RECOMMENDATION_TTL_DAYS
+AFFECTED_CREATORS_QUERY = """
+    CREATE TEMP TABLE rec_affected_creators ON COMMIT DROP AS
+    SELECT creator_id
+    FROM creator_daily_summary
+    WHERE computed_at > COALESCE(%(old_watermark)s, '-infinity'::timestamptz)
+    AND computed_at <= %(new_watermark)s
+    UNION
+    SELECT c.creator_id
+    FROM recommendations r
+    JOIN creators c ON c.user_id = r.user_id
+    WHERE r.source_model = %(source_model)s
+    AND r.acted_upon_at IS NULL
+    AND r.generated_at <= %(stale_before)s
+"""
+
+# Every rule for every affected creator, one row per recommendation:
+#   content_type    - the content type with the best average engagement rate
+#   posting_time    - the posting-time heatmap cell with the best score, as in
+#                     AnalyticsService._shape_posting_time
+#   content_fatigue - the latest 7 UTC days' engagement rate is below the 7 before
+# Ties break like the dashboard: first content type, earliest day and hour.
+CANDIDATES_QUERY = """
+    CREATE TEMP TABLE rec_candidates ON COMMIT DROP AS
+    WITH formats AS (
+        SELECT DISTINCT ON (d.creator_id)
+            d.creator_id,
+            d.content_type,
+            SUM(d.engagement_rate_sum) / NULLIF(SUM(d.rated_posts), 0) as avg_engagement,
+            SUM(d.total_posts) as post_count
+        FROM rec_affected_creators a
+        JOIN creator_daily_summary d ON d.creator_id = a.creator_id
+        GROUP BY d.creator_id, d.content_type
+        ORDER BY d.creator_id, SUM(d.engagement_rate_sum) / NULLIF(SUM(d.rated_posts), 0) DESC NULLS LAST, d.content_type
+    ),
+    slots AS ({best_slots}    ),
+    weeks AS (
+        SELECT
+            d.creator_id,
+            SUM(d.total_likes + d.total_comments + d.total_shares)
+                FILTER (WHERE d.summary_date > %(today)s - 7)::float
+                / NULLIF(SUM(d.total_views) FILTER (WHERE d.summary_date > %(today)s - 7), 0) as current_rate,
+            SUM(d.total_likes + d.total_comments + d.total_shares)
+                FILTER (WHERE d.summary_date <= %(today)s - 7)::float
+                / NULLIF(SUM(d.total_views) FILTER (WHERE d.summary_date <= %(today)s - 7), 0) as previous_rate
+        FROM rec_affected_creators a
+        JOIN creator_daily_summary d
+            ON d.creator_id = a.creator_id
+            AND d.summary_date > %(today)s - 14
+            AND d.summary_date <= %(today)s
+        GROUP BY d.creator_id
+    ),
+    rules AS (
+        SELECT
+            f.creator_id,
+            'content_type' as rule,
+            'content_type' as recommendation_type,
+            1 as priority,
+            'Increase ' || f.content_type || ' frequency' as title,
+            'Your ' || f.content_type || 's have a ' || round((COALESCE(f.avg_engagement, 0) * 100)::numeric, 1)
+                || '%% engagement rate, higher than other formats.' as description,
+            'Post more ' || f.content_type || 's' as suggested_action,
+            'An average engagement rate closer to ' || round((COALESCE(f.avg_engagement, 0) * 100)::numeric, 1)
+                || '%% across your posts' as expected_outcome,
+            'creator_daily_summary' as source_table,
+            jsonb_build_object(
+                'condition', 'highest average engagement rate among content types',
+                'content_type', f.content_type,
+                'avg_engagement_rate', f.avg_engagement,
+                'post_count', f.post_count
+            ) as trigger_condition
+        FROM formats f
+        UNION ALL
+        SELECT
+            s.creator_id,
+            'posting_time',
+            'posting_time',
+            2,
+            'Optimal posting time: ' || (%(day_names)s::text[])[s.post_day + 1] || 's at ' || s.post_hour || ':00',
+            'Your ' || (%(day_names)s::text[])[s.post_day + 1] || ' ' || s.post_hour || ':00 posts (' || cr.timezone
+                || ') average a ' || round((COALESCE(s.avg_engagement, 0) * 100)::numeric, 1) || '%% engagement rate across '
+                || s.post_count || ' posts (' || round((s.confidence * 100)::numeric) || '%% confidence).',
+            'Schedule posts for ' || (%(day_names)s::text[])[s.post_day + 1] || 's at ' || s.post_hour || ':00 ' || cr.timezone,
+            'Posts in this slot average a ' || round((COALESCE(s.avg_engagement, 0) * 100)::numeric, 1) || '%% engagement rate',
+            'creator_posting_heatmap',
+            jsonb_build_object(
+                'condition', 'best confidence-weighted posting-time score',
+                'post_day', s.post_day,
+                'post_hour', s.post_hour,
+                'timezone', cr.timezone,
+                'score', s.score,
+                'confidence', s.confidence,
+                'post_count', s.post_count
+            )
+        FROM slots s
+        JOIN creators cr ON cr.creator_id = s.creator_id
+        UNION ALL
+        SELECT
+            w.creator_id,
+            'content_fatigue',
+            'engagement_strategy',
+            1,
+            'Engagement Drop Alert',
+            'Your engagement has dropped. Try varying your content types or interacting more with comments.',
+            'Vary your content types and reply to comments',
+            'Engagement back to your previous ' || round((w.previous_rate * 100)::numeric, 1) || '%% rate',
+            'creator_daily_summary',
+            jsonb_build_object(
+                'condition', 'last 7 days engagement rate below the 7 days before',
+                'current_engagement_rate', w.current_rate,
+                'previous_engagement_rate', w.previous_rate
+            )
+        FROM weeks w
+        WHERE w.previous_rate > 0 AND COALESCE(w.current_rate, 0) < w.previous_rate
+    )
+    SELECT uuid_generate_v4() as recommendation_id, c.user_id, r.*
+    FROM rules r
+    JOIN creators c ON c.creator_id = r.creator_id
+""".format(best_slots=BEST_POSTING_SLOTS_SQL.format(creators="rec_affected_creators"))
+
+# Recommendations not acted upon are replaced; acted-upon ones are kept as history
+DELETE_ACTIVE_QUERY = """
+    DELETE FROM recommendations r
+    USING rec_affected_creators a
+    JOIN creators c ON c.creator_id = a.creator_id
+    WHERE r.user_id = c.user_id
+    AND r.acted_upon_at IS NULL
+    AND r.source_model = %(source_model)s
+"""
+
+INSERT_RECOMMENDATIONS_QUERY = """
+    INSERT INTO recommendations (
+        recommendation_id, user_id, recommendation_type, title, description,
+        suggested_action, expected_outcome, priority, source_model, metadata
+    )
+    SELECT
+        recommendation_id, user_id, recommendation_type, title, description,
+        suggested_action, expected_outcome, priority, %(source_model)s,
+        jsonb_build_object('rule', rule, 'creator_id', creator_id)
+    FROM rec_candidates
+"""
+
+INSERT_SOURCES_QUERY = """
+    INSERT INTO recommendation_sources (recommendation_id, source_table, source_record_id, trigger_condition)
+    SELECT recommendation_id, source_table, creator_id, trigger_condition
+    FROM rec_candidates
+"""
+
+# Served by idx_recommendations_active
+ACTIVE_RECOMMENDATIONS_QUERY = register_query("recommendations.active", """
+    SELECT
+        r.recommendation_id,
+        COALESCE(r.metadata->>'rule', r.recommendation_type) as type,
+        r.title,
+        r.description,
+        r.suggested_action,
+        r.expected_outcome,
+        r.priority,
+        r.generated_at
+    FROM recommendations r
+    WHERE r.user_id = (SELECT user_id FROM creators WHERE creator_id = %s)
+    AND r.acted_upon_at IS NULL
+    ORDER BY r.priority, r.generated_at DESC, r.recommendation_type
+""")
 
 class RecommendationsService:
+    @staticmethod
+    def generate_recommendations() -> Dict[str, int]:
+        """
+        Evaluates the deterministic rules (best content type, best posting
+        time, content fatigue) for every creator whose rollups changed since
+        the last run or whose recommendations are RECOMMENDATION_TTL_DAYS
+        old, and replaces their active recommendations, with the
+        metrics that triggered each in recommendation_sources. One
+        transaction under the rollup engine's advisory lock, so it is meant
+        to run after `python jobs.py rollups`.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('rollup_engine'))")
+
+            cursor.execute("SELECT watermark FROM rollup_watermarks WHERE rollup_name = %s", (WATERMARK_NAME,))
+            row = cursor.fetchone()
+            cursor.execute("SELECT NOW() as watermark, (NOW() AT TIME ZONE 'UTC')::date as today")
+            now = cursor.fetchone()
+            params = {
+                "old_watermark": row['watermark'] if row else None,
+                "new_watermark": now['watermark'],
+                "stale_before": now['watermark'] - timedelta(days=RECOMMENDATION_TTL_DAYS),
+                "today": now['today'],
+                "prior": POSTING_HEATMAP_PRIOR_POSTS,
+                "day_names": list(DAY_NAMES),
+                "source_model": RULES_MODEL
+            }
+
+            cursor.execute(AFFECTED_CREATORS_QUERY, params)
+            evaluated = max(cursor.rowcount, 0)
+            cursor.execute("ANALYZE rec_affected_creators")
+            cursor.execute(CANDIDATES_QUERY, params)
+            cursor.execute(DELETE_ACTIVE_QUERY, params)
+            replaced = max(cursor.rowcount, 0)
+            cursor.execute(INSERT_RECOMMENDATIONS_QUERY, params)
+            generated = max(cursor.rowcount, 0)
+            cursor.execute(INSERT_SOURCES_QUERY)
+            cursor.execute(UPSERT_WATERMARK_QUERY, (WATERMARK_NAME, params["new_watermark"], generated))
+
+            stats = {"creators_evaluated": evaluated, "recommendations_replaced": replaced, "recommendations_generated": generated}
+            logger.info(f"Recommendations generated: {stats}")
+            return stats
+
     @staticmethod
     def get_recommendations(creator_id: str) -> List[Dict[str, Any]]:
         """
-        Generate recommendations using deterministic rules:
-        Best content type, Best posting time, Content fatigue detection
+        The creator's active recommendations, as last written by
+        generate_recommendations (`python jobs.py recommendations`).
         """
-        recs = []
-        
-        # 1. Best Content Type Rule
-        comparison = AnalyticsService.get_content_format_comparison(creator_id)
-        if comparison:
-            best_format = max(comparison, key=lambda x: x['avg_engagement_score'])
-            recs.append({
-                "type": "content_type",
-                "title": f"Increase {best_format['content_type']} frequency",
-                "description": f"Your {best_format['content_type']}s have a {best_format['avg_engagement_score']:.1f}% engagement rate, higher than other formats.",
-                "priority": 1
-            })
-
-        # 2. Best Posting Time Rule
-        time_analysis = AnalyticsService.get_posting_time_analysis(creator_id)
-        if time_analysis['hourly_analysis']:
-            best_hour = max(time_analysis['hourly_analysis'], key=lambda x: x['avg_engagement'])
-            recs.append({
-                "type": "posting_time",
-                "title": f"Optimal posting time: {best_hour['hour']}:00",
-                "description": f"Posts at {best_hour['hour']}:00 see {best_hour['avg_engagement']:.1f}% more reach on average.",
-                "priority": 2
-            })
-
-        # 3. Content Fatigue Rule
-        trends = TrendsService.get_trends(creator_id)
-        if trends['facts']['engagement_change'].startswith('-'):
-            recs.append({
-                "type": "content_fatigue",
-                "title": "Engagement Drop Alert",
-                "description": "Your engagement has dropped. Try varying your content types or interacting more with comments.",
-                "priority": 1
-            })
-
-        return recs
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(ACTIVE_RECOMMENDATIONS_QUERY, (creator_id,))
+            return cursor.fetchall()
+
+
+class AsyncRecommendationsService:
+    @staticmethod
+    async def get_recommendations(creator_id: str) -> List[Dict[str, Any]]:
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(ACTIVE_RECOMMENDATIONS_QUERY, (creator_id,))
+            return await cursor.fetchall()
@@ -0,0 +1,293 @@
+from database import get_db_connection, get_db_cursor
+from services.ranking_service import RankingService
+from typing import Dict
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Changes newer than NOW() - lag are left for the next run, so rows written by
+# transactions that were still in flight when the refresh started are not skipped.
+ROLLUP_SAFETY_LAG_SECONDS = int(os.getenv("ROLLUP_SAFETY_LAG_SECONDS", "60"))
+
+POSTS_ROLLUPS = ('creator_daily_summary', 'creator_weekly_summary', 'platform_comparison_aggregates', 'creator_totals')
+
+# Every (creator, UTC day) touched by posts changed inside the watermark window,
+# including the old location of updated or deleted rows.
+AFFECTED_DAYS_QUERY = """
+    CREATE TEMP TABLE rollup_affected_days ON COMMIT DROP AS
+    SELECT creator_id, (post_datetime AT TIME ZONE 'UTC')::date as summary_date
+    FROM posts_master
+    WHERE updated_at > COALESCE(%(old_watermark)s, '-infinity'::timestamptz)
+    AND updated_at <= %(new_watermark)s
+    UNION
+    SELECT creator_id, (post_datetime AT TIME ZONE 'UTC')::date as summary_date
+    FROM posts_master_changes
+    WHERE changed_at > COALESCE(%(old_watermark)s, '-infinity'::timestamptz)
+    AND changed_at <= %(new_watermark)s
+"""
+
+REFRESH_DAILY_QUERIES = ("""
+    DELETE FROM creator_daily_summary d
+    USING rollup_affected_days a
+    WHERE d.creator_id = a.creator_id AND d.summary_date = a.summary_date
+""", """
+    INSERT INTO creator_daily_summary (
+        creator_id, platform, content_type, summary_date,
+        total_posts, total_views, total_likes, total_comments, total_shares,
+        engagement_rate_sum, rated_posts
+    )
+    SELECT
+        p.creator_id, p.platform, p.content_type, a.summary_date,
+        COUNT(*),
+        SUM(p.views), SUM(p.likes), SUM(p.comments), SUM(p.shares),
+        COALESCE(SUM((p.likes + p.comments + p.shares)::float / NULLIF(p.views, 0)), 0),
+        COUNT(*) FILTER (WHERE p.views > 0)
+    FROM rollup_affected_days a
+    JOIN posts_master p
+        ON p.creator_id = a.creator_id
+        AND p.post_datetime >= (a.summary_date::timestamp AT TIME ZONE 'UTC')
+        AND p.post_datetime < ((a.summary_date + 1)::timestamp AT TIME ZONE 'UTC')
+    GROUP BY p.creator_id, p.platform, p.content_type, a.summary_date
+""")
+
+# Weeks start on Monday (date_trunc('week')). top_performing_content_id stays NULL:
+# posts_master rows are not linked to the content table.
+REFRESH_WEEKLY_QUERIES = ("""
+    CREATE TEMP TABLE rollup_affected_weeks ON COMMIT DROP AS
+    SELECT DISTINCT creator_id, date_trunc('week', summary_date)::date as week_start_date
+    FROM rollup_affected_days
+""", """
+    DELETE FROM creator_weekly_summary w
+    USING rollup_affected_weeks a
+    WHERE w.creator_id = a.creator_id AND w.week_start_date = a.week_start_date
+""", """
+    INSERT INTO creator_weekly_summary (
+        creator_id, platform_id, week_start_date,
+        total_posts, total_views, total_engagement,
+        total_likes, total_comments, total_shares,
+        avg_engagement_rate, follower_growth
+    )
+    SELECT
+        w.creator_id, w.platform_id, w.week_start_date,
+        w.total_posts, w.total_views, w.total_likes + w.total_comments + w.total_shares,
+        w.total_likes, w.total_comments, w.total_shares,
+        w.avg_engagement_rate,
+        COALESCE((
+            SELECT (array_agg(f.follower_count ORDER BY f.snapshot_at DESC))[1]
+                 - (array_agg(f.follower_count ORDER BY f.snapshot_at ASC))[1]
+            FROM follower_growth_snapshots f
+            WHERE f.creator_id = w.creator_id
+            AND f.platform_id = w.platform_id
+            AND f.snapshot_at >= (w.week_start_date::timestamp AT TIME ZONE 'UTC')
+            AND f.snapshot_at < ((w.week_start_date + 7)::timestamp AT TIME ZONE 'UTC')
+        ), 0)::int
+    FROM (
+        SELECT
+            d.creator_id, pl.platform_id, a.week_start_date,
+            SUM(d.total_posts) as total_posts,
+            SUM(d.total_views) as total_views,
+            SUM(d.total_likes) as total_likes,
+            SUM(d.total_comments) as total_comments,
+            SUM(d.total_shares) as total_shares,
+            SUM(d.engagement_rate_sum) / NULLIF(SUM(d.rated_posts), 0) as avg_engagement_rate
+        FROM rollup_affected_weeks a
+        JOIN creator_daily_summary d
+            ON d.creator_id = a.creator_id
+            AND d.summary_date >= a.week_start_date
+            AND d.summary_date < a.week_start_date + 7
+        JOIN platforms pl ON lower(pl.platform_name) = d.platform
+        GROUP BY d.creator_id, pl.platform_id, a.week_start_date
+    ) w
+""")
+
+# All-time totals of each touched creator, for creator search
+REFRESH_CREATOR_TOTALS_QUERIES = ("""
+    CREATE TEMP TABLE rollup_affected_creators ON COMMIT DROP AS
+    SELECT DISTINCT creator_id FROM rollup_affected_days
+""", """
+    DELETE FROM creator_totals t
+    USING rollup_affected_creators a
+    WHERE t.creator_id = a.creator_id
+""", """
+    INSERT INTO creator_totals (creator_id, total_posts, total_views, total_likes, total_comments, total_shares)
+    SELECT
+        d.creator_id,
+        SUM(d.total_posts), SUM(d.total_views), SUM(d.total_likes), SUM(d.total_comments), SUM(d.total_shares)
+    FROM rollup_affected_creators a
+    JOIN creator_daily_summary d ON d.creator_id = a.creator_id
+    GROUP BY d.creator_id
+""")
+
+# One comparison period per calendar month
+REFRESH_PLATFORM_COMPARISON_QUERIES = ("""
+    CREATE TEMP TABLE rollup_affected_months ON COMMIT DROP AS
+    SELECT DISTINCT
+        creator_id,
+        date_trunc('month', summary_date)::date as period_start,
+        (date_trunc('month', summary_date) + INTERVAL '1 month' - INTERVAL '1 day')::date as period_end
+    FROM rollup_affected_days
+""", """
+    DELETE FROM platform_comparison_aggregates c
+    USING rollup_affected_months a
+    WHERE c.creator_id = a.creator_id
+    AND c.period_start = a.period_start
+    AND c.period_end = a.period_end
+""", """
+    INSERT INTO platform_comparison_aggregates (
+        creator_id, period_start, period_end, platform_id,
+        total_reach, avg_engagement_rate, content_count
+    )
+    SELECT
+        d.creator_id, a.period_start, a.period_end, pl.platform_id,
+        SUM(d.total_views),
+        SUM(d.engagement_rate_sum) / NULLIF(SUM(d.rated_posts), 0),
+        SUM(d.total_posts)
+    FROM rollup_affected_months a
+    JOIN creator_daily_summary d
+        ON d.creator_id = a.creator_id
+        AND d.summary_date BETWEEN a.period_start AND a.period_end
+    JOIN platforms pl ON lower(pl.platform_name) = d.platform
+    GROUP BY d.creator_id, a.period_start, a.period_end, pl.platform_id
+""")
+
+# content_engagement_snapshots hold cumulative counters: a day's delta is its last
+# snapshot minus the previous day's last snapshot. Each affected content item is
+# recomputed from its earliest new snapshot day, seeded with the snapshot before it.
+REFRESH_CONTENT_DAILY_QUERIES = ("""
+    CREATE TEMP TABLE rollup_affected_content ON COMMIT DROP AS
+    SELECT content_id, MIN((snapshot_at AT TIME ZONE 'UTC')::date) as from_date
+    FROM content_engagement_snapshots
+    WHERE created_at > COALESCE(%(old_watermark)s, '-infinity'::timestamptz)
+    AND created_at <= %(new_watermark)s
+    GROUP BY content_id
+""", """
+    DELETE FROM content_daily_performance cdp
+    USING rollup_affected_content a
+    WHERE cdp.content_id = a.content_id AND cdp.date >= a.from_date
+""", """
+    INSERT INTO content_daily_performance (
+        content_id, date, views_delta, likes_delta, comments_delta, shares_delta,
+        engagement_rate, virality_score
+    )
+    SELECT
+        content_id, day, views_delta, likes_delta, comments_delta, shares_delta,
+        (likes + comments + shares)::numeric / NULLIF(views, 0),
+        shares::numeric / NULLIF(views, 0)
+    FROM (
+        SELECT
+            *,
+            views - COALESCE(LAG(views) OVER w, 0) as views_delta,
+            likes - COALESCE(LAG(likes) OVER w, 0) as likes_delta,
+            comments - COALESCE(LAG(comments) OVER w, 0) as comments_delta,
+            shares - COALESCE(LAG(shares) OVER w, 0) as shares_delta
+        FROM (
+            SELECT DISTINCT ON (s.content_id, (s.snapshot_at AT TIME ZONE 'UTC')::date)
+                s.content_id,
+                (s.snapshot_at AT TIME ZONE 'UTC')::date as day,
+                a.from_date,
+                s.views, s.likes, s.comments, s.shares
+            FROM rollup_affected_content a
+            JOIN content_engagement_snapshots s
+                ON s.content_id = a.content_id
+                AND s.snapshot_at >= COALESCE((
+                    SELECT MAX(prev.snapshot_at)
+                    FROM content_engagement_snapshots prev
+                    WHERE prev.content_id = a.content_id
+                    AND prev.snapshot_at < (a.from_date::timestamp AT TIME ZONE 'UTC')
+                ), '-infinity'::timestamptz)
+            ORDER BY s.content_id, (s.snapshot_at AT TIME ZONE 'UTC')::date, s.snapshot_at DESC
+        ) day_last
+        WINDOW w AS (PARTITION BY content_id ORDER BY day)
+    ) deltas
+    WHERE day >= from_date
+""")
+
+UPSERT_WATERMARK_QUERY = """
+    INSERT INTO rollup_watermarks (rollup_name, watermark, rows_affected, refreshed_at)
+    VALUES (%s, %s, %s, NOW())
+    ON CONFLICT (rollup_name) DO UPDATE SET
+        watermark = EXCLUDED.watermark,
+        rows_affected = EXCLUDED.rows_affected,
+        refreshed_at = EXCLUDED.refreshed_at
+"""
+
+class RollupService:
+    """
+    Incremental rollup engine. Each rollup table keeps a watermark in
+    rollup_watermarks; a refresh only recomputes the buckets touched by rows
+    changed since that watermark.
+    """
+    @staticmethod
+    def _get_watermark(cursor, rollup_name: str):
+        cursor.execute("SELECT watermark FROM rollup_watermarks WHERE rollup_name = %s", (rollup_name,))
+        row = cursor.fetchone()
+        return row['watermark'] if row else None
+
+    @staticmethod
+    def _next_watermark(cursor):
+        cursor.execute("SELECT NOW() - %s * INTERVAL '1 second' as watermark", (ROLLUP_SAFETY_LAG_SECONDS,))
+        return cursor.fetchone()['watermark']
+
+    @staticmethod
+    def _run(cursor, queries, params=None) -> int:
+        rows_affected = 0
+        for query in queries:
+            cursor.execute(query, params)
+            if query.lstrip().startswith('INSERT'):
+                rows_affected += max(cursor.rowcount, 0)
+        return rows_affected
+
+    @staticmethod
+    def refresh_posts_rollups(cursor) -> Dict[str, int]:
+        """
+        Refreshes creator_daily_summary and the creator_weekly_summary,
+        platform_comparison_aggregates and creator_totals tables derived from it.
+        """
+        old_watermark = RollupService._get_watermark(cursor, 'creator_daily_summary')
+        new_watermark = RollupService._next_watermark(cursor)
+        params = {"old_watermark": old_watermark, "new_watermark": new_watermark}
+
+        cursor.execute(AFFECTED_DAYS_QUERY, params)
+        stats = {
+            'creator_daily_summary': RollupService._run(cursor, REFRESH_DAILY_QUERIES),
+            'creator_weekly_summary': RollupService._run(cursor, REFRESH_WEEKLY_QUERIES),
+            'platform_comparison_aggregates': RollupService._run(cursor, REFRESH_PLATFORM_COMPARISON_QUERIES),
+            'creator_totals': RollupService._run(cursor, REFRESH_CREATOR_TOTALS_QUERIES)
+        }
+
+        for rollup_name in POSTS_ROLLUPS:
+            cursor.execute(UPSERT_WATERMARK_QUERY, (rollup_name, new_watermark, stats[rollup_name]))
+
+        # Logged changes at or before every posts watermark are fully applied
+        cursor.execute("DELETE FROM posts_master_changes WHERE changed_at <= %s", (new_watermark,))
+        return stats
+
+    @staticmethod
+    def refresh_content_daily_performance(cursor) -> Dict[str, int]:
+        old_watermark = RollupService._get_watermark(cursor, 'content_daily_performance')
+        new_watermark = RollupService._next_watermark(cursor)
+        params = {"old_watermark": old_watermark, "new_watermark": new_watermark}
+
+        cursor.execute(REFRESH_CONTENT_DAILY_QUERIES[0], params)
+        rows_affected = RollupService._run(cursor, REFRESH_CONTENT_DAILY_QUERIES[1:])
+        cursor.execute(UPSERT_WATERMARK_QUERY, ('content_daily_performance', new_watermark, rows_affected))
+        return {'content_daily_performance': rows_affected}
+
+    @staticmethod
+    def refresh_all(rebuild_ranks: bool = False) -> Dict[str, int]:
+        """
+        Runs every rollup refresh in one transaction. An advisory lock keeps
+        concurrent runs from interleaving. The percentile sketches are moved
+        forward with the posts rollups they are computed from; `rebuild_ranks`
+        recomputes them for every creator.
+        """
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('rollup_engine'))")
+
+            stats = RollupService.refresh_posts_rollups(cursor)
+            stats.update(RankingService.refresh_sketches(cursor, rebuild=rebuild_ranks))
+            stats.update(RollupService.refresh_content_daily_performance(cursor))
+            logger.info(f"Rollups refreshed: {stats}")
+            return stats
@@ -0,0 +1,187 @@
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
+from typing import List, Dict, Any, Optional
+from services.analytics_service import AnalyticsService
+from services.ranking_service import RankingService, AsyncRankingService, SketchSet
+
+MAX_SEARCH_LIMIT = 200
+
+# Totals come from creator_totals (20_creator_totals.sql), kept by the posts
+# rollups, so a search reads one row per creator instead of aggregating
+# posts_master. Like rollup_is_fresh() on the dashboard, creators with posts
+# changed since the last creator_totals run are summed from posts_master
+# instead, so search and the overview report the same totals. Creators are
+# ranked with a top-N sort that keeps only offset + limit of them, and the
+# page alone is joined to its profile columns. total_count counts the filtered
+# rows once, in a one-row CTE the page is joined to, so it is still reported
+# for an offset past the last page.
+SEARCH_CREATORS_QUERY = """
+    WITH stale AS (
+        SELECT p.creator_id
+        FROM posts_master p
+        WHERE p.updated_at > COALESCE((SELECT watermark FROM rollup_watermarks WHERE rollup_name = 'creator_totals'), '-infinity')
+        UNION
+        SELECT c.creator_id
+        FROM posts_master_changes c
+        WHERE c.changed_at > COALESCE((SELECT watermark FROM rollup_watermarks WHERE rollup_name = 'creator_totals'), '-infinity')
+    ),
+    stale_totals AS (
+        SELECT
+            s.creator_id,
+            COUNT(p.creator_id) as total_posts,
+            COALESCE(SUM(p.views), 0) as total_views,
+            COALESCE(SUM(p.likes), 0) as total_likes,
+            COALESCE(SUM(p.comments), 0) as total_comments,
+            COALESCE(SUM(p.shares), 0) as total_shares
+        FROM stale s
+        LEFT JOIN posts_master p ON p.creator_id = s.creator_id
+        GROUP BY s.creator_id
+    ),
+    filtered AS (
+        SELECT creator_id, verified, domain_match, engagement_rate
+        FROM (
+            SELECT
+                c.creator_id,
+                c.verified,
+                COALESCE(%(domain)s::text = ANY(c.content_categories), FALSE) as domain_match,
+                CASE WHEN COALESCE(st.total_views, t.total_views, 0) > 0
+                     THEN COALESCE(st.total_likes + st.total_comments + st.total_shares,
+                                   t.total_likes + t.total_comments + t.total_shares)::float
+                          / COALESCE(st.total_views, t.total_views)
+                     ELSE 0 END as engagement_rate
+            FROM creators c
+            INNER JOIN users u ON c.user_id = u.user_id
+            LEFT JOIN stale_totals st ON st.creator_id = c.creator_id
+            LEFT JOIN creator_totals t ON t.creator_id = c.creator_id AND st.creator_id IS NULL
+            WHERE u.user_type = 'creator'
+        ) scored
+        WHERE %(min_engagement)s::float IS NULL OR engagement_rate >= %(min_engagement)s::float
+    ),
+    page AS (
+        SELECT
+            creator_id,
+            engagement_rate,
+            ROUND(LEAST(
+                LEAST(engagement_rate * 10, 50)
+                + CASE WHEN verified THEN 20 ELSE 0 END
+                + CASE WHEN domain_match THEN 30 ELSE 0 END,
+                100
+            )::numeric, 2) as match_score
+        FROM filtered
+        ORDER BY match_score DESC, engagement_rate DESC, creator_id
+        LIMIT %(limit)s OFFSET %(offset)s
+    ),
+    counted AS (
+        SELECT COUNT(*) as total_count FROM filtered
+    )
+    SELECT
+        r.*,
+        n.total_count
+    FROM counted n
+    LEFT JOIN (
+        SELECT
+            p.creator_id, u.user_id, u.username, u.display_name, u.email, c.bio,
+            c.content_categories, c.verified,
+            COALESCE(st.total_views, t.total_views, 0) as views,
+            COALESCE(st.total_likes, t.total_likes, 0) as likes,
+            COALESCE(st.total_comments, t.total_comments, 0) as comments,
+            COALESCE(st.total_shares, t.total_shares, 0) as shares,
+            COALESCE(st.total_posts, t.total_posts, 0) as post_count,
+            p.engagement_rate,
+            p.match_score
+        FROM page p
+        INNER JOIN creators c ON c.creator_id = p.creator_id
+        INNER JOIN users u ON u.user_id = c.user_id
+        LEFT JOIN stale_totals st ON st.creator_id = p.creator_id
+        LEFT JOIN creator_totals t ON t.creator_id = p.creator_id AND st.creator_id IS NULL
+    ) r ON TRUE
+    ORDER BY r.match_score DESC, r.engagement_rate DESC, r.creator_id
+"""
+
+class SearchService:
+    @staticmethod
+    def _search_params(
+        domain: Optional[str],
+        region: Optional[str],
+        min_engagement: Optional[float],
+        limit: int,
+        offset: int
+    ) -> Dict[str, Any]:
+        if region:
+            raise ValueError("Filtering by region is not supported: creators have no region yet")
+        return {
+            "domain": domain,
+            "min_engagement": min_engagement,
+            "limit": max(1, min(limit, MAX_SEARCH_LIMIT)),
+            "offset": max(0, offset)
+        }
+
+    @staticmethod
+    def _shape_results(rows: List[Dict[str, Any]], params: Dict[str, Any], sketches: SketchSet) -> Dict[str, Any]:
+        creators = []
+        # One row carrying total_count, without creator columns, past the last page
+        for row in rows:
+            if row['creator_id'] is None:
+                continue
+            creators.append({
+                "creator_id": row['creator_id'],
+                "user_id": row['user_id'],
+                "username": row['username'],
+                "display_name": row['display_name'],
+                "email": row['email'],
+                "bio": row['bio'],
+                "content_categories": row['content_categories'],
+                "verified": row['verified'],
+                "stats": AnalyticsService._shape_overview(row),
+                "percentile_ranks": sketches.search_percentiles(
+                    row['engagement_rate'], float(row['views']), params["domain"]
+                ),
+                "match_score": float(row['match_score'])
+            })
+        
+        return {
+            "creators": creators,
+            "count": len(creators),
+            "total": int(rows[0]['total_count']),
+            "limit": params["limit"],
+            "offset": params["offset"]
+        }
+
+    @staticmethod
+    def search_creators(
+        domain: Optional[str] = None,
+        region: Optional[str] = None,
+        min_engagement: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Set-based creator search: joins creators to their rolled-up totals
+        (creator_totals, or posts_master for creators changed since the last
+        rollup run), applies the filters and ranks by match score in one statement.
+        match_score = min(engagement_rate * 10, 50) + 20 if verified + 30 if domain match, capped at 100
+        `region` raises ValueError; creators have no region column yet.
+        percentile_ranks come from the in-memory sketches (ranking_service), one lookup per creator.
+        """
+        params = SearchService._search_params(domain, region, min_engagement, limit, offset)
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(SEARCH_CREATORS_QUERY, params)
+            rows = cursor.fetchall()
+        return SearchService._shape_results(rows, params, RankingService.get_sketches())
+
+
+class AsyncSearchService:
+    @staticmethod
+    async def search_creators(
+        domain: Optional[str] = None,
+        region: Optional[str] = None,
+        min_engagement: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        params = SearchService._search_params(domain, region, min_engagement, limit, offset)
+        async with get_async_db_connection() as conn:
+            cursor = get_async_db_cursor(conn)
+            await cursor.execute(SEARCH_CREATORS_QUERY, params)
+            rows = await cursor.fetchall()
+        return SearchService._shape_results(rows, params, await AsyncRankingService.get_sketches())
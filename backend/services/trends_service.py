@@ -1,93 +1,270 @@
-from database import get_db_connection, get_db_cursor
+from database import get_db_connection, get_db_cursor, get_async_db_connection, get_async_db_cursor
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta, timezone
+from cache import cached
+from request_context import memoized
+from query_registry import register_query
+from columnar_engine import engine
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Trend periods: the last `window_days` UTC days up to today are period 0,
+# the window before it period 1, and so on
+DEFAULT_TREND_WINDOW_DAYS = 7
+DEFAULT_TREND_PERIODS = 2
+MAX_TREND_DAYS = 730  # window_days * periods
+
+# One row per UTC day of all periods, oldest first, with the day's totals and
+# its period's top content type (ties broken like MODE(): first in sort order).
+# `by_type` yields (day, content_type, posts, views, engagement) for the span.
+TREND_SERIES_TEMPLATE = """
+    WITH freshness AS (
+        SELECT {is_fresh} as is_fresh
+    ),
+    days AS (
+        SELECT
+            day::date as day,
+            (%(today)s::date - day::date) / %(window_days)s as period
+        FROM generate_series(%(first_day)s::date, %(today)s::date, INTERVAL '1 day') day
+    ),
+    by_type AS ({by_type}
+    ),
+    top_types AS (
+        SELECT DISTINCT ON (d.period) d.period, t.content_type
+        FROM by_type t
+        JOIN days d ON d.day = t.day
+        GROUP BY d.period, t.content_type
+        ORDER BY d.period, SUM(t.posts) DESC, t.content_type
+    )
+    SELECT
+        f.is_fresh,
+        d.day,
+        d.period,
+        COALESCE(SUM(t.views), 0) as views,
+        COALESCE(SUM(t.engagement), 0) as engagement,
+        COALESCE(SUM(t.posts), 0) as post_count,
+        tt.content_type as top_content_type
+    FROM freshness f
+    CROSS JOIN days d
+    LEFT JOIN by_type t ON t.day = d.day
+    LEFT JOIN top_types tt ON tt.period = d.period
+    GROUP BY f.is_fresh, d.day, d.period, tt.content_type
+    ORDER BY d.day
+"""
+
+# From creator_daily_summary while it is fresh for the creator; is_fresh tells
+# the caller to fall back to TREND_SERIES_QUERY otherwise
+ROLLUP_TREND_SERIES_QUERY = register_query("trends.rollup_series", TREND_SERIES_TEMPLATE.format(
+    is_fresh="rollup_is_fresh('creator_daily_summary', %(creator_id)s)",
+    by_type="""
+        SELECT
+            d.summary_date as day,
+            d.content_type,
+            SUM(d.total_posts) as posts,
+            SUM(d.total_views) as views,
+            SUM(d.total_likes + d.total_comments + d.total_shares) as engagement
+        FROM freshness f
+        JOIN creator_daily_summary d
+            ON f.is_fresh
+            AND d.creator_id = %(creator_id)s
+            AND d.summary_date BETWEEN %(first_day)s AND %(today)s
+        GROUP BY 1, 2"""
+))
+
+# From posts_master; the bounds are passed in (see _series_params) so the
+# planner prunes partitions outside the span
+TREND_SERIES_QUERY = register_query("trends.series", TREND_SERIES_TEMPLATE.format(
+    is_fresh="TRUE",
+    by_type="""
+        SELECT
+            (post_datetime AT TIME ZONE 'UTC')::date as day,
+            content_type,
+            COUNT(*) as posts,
+            SUM(views) as views,
+            SUM(likes + comments + shares) as engagement
+        FROM posts_master
+        WHERE creator_id = %(creator_id)s
+        AND post_datetime >= %(since)s
+        AND post_datetime < %(until)s
+        GROUP BY 1, 2"""
+))
+
 class TrendsService:
     @staticmethod
-    def get_trends(creator_id: str) -> Dict[str, Any]:
+    def _series_params(creator_id: str, window_days: int, periods: int) -> Dict[str, Any]:
+        """Bounds of `periods` windows of `window_days` UTC days ending today."""
+        if window_days < 1 or periods < 2:
+            raise ValueError("window_days must be at least 1 and periods at least 2")
+        if window_days * periods > MAX_TREND_DAYS:
+            raise ValueError(f"window_days * periods may cover at most {MAX_TREND_DAYS} days")
+        today = datetime.now(timezone.utc).date()
+        first_day = today - timedelta(days=window_days * periods - 1)
+        return {
+            "creator_id": creator_id,
+            "window_days": window_days,
+            "today": today,
+            "first_day": first_day,
+            "since": datetime.combine(first_day, time(0), tzinfo=timezone.utc),
+            "until": datetime.combine(today + timedelta(days=1), time(0), tzinfo=timezone.utc)
+        }
+
+    @staticmethod
+    def _compare(current_stats: Dict[str, Any], previous_stats: Dict[str, Any]) -> Dict[str, Any]:
+        def safe_float(val):
+            try:
+                return float(val) if val is not None else 0.0
+            except:
+                return 0.0
+
+        def safe_int(val):
+            try:
+                return int(val) if val is not None else 0
+            except:
+                return 0
+
+        curr_views = safe_float(current_stats.get('views'))
+        curr_eng = safe_float(current_stats.get('engagement'))
+        prev_views = safe_float(previous_stats.get('views'))
+        prev_eng = safe_float(previous_stats.get('engagement'))
+
+        curr_er = (curr_eng / curr_views) if curr_views > 0 else 0.0
+        prev_er = (prev_eng / prev_views) if prev_views > 0 else 0.0
+
+        def calc_change(curr, prev):
+            if prev == 0: return 0.0
+            return ((curr - prev) / prev) * 100
+
+        top_type_curr = str(current_stats.get('top_content_type') or "None")
+        top_type_prev = str(previous_stats.get('top_content_type') or "None")
+
+        return {
+            "facts": {
+                "engagement_change": f"{calc_change(curr_er, prev_er):+.1f}%",
+                "posting_frequency_change": f"{calc_change(safe_int(current_stats.get('post_count')), safe_int(previous_stats.get('post_count'))):+.1f}%",
+                "top_content_type": top_type_curr,
+                "previous_top_content_type": top_type_prev
+            },
+            "current": {
+                "engagement_rate": curr_er,
+                "post_count": safe_int(current_stats.get('post_count'))
+            },
+            "previous": {
+                "engagement_rate": prev_er,
+                "post_count": safe_int(previous_stats.get('post_count'))
+            }
+        }
+
+    @staticmethod
+    def _shape_trends(rows: List[Dict[str, Any]], window_days: int, periods: int) -> Dict[str, Any]:
+        """
+        Folds the per-day rows into the period totals, newest first, and the
+        daily series; facts/current/previous compare the latest two periods.
+        """
+        totals = [
+            {"views": 0, "engagement": 0, "post_count": 0, "top_content_type": None, "days": []}
+            for _ in range(periods)
+        ]
+        series = []
+        for row in rows:
+            views, engagement, post_count = int(row['views']), int(row['engagement']), int(row['post_count'])
+            period = totals[row['period']]
+            period["views"] += views
+            period["engagement"] += engagement
+            period["post_count"] += post_count
+            period["top_content_type"] = row['top_content_type']
+            period["days"].append(row['day'])
+            series.append({
+                "date": row['day'].isoformat(),
+                "views": views,
+                "engagement": engagement,
+                "post_count": post_count,
+                "engagement_rate": engagement / views if views > 0 else 0.0
+            })
+
+        trends = TrendsService._compare(totals[0], totals[1])
+        trends["window_days"] = window_days
+        trends["periods"] = [
+            {
+                "period": index,
+                "start": min(period["days"]).isoformat() if period["days"] else None,
+                "end": max(period["days"]).isoformat() if period["days"] else None,
+                "views": period["views"],
+                "engagement": period["engagement"],
+                "post_count": period["post_count"],
+                "engagement_rate": period["engagement"] / period["views"] if period["views"] > 0 else 0.0,
+                "top_content_type": period["top_content_type"]
+            }
+            for index, period in enumerate(totals)
+        ]
+        trends["series"] = series
+        return trends
+
+    @staticmethod
+    def _fallback_trends(window_days: int = DEFAULT_TREND_WINDOW_DAYS, periods: int = DEFAULT_TREND_PERIODS) -> Dict[str, Any]:
+        return {
+            "facts": {
+                "engagement_change": "0.0%",
+                "posting_frequency_change": "0.0%",
+                "top_content_type": "None",
+                "previous_top_content_type": "None"
+            },
+            "current": {"engagement_rate": 0.0, "post_count": 0},
+            "previous": {"engagement_rate": 0.0, "post_count": 0},
+            "window_days": window_days,
+            "periods": [],
+            "series": []
+        }
+
+    @staticmethod
+    def get_trends(creator_id: str, window_days: int = DEFAULT_TREND_WINDOW_DAYS,
+                   periods: int = DEFAULT_TREND_PERIODS) -> Dict[str, Any]:
         """
         Compute trends with extreme safety to prevent 500 errors.
+        Every period and the daily series come from one query, over
+        creator_daily_summary while it is fresh for the creator.
+        Raises ValueError for a window outside the allowed span.
         """
+        params = TrendsService._series_params(creator_id, window_days, periods)
         try:
             with get_db_connection() as conn:
                 cursor = get_db_cursor(conn)
-                
-                # Helper to get stats for a period
-                def get_period_stats(days_offset: int):
-                    cursor.execute("""
-                        SELECT 
-                            COALESCE(SUM(views), 0) as views,
-                            COALESCE(SUM(likes + comments + shares), 0) as engagement,
-                            COUNT(*) as post_count,
-                            MODE() WITHIN GROUP (ORDER BY content_type) as top_content_type
-                        FROM posts_master
-                        WHERE creator_id = %s
-                        AND post_datetime >= NOW() - INTERVAL '%s days'
-                        AND post_datetime < NOW() - INTERVAL '%s days'
-                    """, (creator_id, str(days_offset + 7), str(days_offset)))
-                    return cursor.fetchone()
-
-                current_stats = get_period_stats(0) or {}
-                previous_stats = get_period_stats(7) or {}
-
-                def safe_float(val):
-                    try:
-                        return float(val) if val is not None else 0.0
-                    except:
-                        return 0.0
-
-                def safe_int(val):
-                    try:
-                        return int(val) if val is not None else 0
-                    except:
-                        return 0
-
-                curr_views = safe_float(current_stats.get('views'))
-                curr_eng = safe_float(current_stats.get('engagement'))
-                prev_views = safe_float(previous_stats.get('views'))
-                prev_eng = safe_float(previous_stats.get('engagement'))
-
-                curr_er = (curr_eng / curr_views) if curr_views > 0 else 0.0
-                prev_er = (prev_eng / prev_views) if prev_views > 0 else 0.0
-
-                def calc_change(curr, prev):
-                    if prev == 0: return 0.0
-                    return ((curr - prev) / prev) * 100
-
-                top_type_curr = str(current_stats.get('top_content_type') or "None")
-                top_type_prev = str(previous_stats.get('top_content_type') or "None")
-
-                return {
-                    "facts": {
-                        "engagement_change": f"{calc_change(curr_er, prev_er):+.1f}%",
-                        "posting_frequency_change": f"{calc_change(safe_int(current_stats.get('post_count')), safe_int(previous_stats.get('post_count'))):+.1f}%",
-                        "top_content_type": top_type_curr,
-                        "previous_top_content_type": top_type_prev
-                    },
-                    "current": {
-                        "engagement_rate": curr_er,
-                        "post_count": safe_int(current_stats.get('post_count'))
-                    },
-                    "previous": {
-                        "engagement_rate": prev_er,
-                        "post_count": safe_int(previous_stats.get('post_count'))
-                    }
-                }
+
+                cursor.execute(ROLLUP_TREND_SERIES_QUERY, params)
+                rows = cursor.fetchall()
+                if not rows[0]['is_fresh']:
+                    cursor.execute(TREND_SERIES_QUERY, params)
+                    rows = cursor.fetchall()
+                return TrendsService._shape_trends(rows, window_days, periods)
         except Exception as e:
             logger.error(f"Error in get_trends: {e}")
             # Fallback return to never error out
-            return {
-                "facts": {
-                    "engagement_change": "0.0%",
-                    "posting_frequency_change": "0.0%",
-                    "top_content_type": "None",
-                    "previous_top_content_type": "None"
-                },
-                "current": {"engagement_rate": 0.0, "post_count": 0},
-                "previous": {"engagement_rate": 0.0, "post_count": 0}
-            }
+            return TrendsService._fallback_trends(window_days, periods)
+
+
+class AsyncTrendsService:
+    @staticmethod
+    @memoized("trends")
+    @cached("trends")
+    async def get_trends(creator_id: str, window_days: int = DEFAULT_TREND_WINDOW_DAYS,
+                         periods: int = DEFAULT_TREND_PERIODS) -> Dict[str, Any]:
+        params = TrendsService._series_params(creator_id, window_days, periods)
+        snapshot = engine.snapshot_for(creator_id)
+        if snapshot is not None:
+            rows = snapshot.trend_rows(creator_id, params["first_day"], params["today"], window_days)
+            return TrendsService._shape_trends(rows, window_days, periods)
+        try:
+            async with get_async_db_connection() as conn:
+                cursor = get_async_db_cursor(conn)
+
+                await cursor.execute(ROLLUP_TREND_SERIES_QUERY, params)
+                rows = await cursor.fetchall()
+                if not rows[0]['is_fresh']:
+                    await cursor.execute(TREND_SERIES_QUERY, params)
+                    rows = await cursor.fetchall()
+                return TrendsService._shape_trends(rows, window_days, periods)
+        except Exception as e:
+            logger.error(f"Error in get_trends: {e}")
+            return TrendsService._fallback_trends(window_days, periods)
@@ -0,0 +1,126 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 9: Incremental Rollups
+-- ============================================
+-- Supports the rollup engine (services/rollup_service.py)
+-- that keeps the aggregate tables from 03_aggregates.sql current
+-- ============================================
+
+-- ============================================
+-- posts_master change tracking
+-- updated_at drives the watermark; the change log remembers
+-- where updated/deleted rows used to live so their old buckets
+-- are recomputed too
+-- ============================================
+ALTER TABLE posts_master
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_posts_updated ON posts_master(updated_at);
+CREATE INDEX IF NOT EXISTS idx_posts_creator_updated ON posts_master(creator_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_posts_creator_datetime ON posts_master(creator_id, post_datetime);
+
+CREATE OR REPLACE FUNCTION fill_post_derived_fields()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.post_hour := EXTRACT(HOUR FROM NEW.post_datetime);
+    NEW.post_day := EXTRACT(DOW FROM NEW.post_datetime);
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS posts_master_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    creator_id UUID NOT NULL,
+    post_datetime TIMESTAMPTZ NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_changes_time ON posts_master_changes(changed_at);
+CREATE INDEX IF NOT EXISTS idx_posts_changes_creator ON posts_master_changes(creator_id, changed_at);
+
+CREATE OR REPLACE FUNCTION log_post_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO posts_master_changes (creator_id, post_datetime)
+    VALUES (OLD.creator_id, OLD.post_datetime);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_log_post_change ON posts_master;
+CREATE TRIGGER trg_log_post_change
+AFTER UPDATE OR DELETE ON posts_master
+FOR EACH ROW
+EXECUTE FUNCTION log_post_change();
+
+-- ============================================
+-- TABLE: rollup_watermarks
+-- One row per rollup table: everything changed at or before
+-- `watermark` is reflected in that table
+-- ============================================
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    rollup_name VARCHAR(100) PRIMARY KEY,
+    watermark TIMESTAMPTZ NOT NULL,
+    rows_affected INTEGER DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================
+-- TABLE: creator_daily_summary
+-- Daily rollup of posts_master per creator, platform and content type
+-- Feeds creator_weekly_summary, platform_comparison_aggregates and trends
+-- ============================================
+CREATE TABLE IF NOT EXISTS creator_daily_summary (
+    creator_id UUID NOT NULL REFERENCES creators(creator_id) ON DELETE CASCADE,
+    platform VARCHAR(50) NOT NULL,
+    content_type VARCHAR(50) NOT NULL,
+    summary_date DATE NOT NULL, -- UTC day of post_datetime
+    total_posts INTEGER NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_likes BIGINT NOT NULL DEFAULT 0,
+    total_comments BIGINT NOT NULL DEFAULT 0,
+    total_shares BIGINT NOT NULL DEFAULT 0,
+    engagement_rate_sum DOUBLE PRECISION NOT NULL DEFAULT 0, -- sum of per-post (likes + comments + shares) / views
+    rated_posts INTEGER NOT NULL DEFAULT 0, -- posts with views > 0
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (creator_id, summary_date, platform, content_type)
+);
+
+-- ============================================
+-- creator_weekly_summary additions
+-- Per-metric totals so dashboard overviews can be served from the rollup
+-- ============================================
+ALTER TABLE creator_weekly_summary
+ADD COLUMN IF NOT EXISTS total_likes BIGINT DEFAULT 0,
+ADD COLUMN IF NOT EXISTS total_comments BIGINT DEFAULT 0,
+ADD COLUMN IF NOT EXISTS total_shares BIGINT DEFAULT 0;
+
+-- ============================================
+-- FUNCTION: rollup_is_fresh
+-- TRUE when the rollup has been refreshed and none of the creator's
+-- posts changed after its watermark
+-- ============================================
+CREATE OR REPLACE FUNCTION rollup_is_fresh(p_rollup_name TEXT, p_creator_id UUID)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (
+        SELECT 1
+        FROM rollup_watermarks w
+        WHERE w.rollup_name = p_rollup_name
+        AND NOT EXISTS (
+            SELECT 1 FROM posts_master p
+            WHERE p.creator_id = p_creator_id AND p.updated_at > w.watermark
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM posts_master_changes c
+            WHERE c.creator_id = p_creator_id AND c.changed_at > w.watermark
+        )
+    );
+$$ LANGUAGE sql STABLE;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollup tracking created successfully!';
+    RAISE NOTICE 'Tables: rollup_watermarks, posts_master_changes, creator_daily_summary';
+END $$;
@@ -0,0 +1,53 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 10: Analytics Cache Invalidation
+-- ============================================
+-- Notifies API workers (listener.py) which creators' posts
+-- changed so their cached analytics (cache.py) are dropped.
+-- Statement-level with transition tables: a bulk write sends
+-- one notification per creator, not per row, and NOTIFY only
+-- delivers on commit.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION notify_posts_master_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('posts_master_changed', c.creator_id::text)
+        FROM (SELECT DISTINCT creator_id FROM new_rows) c;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('posts_master_changed', c.creator_id::text)
+        FROM (
+            SELECT creator_id FROM old_rows
+            UNION
+            SELECT creator_id FROM new_rows
+        ) c;
+    ELSE
+        PERFORM pg_notify('posts_master_changed', c.creator_id::text)
+        FROM (SELECT DISTINCT creator_id FROM old_rows) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_notify_posts_insert ON posts_master;
+CREATE TRIGGER trg_notify_posts_insert
+AFTER INSERT ON posts_master
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_posts_master_changed();
+
+DROP TRIGGER IF EXISTS trg_notify_posts_update ON posts_master;
+CREATE TRIGGER trg_notify_posts_update
+AFTER UPDATE ON posts_master
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_posts_master_changed();
+
+DROP TRIGGER IF EXISTS trg_notify_posts_delete ON posts_master;
+CREATE TRIGGER trg_notify_posts_delete
+AFTER DELETE ON posts_master
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_posts_master_changed();
@@ -0,0 +1,65 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 11: Bulk Ingestion
+-- ============================================
+-- Supports COPY-based ingestion of platform exports
+-- (services/ingestion_service.py): rows are merged on
+-- (platform, external_id) and derived fields are computed
+-- by the merge statement instead of per-row triggers
+-- ============================================
+
+-- The platform's own id for the post; NULL for rows created before bulk ingestion
+ALTER TABLE posts_master
+ADD COLUMN IF NOT EXISTS external_id VARCHAR(255);
+
+-- Guarded rather than IF NOT EXISTS: once posts_master is partitioned
+-- (12_partitioning.sql) this definition is no longer valid at all
+DO $$
+BEGIN
+    IF to_regclass('idx_posts_platform_external') IS NULL THEN
+        CREATE UNIQUE INDEX idx_posts_platform_external
+        ON posts_master(platform, external_id)
+        WHERE external_id IS NOT NULL;
+    END IF;
+END $$;
+
+-- ============================================
+-- Per-row triggers only where needed
+-- Bulk merges set post_hour/post_day/updated_at themselves,
+-- so the derived-field trigger only runs when a statement
+-- leaves them to it
+-- ============================================
+DROP TRIGGER IF EXISTS trg_fill_post_derived ON posts_master;
+CREATE TRIGGER trg_fill_post_derived
+BEFORE INSERT ON posts_master
+FOR EACH ROW
+WHEN (NEW.post_hour IS NULL OR NEW.post_day IS NULL)
+EXECUTE FUNCTION fill_post_derived_fields();
+
+DROP TRIGGER IF EXISTS trg_fill_post_derived_update ON posts_master;
+CREATE TRIGGER trg_fill_post_derived_update
+BEFORE UPDATE ON posts_master
+FOR EACH ROW
+WHEN (
+    NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at
+    OR NEW.post_datetime IS DISTINCT FROM OLD.post_datetime
+)
+EXECUTE FUNCTION fill_post_derived_fields();
+
+-- Rollups recompute whole (creator, day) buckets, so an update
+-- only needs logging when it moves the row to another bucket
+DROP TRIGGER IF EXISTS trg_log_post_change ON posts_master;
+CREATE TRIGGER trg_log_post_change
+AFTER UPDATE ON posts_master
+FOR EACH ROW
+WHEN (
+    OLD.creator_id IS DISTINCT FROM NEW.creator_id
+    OR OLD.post_datetime IS DISTINCT FROM NEW.post_datetime
+)
+EXECUTE FUNCTION log_post_change();
+
+DROP TRIGGER IF EXISTS trg_log_post_delete ON posts_master;
+CREATE TRIGGER trg_log_post_delete
+AFTER DELETE ON posts_master
+FOR EACH ROW
+EXECUTE FUNCTION log_post_change();
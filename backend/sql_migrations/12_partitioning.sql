@@ -0,0 +1,263 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 12: Monthly Partitioning
+-- ============================================
+-- posts_master is range-partitioned by post_datetime and
+-- content_engagement_snapshots by snapshot_at, one partition
+-- per UTC month (posts_master_p2026_01, ...) plus a default
+-- partition for rows outside the created range. Queries
+-- bounded on the partition key only touch the months in
+-- their window.
+--
+-- Existing tables are converted in place: rows are copied
+-- into a new partitioned table and indexes, foreign keys and
+-- triggers are recreated on it. Requires PostgreSQL 13+.
+--
+-- Partitions are kept ahead of time by
+-- `python jobs.py partitions` (run it daily), which also
+-- moves rows that landed in a default partition into their
+-- own month.
+-- ============================================
+
+-- ============================================
+-- FUNCTION: create_monthly_partitions
+-- Creates the missing monthly partitions covering
+-- [p_from, p_to]. Rows for a new month already sitting in the
+-- default partition are moved into it. Returns the number of
+-- partitions created. Refuses spans over 10 years: each month
+-- is a CREATE TABLE under a lock on the parent, so callers with
+-- scattered dates create the months they need one at a time.
+-- ============================================
+CREATE OR REPLACE FUNCTION create_monthly_partitions(p_parent REGCLASS, p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS INTEGER AS $$
+DECLARE
+    v_schema TEXT;
+    v_table TEXT;
+    v_key TEXT;
+    v_default REGCLASS;
+    v_month TIMESTAMP;
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_partition TEXT;
+    v_has_rows BOOLEAN;
+    v_created INTEGER := 0;
+BEGIN
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN 0;
+    END IF;
+    IF p_to > p_from + INTERVAL '10 years' THEN
+        RAISE EXCEPTION 'Refusing to create monthly partitions of % from % to % (over 10 years)', p_parent, p_from, p_to;
+    END IF;
+
+    SELECT n.nspname, c.relname, a.attname
+    INTO v_schema, v_table, v_key
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = p_parent;
+
+    IF v_key IS NULL THEN
+        RAISE EXCEPTION '% is not a partitioned table', p_parent;
+    END IF;
+
+    v_default := to_regclass(format('%I.%I', v_schema, v_table || '_default'));
+    v_month := date_trunc('month', p_from AT TIME ZONE 'UTC');
+
+    WHILE v_month <= p_to AT TIME ZONE 'UTC' LOOP
+        v_partition := format('%s_p%s', v_table, to_char(v_month, 'YYYY_MM'));
+
+        IF to_regclass(format('%I.%I', v_schema, v_partition)) IS NULL THEN
+            v_start := v_month AT TIME ZONE 'UTC';
+            v_end := (v_month + INTERVAL '1 month') AT TIME ZONE 'UTC';
+
+            -- A partition can't be created while the default partition
+            -- holds rows in its range, so those are set aside first
+            v_has_rows := FALSE;
+            IF v_default IS NOT NULL THEN
+                EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s WHERE %I >= $1 AND %I < $2)', v_default, v_key, v_key)
+                INTO v_has_rows USING v_start, v_end;
+            END IF;
+            IF v_has_rows THEN
+                EXECUTE format('CREATE TEMP TABLE partition_rows_in_transit (LIKE %s)', p_parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %s WHERE %I >= $1 AND %I < $2 RETURNING *) '
+                    'INSERT INTO partition_rows_in_transit SELECT * FROM moved',
+                    v_default, v_key, v_key
+                ) USING v_start, v_end;
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                v_schema, v_partition, p_parent, v_start, v_end
+            );
+            v_created := v_created + 1;
+
+            IF v_has_rows THEN
+                EXECUTE format('INSERT INTO %s SELECT * FROM partition_rows_in_transit', p_parent);
+                DROP TABLE partition_rows_in_transit;
+            END IF;
+        END IF;
+
+        v_month := v_month + INTERVAL '1 month';
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: ensure_monthly_partitions
+-- Partitions from p_months_back months ago to p_months_ahead
+-- months from now, plus one for every month found in the
+-- default partition
+-- ============================================
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    p_parent REGCLASS,
+    p_months_back INTEGER DEFAULT 0,
+    p_months_ahead INTEGER DEFAULT 3
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_default REGCLASS := to_regclass(p_parent::text || '_default');
+    v_key TEXT;
+    v_month TIMESTAMPTZ;
+    v_created INTEGER;
+BEGIN
+    v_created := create_monthly_partitions(
+        p_parent,
+        NOW() - make_interval(months => p_months_back),
+        NOW() + make_interval(months => p_months_ahead)
+    );
+
+    IF v_default IS NOT NULL THEN
+        SELECT a.attname INTO v_key
+        FROM pg_partitioned_table pt
+        JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+        WHERE pt.partrelid = p_parent;
+
+        FOR v_month IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', %I AT TIME ZONE ''UTC'') AT TIME ZONE ''UTC'' FROM %s',
+            v_key, v_default
+        ) LOOP
+            v_created := v_created + create_monthly_partitions(p_parent, v_month, v_month);
+        END LOOP;
+    END IF;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: partition_table_by_month
+-- Converts a plain table into one range-partitioned by month
+-- on p_key. The primary key gains the partition key; unique
+-- indexes are not carried over (they must include the
+-- partition key) and have to be recreated by the caller.
+-- No-op for a table that is already partitioned.
+-- ============================================
+CREATE OR REPLACE FUNCTION partition_table_by_month(p_table REGCLASS, p_key TEXT)
+RETURNS VOID AS $$
+DECLARE
+    v_table TEXT;
+    v_schema TEXT;
+    v_primary_key TEXT;
+    v_definitions TEXT[];
+    v_definition TEXT;
+    v_month TIMESTAMPTZ;
+BEGIN
+    SELECT c.relname, n.nspname INTO v_table, v_schema
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = p_table AND c.relkind = 'r';
+
+    IF v_table IS NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY k.ord)
+    INTO v_primary_key
+    FROM pg_index i
+    CROSS JOIN unnest(i.indkey::int2[]) WITH ORDINALITY k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE i.indrelid = p_table AND i.indisprimary;
+
+    -- Secondary indexes, foreign keys and user triggers, recreated once the
+    -- partitioned table has taken over the name
+    SELECT array_agg(definition ORDER BY step)
+    INTO v_definitions
+    FROM (
+        SELECT 1 as step, pg_get_indexdef(i.indexrelid) as definition
+        FROM pg_index i
+        WHERE i.indrelid = p_table AND NOT i.indisunique
+        UNION ALL
+        SELECT 2, format('ALTER TABLE %I.%I ADD CONSTRAINT %I %s', v_schema, v_table, conname, pg_get_constraintdef(oid))
+        FROM pg_constraint
+        WHERE conrelid = p_table AND contype = 'f'
+        UNION ALL
+        SELECT 3, pg_get_triggerdef(oid)
+        FROM pg_trigger
+        WHERE tgrelid = p_table AND NOT tgisinternal
+    ) d;
+
+    EXECUTE format(
+        'CREATE TABLE %I.%I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) '
+        'PARTITION BY RANGE (%I)',
+        v_schema, v_table || '_partitioned', p_table, p_key
+    );
+    EXECUTE format('ALTER TABLE %s RENAME TO %I', p_table, v_table || '_unpartitioned');
+    EXECUTE format('ALTER TABLE %I.%I RENAME TO %I', v_schema, v_table || '_partitioned', v_table);
+    EXECUTE format('CREATE TABLE %I.%I PARTITION OF %I.%I DEFAULT', v_schema, v_table || '_default', v_schema, v_table);
+
+    -- Partitions for the months the existing data covers, then the rows
+    -- themselves; indexes are built afterwards in one pass
+    FOR v_month IN EXECUTE format(
+        'SELECT DISTINCT date_trunc(''month'', %I AT TIME ZONE ''UTC'') AT TIME ZONE ''UTC'' FROM %s',
+        p_key, p_table
+    ) LOOP
+        PERFORM create_monthly_partitions(format('%I.%I', v_schema, v_table)::regclass, v_month, v_month);
+    END LOOP;
+    EXECUTE format('INSERT INTO %I.%I SELECT * FROM %s', v_schema, v_table, p_table);
+    EXECUTE format('DROP TABLE %s', p_table);
+
+    IF v_primary_key IS NOT NULL THEN
+        EXECUTE format(
+            'ALTER TABLE %I.%I ADD CONSTRAINT %I PRIMARY KEY (%s, %I)',
+            v_schema, v_table, v_table || '_pkey', v_primary_key, p_key
+        );
+    END IF;
+    FOREACH v_definition IN ARRAY COALESCE(v_definitions, '{}') LOOP
+        EXECUTE v_definition;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Convert posts_master and content_engagement_snapshots
+-- ============================================
+SELECT partition_table_by_month('posts_master', 'post_datetime');
+SELECT partition_table_by_month('content_engagement_snapshots', 'snapshot_at');
+
+-- Unique indexes on a partitioned table must include the partition key;
+-- ingestion relocates a post whose post_datetime changed before merging
+-- (services/ingestion_service.py), so (platform, external_id) stays unique
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_platform_external
+ON posts_master(platform, external_id, post_datetime)
+WHERE external_id IS NOT NULL;
+
+-- Superseded by idx_posts_creator_datetime, which also serves
+-- date-bounded lookups within each partition
+DROP INDEX IF EXISTS idx_posts_creator;
+
+-- A year of history and three months ahead
+SELECT ensure_monthly_partitions('posts_master', 12, 3);
+SELECT ensure_monthly_partitions('content_engagement_snapshots', 12, 3);
+
+ANALYZE posts_master;
+ANALYZE content_engagement_snapshots;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Monthly partitioning enabled!';
+    RAISE NOTICE 'Partitioned: posts_master (post_datetime), content_engagement_snapshots (snapshot_at)';
+END $$;
@@ -0,0 +1,69 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 13: Percentile Sketches
+-- ============================================
+-- Cross-creator percentile ranks (services/ranking_service.py):
+-- where a creator's engagement rate, views and posting
+-- frequency sit among all creators, or among creators in the
+-- same category, platform or content type.
+--
+-- Each distribution is a sketch of log-spaced buckets with 1%
+-- relative accuracy, holding the number of creators whose
+-- value falls in each bucket. The rollup job
+-- (`python jobs.py rollups`) moves a creator between buckets
+-- when their posts change, so a sketch never needs a full
+-- scan; the API loads the sketches and answers a percentile
+-- lookup with one array access.
+-- ============================================
+
+-- ============================================
+-- FUNCTION: sketch_bucket
+-- Bucket index of a value: ceil(log_gamma(value)) with
+-- gamma = (1 + 0.01) / (1 - 0.01); zero and negative values
+-- share bucket -32768. Must match sketch_bucket() in
+-- services/ranking_service.py.
+-- ============================================
+CREATE OR REPLACE FUNCTION sketch_bucket(p_value DOUBLE PRECISION)
+RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN p_value IS NULL OR p_value <= 0 THEN -32768
+        ELSE CEIL(LN(p_value) / LN(1.01 / 0.99))::INTEGER
+    END
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- ============================================
+-- TABLE: creator_rank_stats
+-- Each creator's current value per metric and dimension, and
+-- the bucket it is counted in. dimension is 'global' (with an
+-- empty dimension_value), 'category', 'platform' or
+-- 'content_type'.
+-- ============================================
+CREATE TABLE IF NOT EXISTS creator_rank_stats (
+    creator_id UUID NOT NULL REFERENCES creators(creator_id) ON DELETE CASCADE,
+    metric VARCHAR(50) NOT NULL, -- engagement_rate, views, posting_frequency
+    dimension VARCHAR(20) NOT NULL,
+    dimension_value VARCHAR(100) NOT NULL DEFAULT '',
+    value DOUBLE PRECISION NOT NULL,
+    bucket INTEGER NOT NULL,
+    PRIMARY KEY (creator_id, metric, dimension, dimension_value)
+);
+
+-- ============================================
+-- TABLE: percentile_sketch_buckets
+-- Creators per bucket of each distribution; empty buckets
+-- are deleted
+-- ============================================
+CREATE TABLE IF NOT EXISTS percentile_sketch_buckets (
+    metric VARCHAR(50) NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    dimension_value VARCHAR(100) NOT NULL DEFAULT '',
+    bucket INTEGER NOT NULL,
+    creator_count INTEGER NOT NULL,
+    PRIMARY KEY (metric, dimension, dimension_value, bucket)
+);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Percentile sketches created!';
+    RAISE NOTICE 'Built by the next `python jobs.py rollups` run';
+END $$;
@@ -0,0 +1,218 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 14: Posting-Time Heatmap
+-- ============================================
+-- Day-of-week x hour engagement per creator, in the creator's
+-- own time zone, for the posting-time analysis endpoint and
+-- the best-posting-time recommendation
+-- (services/analytics_service.py).
+--
+-- Kept current by statement-level triggers on posts_master:
+-- each write adds (or subtracts) the aggregated cells of the
+-- rows it changed, so a bulk ingest updates the heatmap in one
+-- statement, and reading a creator's heatmap is one index range
+-- scan of at most 168 rows.
+-- ============================================
+
+-- IANA name, e.g. 'Europe/Berlin'; validated by trg_validate_creator_timezone
+ALTER TABLE creators
+ADD COLUMN IF NOT EXISTS timezone VARCHAR(64) NOT NULL DEFAULT 'UTC';
+
+-- ============================================
+-- TABLE: creator_posting_heatmap
+-- post_day is the local day of week (0 = Sunday, as EXTRACT(DOW)),
+-- post_hour the local hour. Cells whose posts were all deleted or
+-- moved stay with post_count = 0.
+-- ============================================
+CREATE TABLE IF NOT EXISTS creator_posting_heatmap (
+    creator_id UUID NOT NULL REFERENCES creators(creator_id) ON DELETE CASCADE,
+    post_day SMALLINT NOT NULL CHECK (post_day BETWEEN 0 AND 6),
+    post_hour SMALLINT NOT NULL CHECK (post_hour BETWEEN 0 AND 23),
+    post_count INTEGER NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_engagement BIGINT NOT NULL DEFAULT 0, -- likes + comments + shares
+    engagement_rate_sum DOUBLE PRECISION NOT NULL DEFAULT 0, -- sum of per-post (likes + comments + shares) / views
+    rated_posts INTEGER NOT NULL DEFAULT 0, -- posts with views > 0
+
+    PRIMARY KEY (creator_id, post_day, post_hour)
+);
+
+-- ============================================
+-- FUNCTION: rebuild_posting_heatmap
+-- Recomputes the heatmap of one creator, or of every creator when
+-- called without one, in a single pass over posts_master. Used for
+-- the initial build, after a time zone change, and after bulk loads
+-- that run with triggers disabled (seed_generator.py).
+-- ============================================
+CREATE OR REPLACE FUNCTION rebuild_posting_heatmap(p_creator_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    cells INTEGER;
+BEGIN
+    DELETE FROM creator_posting_heatmap
+    WHERE p_creator_id IS NULL OR creator_id = p_creator_id;
+
+    -- Cell expressions must match maintain_posting_heatmap()
+    INSERT INTO creator_posting_heatmap (
+        creator_id, post_day, post_hour,
+        post_count, total_views, total_engagement, engagement_rate_sum, rated_posts
+    )
+    SELECT
+        p.creator_id,
+        EXTRACT(DOW FROM p.post_datetime AT TIME ZONE c.timezone),
+        EXTRACT(HOUR FROM p.post_datetime AT TIME ZONE c.timezone),
+        COUNT(*),
+        SUM(p.views),
+        SUM(p.likes + p.comments + p.shares),
+        COALESCE(SUM((p.likes + p.comments + p.shares)::float / NULLIF(p.views, 0)), 0),
+        COUNT(*) FILTER (WHERE p.views > 0)
+    FROM posts_master p
+    JOIN creators c ON c.creator_id = p.creator_id
+    WHERE p_creator_id IS NULL OR p.creator_id = p_creator_id
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS cells = ROW_COUNT;
+    RETURN cells;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: maintain_posting_heatmap
+-- Applies the rows a statement inserted (+1), deleted (-1) or
+-- updated (old -1, new +1) to their cells. Updates that leave the
+-- creator, post time and counters alone are skipped. The creators
+-- are locked FOR SHARE so a concurrent time zone change waits for
+-- this transaction and then rebuilds from what it wrote.
+-- ============================================
+CREATE OR REPLACE FUNCTION maintain_posting_heatmap()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_rows TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed_rows := 'SELECT creator_id, post_datetime, views, likes, comments, shares, 1 as sign FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changed_rows := 'SELECT creator_id, post_datetime, views, likes, comments, shares, -1 as sign FROM old_rows';
+    ELSE
+        changed_rows := $q$
+            SELECT r.*
+            FROM old_rows o
+            JOIN new_rows n ON n.post_id = o.post_id
+            CROSS JOIN LATERAL (VALUES
+                (o.creator_id, o.post_datetime, o.views, o.likes, o.comments, o.shares, -1),
+                (n.creator_id, n.post_datetime, n.views, n.likes, n.comments, n.shares, 1)
+            ) r (creator_id, post_datetime, views, likes, comments, shares, sign)
+            WHERE (o.creator_id, o.post_datetime, o.views, o.likes, o.comments, o.shares)
+                IS DISTINCT FROM (n.creator_id, n.post_datetime, n.views, n.likes, n.comments, n.shares)
+        $q$;
+    END IF;
+
+    -- Transition tables are visible to EXECUTE within the trigger function
+    EXECUTE format($q$
+        WITH changed AS (%s),
+        zones AS (
+            SELECT c.creator_id, c.timezone
+            FROM creators c
+            WHERE c.creator_id IN (SELECT creator_id FROM changed)
+            ORDER BY c.creator_id
+            FOR SHARE
+        )
+        INSERT INTO creator_posting_heatmap AS h (
+            creator_id, post_day, post_hour,
+            post_count, total_views, total_engagement, engagement_rate_sum, rated_posts
+        )
+        SELECT
+            r.creator_id,
+            EXTRACT(DOW FROM r.post_datetime AT TIME ZONE z.timezone) as post_day,
+            EXTRACT(HOUR FROM r.post_datetime AT TIME ZONE z.timezone) as post_hour,
+            SUM(r.sign),
+            SUM(r.sign * r.views),
+            SUM(r.sign * (r.likes + r.comments + r.shares)),
+            COALESCE(SUM(r.sign * (r.likes + r.comments + r.shares)::float / NULLIF(r.views, 0)), 0),
+            COUNT(*) FILTER (WHERE r.views > 0 AND r.sign > 0) - COUNT(*) FILTER (WHERE r.views > 0 AND r.sign < 0)
+        FROM changed r
+        JOIN zones z ON z.creator_id = r.creator_id
+        GROUP BY 1, 2, 3
+        -- One lock order for every writer, so concurrent ingests can't deadlock
+        ORDER BY 1, 2, 3
+        ON CONFLICT (creator_id, post_day, post_hour) DO UPDATE SET
+            post_count = h.post_count + EXCLUDED.post_count,
+            total_views = h.total_views + EXCLUDED.total_views,
+            total_engagement = h.total_engagement + EXCLUDED.total_engagement,
+            -- Reset an emptied cell exactly instead of keeping float residue
+            engagement_rate_sum = CASE
+                WHEN h.post_count + EXCLUDED.post_count = 0 THEN 0
+                ELSE h.engagement_rate_sum + EXCLUDED.engagement_rate_sum
+            END,
+            rated_posts = h.rated_posts + EXCLUDED.rated_posts
+    $q$, changed_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_posting_heatmap_insert ON posts_master;
+CREATE TRIGGER trg_posting_heatmap_insert
+AFTER INSERT ON posts_master
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posting_heatmap();
+
+DROP TRIGGER IF EXISTS trg_posting_heatmap_update ON posts_master;
+CREATE TRIGGER trg_posting_heatmap_update
+AFTER UPDATE ON posts_master
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posting_heatmap();
+
+DROP TRIGGER IF EXISTS trg_posting_heatmap_delete ON posts_master;
+CREATE TRIGGER trg_posting_heatmap_delete
+AFTER DELETE ON posts_master
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posting_heatmap();
+
+-- ============================================
+-- creators.timezone validation and changes
+-- An unknown zone would fail every later ingest for the creator,
+-- so it is rejected up front. A change rebuilds the creator's
+-- heatmap and drops their cached analytics (10_cache_invalidation.sql).
+-- ============================================
+CREATE OR REPLACE FUNCTION validate_creator_timezone()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM NOW() AT TIME ZONE NEW.timezone;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_validate_creator_timezone ON creators;
+CREATE TRIGGER trg_validate_creator_timezone
+BEFORE INSERT OR UPDATE OF timezone ON creators
+FOR EACH ROW
+EXECUTE FUNCTION validate_creator_timezone();
+
+CREATE OR REPLACE FUNCTION rebuild_creator_posting_heatmap()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_posting_heatmap(NEW.creator_id);
+    PERFORM pg_notify('posts_master_changed', NEW.creator_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_creator_timezone_changed ON creators;
+CREATE TRIGGER trg_creator_timezone_changed
+AFTER UPDATE OF timezone ON creators
+FOR EACH ROW
+WHEN (OLD.timezone IS DISTINCT FROM NEW.timezone)
+EXECUTE FUNCTION rebuild_creator_posting_heatmap();
+
+-- Initial build from the posts already loaded
+SELECT rebuild_posting_heatmap();
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Posting-time heatmap created!';
+    RAISE NOTICE 'Table: creator_posting_heatmap (maintained on every posts_master write)';
+END $$;
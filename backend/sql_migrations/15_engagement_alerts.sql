@@ -0,0 +1,37 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 15: Engagement-Drop Alerts
+-- ============================================
+-- Supports the engagement-drop detector
+-- (services/alert_service.py, `python jobs.py alerts`), which
+-- compares each creator's recent engagement rate with their
+-- baseline from creator_daily_summary and writes
+-- 'engagement_drop' notifications.
+-- ============================================
+
+-- ============================================
+-- TABLE: creator_engagement_alerts
+-- The detector's last verdict per creator. A notification is
+-- only sent when a creator enters a drop (is_dropped goes from
+-- FALSE to TRUE) and none was sent within the cooldown, so a
+-- drop that lasts several runs is reported once.
+-- ============================================
+CREATE TABLE IF NOT EXISTS creator_engagement_alerts (
+    creator_id UUID PRIMARY KEY REFERENCES creators(creator_id) ON DELETE CASCADE,
+    is_dropped BOOLEAN NOT NULL DEFAULT FALSE,
+    current_rate DOUBLE PRECISION, -- engagement / views over the current window
+    baseline_rate DOUBLE PRECISION, -- engagement / views over the baseline window before it
+    evaluated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    alerted_at TIMESTAMPTZ -- last engagement_drop notification
+);
+
+-- The detector only evaluates creators whose daily rollup rows were
+-- recomputed since its last run (watermark 'engagement_drop_alerts'
+-- in rollup_watermarks)
+CREATE INDEX IF NOT EXISTS idx_daily_summary_computed ON creator_daily_summary(computed_at);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Engagement-drop alerts created!';
+    RAISE NOTICE 'Table: creator_engagement_alerts (run `python jobs.py alerts` after rollups)';
+END $$;
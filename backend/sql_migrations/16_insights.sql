@@ -0,0 +1,30 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 16: Insight Generation
+-- ============================================
+-- Supports the insight generator (services/insights_service.py,
+-- `python jobs.py insights`), which rewrites the insights and
+-- insight_sources of creators with new rollups, follower
+-- snapshots or campaigns since its last run, or whose insights
+-- have expired.
+-- ============================================
+
+-- New follower snapshots and campaigns since the last run
+-- (watermark 'insights' in rollup_watermarks)
+CREATE INDEX IF NOT EXISTS idx_follower_created ON follower_growth_snapshots(created_at);
+CREATE INDEX IF NOT EXISTS idx_campaign_creators_created ON campaign_creators(created_at);
+
+-- 04_intelligence.sql declares each foreign key twice (inline REFERENCES
+-- and a named constraint), so every row the generator writes or deletes is
+-- checked twice; keep the named ones
+ALTER TABLE insights DROP CONSTRAINT IF EXISTS insights_user_id_fkey;
+ALTER TABLE insight_sources DROP CONSTRAINT IF EXISTS insight_sources_insight_id_fkey;
+
+-- Expired insights of the generator's model
+CREATE INDEX IF NOT EXISTS idx_insights_model_expiry ON insights(source_model, expires_at);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Insight generation indexes created!';
+    RAISE NOTICE 'Run `python jobs.py insights` after rollups';
+END $$;
@@ -0,0 +1,119 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 17: Inbox Pagination & Unread Counters
+-- ============================================
+-- Supports the keyset-paginated creator inbox
+-- (services/collaboration_service.py): pages are read newest
+-- first from an index in inbox order, and each user's total and
+-- unread email counts are kept up to date by triggers so the
+-- unread badge is one primary-key lookup.
+-- ============================================
+
+-- Unread means is_read = FALSE; no third state to count
+UPDATE emails SET is_read = FALSE WHERE is_read IS NULL;
+ALTER TABLE emails ALTER COLUMN is_read SET NOT NULL;
+
+-- Inbox order, with email_id breaking ties between emails sent in
+-- the same transaction. Replaces idx_emails_receiver (its prefix).
+CREATE INDEX IF NOT EXISTS idx_emails_receiver_created
+    ON emails(receiver_user_id, created_at DESC, email_id DESC);
+DROP INDEX IF EXISTS idx_emails_receiver;
+
+-- ============================================
+-- TABLE: inbox_counters
+-- Emails received and still unread per user
+-- ============================================
+CREATE TABLE IF NOT EXISTS inbox_counters (
+    user_id UUID PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_count BIGINT NOT NULL DEFAULT 0,
+    unread_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Statement-level with transition tables, like 10_cache_invalidation.sql:
+-- a bulk write updates each receiver's counters once, in user_id order so
+-- concurrent writers lock them in the same order.
+CREATE OR REPLACE FUNCTION maintain_inbox_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO inbox_counters (user_id, total_count, unread_count)
+        SELECT receiver_user_id, COUNT(*), COUNT(*) FILTER (WHERE NOT is_read)
+        FROM new_rows
+        GROUP BY receiver_user_id
+        ORDER BY receiver_user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_count = inbox_counters.total_count + EXCLUDED.total_count,
+            unread_count = inbox_counters.unread_count + EXCLUDED.unread_count,
+            updated_at = NOW();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO inbox_counters (user_id, total_count, unread_count)
+        SELECT receiver_user_id, SUM(total_delta), SUM(unread_delta)
+        FROM (
+            SELECT receiver_user_id, 1 as total_delta, (NOT is_read)::int as unread_delta FROM new_rows
+            UNION ALL
+            SELECT receiver_user_id, -1, -(NOT is_read)::int FROM old_rows
+        ) d
+        GROUP BY receiver_user_id
+        HAVING SUM(total_delta) <> 0 OR SUM(unread_delta) <> 0
+        ORDER BY receiver_user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_count = inbox_counters.total_count + EXCLUDED.total_count,
+            unread_count = inbox_counters.unread_count + EXCLUDED.unread_count,
+            updated_at = NOW();
+    ELSE
+        -- No upsert: a receiver deleted in this statement (ON DELETE CASCADE)
+        -- has lost its counters row already
+        UPDATE inbox_counters c SET
+            total_count = c.total_count - d.total_count,
+            unread_count = c.unread_count - d.unread_count,
+            updated_at = NOW()
+        FROM (
+            SELECT receiver_user_id, COUNT(*) as total_count, COUNT(*) FILTER (WHERE NOT is_read) as unread_count
+            FROM old_rows
+            GROUP BY receiver_user_id
+            ORDER BY receiver_user_id
+        ) d
+        WHERE c.user_id = d.receiver_user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_inbox_counters_insert ON emails;
+CREATE TRIGGER trg_inbox_counters_insert
+AFTER INSERT ON emails
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_inbox_counters();
+
+DROP TRIGGER IF EXISTS trg_inbox_counters_update ON emails;
+CREATE TRIGGER trg_inbox_counters_update
+AFTER UPDATE ON emails
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_inbox_counters();
+
+DROP TRIGGER IF EXISTS trg_inbox_counters_delete ON emails;
+CREATE TRIGGER trg_inbox_counters_delete
+AFTER DELETE ON emails
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_inbox_counters();
+
+-- Backfill from the emails already received
+INSERT INTO inbox_counters (user_id, total_count, unread_count)
+SELECT receiver_user_id, COUNT(*), COUNT(*) FILTER (WHERE NOT is_read)
+FROM emails
+GROUP BY receiver_user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_count = EXCLUDED.total_count,
+    unread_count = EXCLUDED.unread_count,
+    updated_at = NOW();
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Inbox pagination index and counters created!';
+    RAISE NOTICE 'Table: inbox_counters (maintained by triggers on emails)';
+END $$;
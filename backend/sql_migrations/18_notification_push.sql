@@ -0,0 +1,91 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 18: Notification Push
+-- ============================================
+-- Supports the notification stream (notification_stream.py,
+-- GET /api/notifications/stream). Every notification gets a
+-- per-user sequence number the stream resumes from, and every
+-- insert notifies the API workers (listener.py) whose users
+-- have new notifications, whichever code path wrote them.
+-- ============================================
+
+-- ============================================
+-- TABLE: notification_sequences
+-- Last sequence number handed out per user. Taking the next one
+-- locks the user's row until commit, so one user's notifications
+-- commit in sequence order and a stream that has delivered N
+-- never sees N - 1 appear later.
+-- ============================================
+CREATE TABLE IF NOT EXISTS notification_sequences (
+    user_id UUID PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    last_seq BIGINT NOT NULL DEFAULT 0
+);
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS seq BIGINT;
+
+-- Number existing notifications in creation order
+UPDATE notifications n
+SET seq = numbered.seq
+FROM (
+    SELECT notification_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at, notification_id) as seq
+    FROM notifications
+) numbered
+WHERE numbered.notification_id = n.notification_id
+AND n.seq IS NULL;
+
+INSERT INTO notification_sequences (user_id, last_seq)
+SELECT user_id, MAX(seq)
+FROM notifications
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    last_seq = GREATEST(notification_sequences.last_seq, EXCLUDED.last_seq);
+
+ALTER TABLE notifications ALTER COLUMN seq SET NOT NULL;
+
+-- Catch-up reads (seq > last delivered) and the latest-first list.
+-- Replaces idx_notifications_user (its prefix).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_user_seq ON notifications(user_id, seq);
+DROP INDEX IF EXISTS idx_notifications_user;
+
+CREATE OR REPLACE FUNCTION assign_notification_seq()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO notification_sequences (user_id, last_seq)
+    VALUES (NEW.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET
+        last_seq = notification_sequences.last_seq + 1
+    RETURNING last_seq INTO NEW.seq;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_assign_notification_seq ON notifications;
+CREATE TRIGGER trg_assign_notification_seq
+BEFORE INSERT ON notifications
+FOR EACH ROW
+EXECUTE FUNCTION assign_notification_seq();
+
+-- One notification per user per statement, like 10_cache_invalidation.sql.
+-- The payload is only the user id: streams read the rows themselves, so
+-- a bulk insert can't overflow the 8000-byte payload limit.
+CREATE OR REPLACE FUNCTION notify_notifications_created()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('notifications_created', u.user_id::text)
+    FROM (SELECT DISTINCT user_id FROM new_rows) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_notifications_created ON notifications;
+CREATE TRIGGER trg_notify_notifications_created
+AFTER INSERT ON notifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_notifications_created();
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Notification push created!';
+    RAISE NOTICE 'Table: notification_sequences; channel: notifications_created';
+END $$;
@@ -0,0 +1,119 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 19: Post External ID Uniqueness
+-- ============================================
+-- Unique keys of the partitioned posts_master must include the
+-- partition key, so idx_posts_platform_external only makes
+-- (platform, external_id, post_datetime) unique. This table is
+-- not partitioned and keeps one row per (platform, external_id),
+-- maintained by triggers on posts_master: any writer that stores
+-- a post twice under different post_datetimes fails with a
+-- unique violation, not only bulk ingestion.
+-- ============================================
+
+-- ============================================
+-- TABLE: posts_external_ids
+-- The post_datetime each external post is stored under
+-- ============================================
+CREATE TABLE IF NOT EXISTS posts_external_ids (
+    platform VARCHAR(50) NOT NULL,
+    external_id VARCHAR(255) NOT NULL,
+    post_datetime TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (platform, external_id)
+);
+
+-- Statement-level with transition tables, like 10_cache_invalidation.sql.
+-- Updates only touch the rows whose key or post_datetime changed, matched
+-- on post_id; the old key is removed before the new one is added so a
+-- post moved to another post_datetime keeps its key.
+CREATE OR REPLACE FUNCTION maintain_posts_external_ids()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO posts_external_ids (platform, external_id, post_datetime)
+        SELECT platform, external_id, post_datetime
+        FROM new_rows
+        WHERE external_id IS NOT NULL;
+    ELSIF TG_OP = 'UPDATE' THEN
+        DELETE FROM posts_external_ids e
+        USING old_rows o
+        JOIN new_rows n ON n.post_id = o.post_id
+        WHERE (o.platform, o.external_id, o.post_datetime) IS DISTINCT FROM (n.platform, n.external_id, n.post_datetime)
+        AND e.platform = o.platform
+        AND e.external_id = o.external_id;
+
+        INSERT INTO posts_external_ids (platform, external_id, post_datetime)
+        SELECT n.platform, n.external_id, n.post_datetime
+        FROM old_rows o
+        JOIN new_rows n ON n.post_id = o.post_id
+        WHERE (o.platform, o.external_id, o.post_datetime) IS DISTINCT FROM (n.platform, n.external_id, n.post_datetime)
+        AND n.external_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM posts_external_ids e
+        USING old_rows o
+        WHERE e.platform = o.platform
+        AND e.external_id = o.external_id
+        AND e.post_datetime = o.post_datetime;
+    ELSE
+        TRUNCATE posts_external_ids;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_posts_external_ids_insert ON posts_master;
+CREATE TRIGGER trg_posts_external_ids_insert
+AFTER INSERT ON posts_master
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posts_external_ids();
+
+DROP TRIGGER IF EXISTS trg_posts_external_ids_update ON posts_master;
+CREATE TRIGGER trg_posts_external_ids_update
+AFTER UPDATE ON posts_master
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posts_external_ids();
+
+DROP TRIGGER IF EXISTS trg_posts_external_ids_delete ON posts_master;
+CREATE TRIGGER trg_posts_external_ids_delete
+AFTER DELETE ON posts_master
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posts_external_ids();
+
+DROP TRIGGER IF EXISTS trg_posts_external_ids_truncate ON posts_master;
+CREATE TRIGGER trg_posts_external_ids_truncate
+AFTER TRUNCATE ON posts_master
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_posts_external_ids();
+
+-- ============================================
+-- FUNCTION: rebuild_posts_external_ids
+-- Refills the table from posts_master, for bulk loads that ran
+-- with user triggers disabled (seed_generator.py). Fails if
+-- posts_master already holds a duplicate.
+-- ============================================
+CREATE OR REPLACE FUNCTION rebuild_posts_external_ids()
+RETURNS BIGINT AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    TRUNCATE posts_external_ids;
+    INSERT INTO posts_external_ids (platform, external_id, post_datetime)
+    SELECT platform, external_id, post_datetime
+    FROM posts_master
+    WHERE external_id IS NOT NULL;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_posts_external_ids();
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Post external ID uniqueness enforced!';
+    RAISE NOTICE 'Table: posts_external_ids (maintained by triggers on posts_master)';
+END $$;
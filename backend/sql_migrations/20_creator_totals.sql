@@ -0,0 +1,50 @@
+-- ============================================
+-- SOCIAL MEDIA ANALYTICS DATABASE SCHEMA
+-- File 20: Creator Totals
+-- ============================================
+-- All-time totals per creator for /api/creators/search, kept by
+-- the posts rollups (services/rollup_service.py) for the
+-- creators each run touches, so a search no longer aggregates
+-- posts_master.
+-- ============================================
+
+-- ============================================
+-- TABLE: creator_totals
+-- Sum of each creator's creator_daily_summary rows; creators
+-- without posts have no row
+-- ============================================
+CREATE TABLE IF NOT EXISTS creator_totals (
+    creator_id UUID PRIMARY KEY REFERENCES creators(creator_id) ON DELETE CASCADE,
+    total_posts BIGINT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_likes BIGINT NOT NULL DEFAULT 0,
+    total_comments BIGINT NOT NULL DEFAULT 0,
+    total_shares BIGINT NOT NULL DEFAULT 0,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Backfill from the daily rollup, which is complete up to its watermark;
+-- later runs only recompute the creators they touch
+INSERT INTO creator_totals (creator_id, total_posts, total_views, total_likes, total_comments, total_shares)
+SELECT creator_id, SUM(total_posts), SUM(total_views), SUM(total_likes), SUM(total_comments), SUM(total_shares)
+FROM creator_daily_summary
+GROUP BY creator_id
+ON CONFLICT (creator_id) DO UPDATE SET
+    total_posts = EXCLUDED.total_posts,
+    total_views = EXCLUDED.total_views,
+    total_likes = EXCLUDED.total_likes,
+    total_comments = EXCLUDED.total_comments,
+    total_shares = EXCLUDED.total_shares,
+    computed_at = NOW();
+
+INSERT INTO rollup_watermarks (rollup_name, watermark, rows_affected, refreshed_at)
+SELECT 'creator_totals', watermark, 0, NOW()
+FROM rollup_watermarks
+WHERE rollup_name = 'creator_daily_summary'
+ON CONFLICT (rollup_name) DO NOTHING;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Creator totals created!';
+    RAISE NOTICE 'Table: creator_totals (refreshed with the posts rollups)';
+END $$;
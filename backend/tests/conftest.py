@@ -0,0 +1,23 @@
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+from database import get_connection_params
+
+
+@pytest.fixture
+def db_cursor():
+    """
+    A dict cursor on the configured database, inside a transaction that is
+    rolled back afterwards. Skips the test when PostgreSQL can't be reached.
+    """
+    try:
+        connection = psycopg2.connect(**get_connection_params(), connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            yield cursor
+    finally:
+        connection.rollback()
+        connection.close()
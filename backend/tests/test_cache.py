@@ -0,0 +1,152 @@
+import asyncio
+import uuid
+
+import pytest
+
+import cache
+from cache import MemoryCacheBackend, _MISSING
+
+CREATOR = "0f8fad5b-d9cb-469f-a165-70867728950e"
+OTHER_CREATOR = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    backend = MemoryCacheBackend(max_entries=100, max_bytes=1024 * 1024)
+    monkeypatch.setattr(cache, "analytics_cache", backend)
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used_beyond_max_entries():
+    backend = MemoryCacheBackend(max_entries=2, max_bytes=1024 * 1024)
+    await backend.set("a", 1, CREATOR, 60)
+    await backend.set("b", 2, CREATOR, 60)
+    assert await backend.get("a") == 1  # "b" is now the least recently used
+
+    await backend.set("c", 3, CREATOR, 60)
+
+    assert await backend.get("b") is _MISSING
+    assert await backend.get("a") == 1
+    assert await backend.get("c") == 3
+    assert backend.stats()["evictions"] == 1
+    assert backend.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_evicts_beyond_max_bytes_and_skips_oversized_values():
+    value = "x" * 400
+    backend = MemoryCacheBackend(max_entries=100, max_bytes=1000)
+    await backend.set("a", value, CREATOR, 60)
+    await backend.set("b", value, CREATOR, 60)
+    await backend.set("c", value, CREATOR, 60)
+
+    assert await backend.get("a") is _MISSING
+    assert backend.stats()["bytes"] <= 1000
+
+    await backend.set("huge", "x" * 2000, CREATOR, 60)
+    assert await backend.get("huge") is _MISSING
+    assert await backend.get("c") == value
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_misses():
+    backend = MemoryCacheBackend(max_entries=10, max_bytes=1024)
+    await backend.set("a", 1, CREATOR, 0)
+    await asyncio.sleep(0.01)
+
+    assert await backend.get("a") is _MISSING
+    assert backend.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_returns_copies_of_cached_values():
+    backend = MemoryCacheBackend(max_entries=10, max_bytes=1024)
+    await backend.set("a", {"views": [1]}, CREATOR, 60)
+
+    (await backend.get("a"))["views"].append(2)
+
+    assert await backend.get("a") == {"views": [1]}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_creator_drops_only_their_entries(memory_cache):
+    calls = []
+
+    @cache.cached("test")
+    async def compute(creator_id, days=7):
+        calls.append((creator_id, days))
+        return len(calls)
+
+    assert await compute(CREATOR) == 1
+    assert await compute(CREATOR, days=30) == 2
+    assert await compute(OTHER_CREATOR) == 3
+    assert await compute(CREATOR) == 1
+
+    await cache.invalidate_creator(CREATOR)
+
+    assert await compute(CREATOR) == 4
+    assert await compute(CREATOR, days=30) == 5
+    assert await compute(OTHER_CREATOR) == 3
+
+
+@pytest.mark.asyncio
+async def test_creator_ids_share_one_key_however_written(memory_cache):
+    calls = []
+
+    @cache.cached("test")
+    async def compute(creator_id):
+        calls.append(creator_id)
+        return len(calls)
+
+    assert await compute(CREATOR) == 1
+    assert await compute(CREATOR.upper()) == 1
+    assert await compute(uuid.UUID(CREATOR)) == 1
+
+    # The trigger notifies lowercase text; an uppercase caller's entry goes too
+    await cache.invalidate_creator(CREATOR)
+    assert await compute(CREATOR.upper()) == 2
+
+
+@pytest.mark.asyncio
+async def test_result_computed_across_an_invalidation_is_not_stored(memory_cache):
+    started, release = asyncio.Event(), asyncio.Event()
+    results = iter(["before the change", "after the change"])
+
+    @cache.cached("test")
+    async def compute(creator_id):
+        value = next(results)
+        started.set()
+        await release.wait()
+        return value
+
+    pending = asyncio.create_task(compute(CREATOR))
+    await started.wait()
+    await cache.invalidate_creator(CREATOR)
+    release.set()
+
+    assert await pending == "before the change"
+    assert await compute(CREATOR) == "after the change"
+    assert cache._computing == {}
+    assert cache._generations == {}
+
+
+@pytest.mark.asyncio
+async def test_result_computed_across_a_clear_is_not_stored(memory_cache):
+    started, release = asyncio.Event(), asyncio.Event()
+    results = iter(["before the clear", "after the clear"])
+
+    @cache.cached("test")
+    async def compute(creator_id):
+        value = next(results)
+        started.set()
+        await release.wait()
+        return value
+
+    pending = asyncio.create_task(compute(CREATOR))
+    await started.wait()
+    await cache.clear_cache()
+    release.set()
+
+    assert await pending == "before the clear"
+    assert await compute(CREATOR) == "after the clear"
@@ -0,0 +1,124 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from psycopg2.extras import execute_values
+
+np = pytest.importorskip("numpy")
+
+from columnar_engine import CREATOR_POSTS_QUERY, ColumnarSnapshot, _encode  # noqa: E402
+from services.analytics_service import BUNDLE_QUERIES  # noqa: E402
+from services.trends_service import TREND_SERIES_QUERY, TrendsService  # noqa: E402
+
+PLATFORMS = ('instagram', 'tiktok', 'youtube')
+CONTENT_TYPES = ('reel', 'carousel', 'static', 'video', 'short')
+
+FIXTURE_USER_QUERY = """
+    INSERT INTO users (username, user_type, email, display_name)
+    VALUES ('columnar_test', 'creator', 'columnar_test@example.com', 'Columnar Test')
+    RETURNING user_id
+"""
+FIXTURE_CREATOR_QUERY = """
+    INSERT INTO creators (user_id)
+    VALUES (%s)
+    RETURNING creator_id::text
+"""
+FIXTURE_POST_QUERY = """
+    INSERT INTO posts_master (
+        platform, creator_id, account_type, content_type, post_datetime,
+        views, likes, comments, shares
+    ) VALUES %s
+"""
+
+
+@pytest.fixture
+def fixture_creator(db_cursor):
+    """
+    A creator with 400 posts over the last 120 days (some without views),
+    and the engine's snapshot of exactly those rows. Rolled back afterwards.
+    """
+    rng = random.Random(17)
+    now = datetime.now(timezone.utc)
+    db_cursor.execute(FIXTURE_USER_QUERY)
+    user_id = db_cursor.fetchone()['user_id']
+    db_cursor.execute(FIXTURE_CREATOR_QUERY, (user_id,))
+    creator_id = db_cursor.fetchone()['creator_id']
+
+    posts = []
+    for _ in range(400):
+        views = 0 if rng.random() < 0.1 else rng.randint(1, 2_000_000)
+        posts.append((
+            rng.choice(PLATFORMS), creator_id, 'creator', rng.choice(CONTENT_TYPES),
+            now - timedelta(seconds=rng.randint(0, 120 * 86400)),
+            views, rng.randint(0, 50_000), rng.randint(0, 5_000), rng.randint(0, 2_000)
+        ))
+    execute_values(db_cursor, FIXTURE_POST_QUERY, posts)
+
+    # The engine loads tuples, as from its own psycopg connection
+    with db_cursor.connection.cursor() as cursor:
+        cursor.execute(CREATOR_POSTS_QUERY, ([creator_id],))
+        snapshot = ColumnarSnapshot.from_parts([_encode(cursor.fetchall())], now)
+    return creator_id, snapshot
+
+
+def _bundle_key(row):
+    return tuple((value is None, value) for value in (
+        row['grouping_id'], row['platform'], row['content_type'], row['post_hour'], row['post_day']
+    ))
+
+
+def _assert_same_bundle(engine_rows, sql_rows):
+    assert len(engine_rows) == len(sql_rows)
+    for engine_row, sql_row in zip(sorted(engine_rows, key=_bundle_key), sorted(sql_rows, key=_bundle_key)):
+        sql_row = dict(sql_row)
+        assert engine_row.keys() == sql_row.keys()
+        assert engine_row['avg_engagement'] == pytest.approx(sql_row.pop('avg_engagement'), rel=1e-9)
+        # Counts and AVG(views) are exact, down to the numeric's scale
+        for name, value in sql_row.items():
+            assert engine_row[name] == value, name
+            if name == 'avg_reach' and value is not None:
+                assert str(engine_row[name]) == str(value)
+
+
+@pytest.mark.parametrize("platform", [None, 'tiktok', 'snapchat'])
+@pytest.mark.parametrize("window_days", [None, 7, 30])
+def test_bundle_rows_match_sql(db_cursor, fixture_creator, platform, window_days):
+    creator_id, snapshot = fixture_creator
+    since = datetime.now(timezone.utc) - timedelta(days=window_days) if window_days else None
+    params = [creator_id] + ([platform] if platform else []) + ([since] if since else [])
+
+    db_cursor.execute(BUNDLE_QUERIES[(platform is not None, since is not None)], params)
+
+    _assert_same_bundle(snapshot.bundle_rows(creator_id, platform, since), db_cursor.fetchall())
+
+
+def test_totals_match_sql(db_cursor, fixture_creator):
+    creator_id, snapshot = fixture_creator
+
+    db_cursor.execute(BUNDLE_QUERIES[(False, False)], [creator_id])
+    sql_rows = db_cursor.fetchall()
+
+    totals = [row for row in sql_rows if row['grouping_id'] == 0b1111]
+    _assert_same_bundle(snapshot.bundle_rows(creator_id.upper(), totals_only=True), totals)
+    assert snapshot.total_views(creator_id) == totals[0]['views']
+
+
+@pytest.mark.parametrize("window_days, periods", [(7, 4), (30, 3), (1, 14)])
+def test_trend_rows_match_sql(db_cursor, fixture_creator, window_days, periods):
+    creator_id, snapshot = fixture_creator
+    params = TrendsService._series_params(creator_id, window_days, periods)
+
+    db_cursor.execute(TREND_SERIES_QUERY, params)
+
+    engine_rows = snapshot.trend_rows(creator_id, params['first_day'], params['today'], window_days)
+    assert engine_rows == [dict(row) for row in db_cursor.fetchall()]
+
+
+def test_unknown_creator_matches_sql(db_cursor, fixture_creator):
+    _, snapshot = fixture_creator
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    db_cursor.execute(BUNDLE_QUERIES[(False, False)], [missing])
+
+    _assert_same_bundle(snapshot.bundle_rows(missing), db_cursor.fetchall())
+    assert snapshot.total_views(missing) == 0
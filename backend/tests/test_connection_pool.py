@@ -0,0 +1,158 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+import connection_pool
+from connection_pool import BlockingConnectionPool, PoolTimeout, TooManyRequests
+
+
+class FakeConnection:
+    """Just what the pool touches of a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.probes = 0
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query):
+                connection.probes += 1
+
+        return Cursor()
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Every connection the pool opens, in order; psycopg2.connect never reaches a server."""
+    opened = []
+
+    def connect(**kwargs):
+        connection = FakeConnection()
+        opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(connection_pool.psycopg2, "connect", connect)
+    return opened
+
+
+def test_getconn_times_out_when_pool_is_full(connections):
+    db_pool = BlockingConnectionPool(0, 1, timeout=0.05)
+    held = db_pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        db_pool.getconn()
+
+    assert time.monotonic() - started >= 0.05
+    stats = db_pool.get_stats()
+    assert stats["requests_errors"] == 1
+    assert stats["requests_queued"] == 1
+    assert stats["requests_waiting"] == 0
+    assert db_pool.size == 1
+
+    db_pool.putconn(held)
+    assert db_pool.getconn() is held
+
+
+def test_getconn_rejects_beyond_max_waiting(connections):
+    db_pool = BlockingConnectionPool(0, 1, timeout=5, max_waiting=1)
+    held = db_pool.getconn()
+
+    waiter_got = []
+    waiter = threading.Thread(target=lambda: waiter_got.append(db_pool.getconn()))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while db_pool.get_stats()["requests_waiting"] < 1:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.01)
+
+    with pytest.raises(TooManyRequests):
+        db_pool.getconn()
+    assert db_pool.get_stats()["requests_rejected"] == 1
+
+    # The queued caller is unaffected and gets the connection once it's back
+    db_pool.putconn(held)
+    waiter.join(5)
+    assert waiter_got == [held]
+
+
+def test_expired_connection_is_recycled_on_putconn(connections):
+    db_pool = BlockingConnectionPool(0, 2, max_lifetime=0)
+    connection = db_pool.getconn()
+
+    db_pool.putconn(connection)
+
+    assert connection.closed
+    assert db_pool.size == 0
+    assert db_pool.available == 0
+    assert db_pool.get_stats()["connections_recycled"] == 1
+
+
+def test_expired_connection_is_recycled_on_getconn(connections):
+    db_pool = BlockingConnectionPool(0, 1, max_lifetime=0.2)
+    first = db_pool.getconn()
+    db_pool.putconn(first)
+    assert db_pool.available == 1
+
+    time.sleep(0.25)
+    second = db_pool.getconn()
+
+    assert second is not first
+    assert first.closed
+    assert not second.closed
+    assert connections == [first, second]
+    assert db_pool.size == 1
+    assert db_pool.get_stats()["connections_recycled"] == 1
+
+
+def test_idle_connection_is_probed_on_getconn(connections):
+    db_pool = BlockingConnectionPool(0, 1)
+    connection = db_pool.getconn()
+    db_pool.putconn(connection)
+
+    assert db_pool.getconn() is connection
+    assert connection.probes == 1
+    assert connection.autocommit is False
+
+
+def test_failed_open_releases_its_slot(monkeypatch, connections):
+    db_pool = BlockingConnectionPool(0, 1, timeout=0.05)
+    working_connect = connection_pool.psycopg2.connect
+
+    def refuse(**kwargs):
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(connection_pool.psycopg2, "connect", refuse)
+    with pytest.raises(psycopg2.OperationalError):
+        db_pool.getconn()
+
+    assert db_pool.size == 0
+    assert db_pool._opening == 0
+    assert db_pool.get_stats()["connections_errors"] == 1
+
+    # The slot is free again: a full pool would time out here instead
+    monkeypatch.setattr(connection_pool.psycopg2, "connect", working_connect)
+    connection = db_pool.getconn()
+    assert connections == [connection]
+    assert db_pool.size == 1
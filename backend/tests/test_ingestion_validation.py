@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import ingestion_service
+from services.ingestion_service import IngestionService
+
+CREATOR = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+VALID_ROW = {
+    "platform": "Instagram",
+    "external_id": "ig-1",
+    "creator_id": CREATOR.upper(),
+    "post_datetime": "2024-05-01T12:30:00",
+    "content_type": "reel",
+    "views": "1200",
+    "likes": 80,
+    "hashtags": ["fitness", "gym"]
+}
+
+
+def prepare(data: str, format: str):
+    return list(IngestionService._prepare_batches(io.BytesIO(data.encode()), format, "test"))
+
+
+def ndjson(*rows) -> str:
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+
+def copy_rows(copy_data: str):
+    return list(csv.reader(io.StringIO(copy_data)))
+
+
+def rejection(overrides):
+    """The (error_type, message) of one NDJSON row: VALID_ROW with `overrides` (None removes a field)."""
+    row = {key: value for key, value in {**VALID_ROW, **overrides}.items() if value is not None}
+    [(copy_data, received, valid, errors)] = prepare(ndjson(row), "ndjson")
+    assert (copy_data, received, valid, len(errors)) == ("", 1, 0, 1)
+    error_type, payload, message, source = errors[0]
+    assert payload == row
+    assert source == "test"
+    return error_type, message
+
+
+def test_valid_row_is_normalized():
+    [(copy_data, received, valid, errors)] = prepare(ndjson(VALID_ROW), "ndjson")
+
+    assert (received, valid, errors) == (1, 1, [])
+    [row] = copy_rows(copy_data)
+    staged = dict(zip(ingestion_service.STAGING_COLUMNS, row))
+    assert staged["line_no"] == "1"
+    assert staged["platform"] == "instagram"
+    assert staged["creator_id"] == CREATOR
+    assert staged["account_type"] == "creator"
+    assert staged["hashtags"] == '{"fitness","gym"}'
+    # No offset means UTC
+    assert datetime.fromisoformat(staged["post_datetime"]) == datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert (staged["views"], staged["likes"], staged["comments"]) == ("1200", "80", "0")
+    assert staged["impressions"] == ""
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"creator_id": None, "external_id": "  "}, "missing required field(s): external_id, creator_id"),
+    ({"content_type": None}, "missing required field(s): content_type"),
+    ({"creator_id": "creator-42"}, "creator_id is not a UUID"),
+    ({"post_datetime": "01/05/2024"}, "post_datetime is not ISO 8601"),
+    ({"post_datetime": "1900-01-01T00:00:00Z"}, "outside the accepted window"),
+    ({"post_datetime": "9999-12-31T00:00:00+00:00"}, "outside the accepted window"),
+    ({"content_type": "story"}, "content_type must be one of"),
+    ({"account_type": "personal"}, "account_type must be one of"),
+    ({"views": -1}, "views out of range: -1"),
+    ({"views": "lots"}, "views must be an integer"),
+    ({"likes": True}, "likes must be an integer"),
+    ({"duration": 2 ** 31}, "duration out of range"),
+    ({"hashtags": {"tag": "gym"}}, "hashtags must be a list"),
+])
+def test_invalid_rows_are_recorded(overrides, message):
+    error_type, error = rejection(overrides)
+
+    assert error_type == "invalid_row"
+    assert error.startswith("Line 1: ")
+    assert message in error
+
+
+@pytest.mark.parametrize("field, max_length", sorted(ingestion_service.COLUMN_MAX_LENGTHS.items()))
+def test_overlong_values_are_recorded_as_too_long(field, max_length):
+    error_type, error = rejection({field: "x" * (max_length + 1)})
+
+    assert error_type == "too_long"
+    assert f"{field} longer than {max_length} characters ({max_length + 1})" in error
+
+
+def test_post_datetime_window_edges_are_accepted():
+    earliest = ingestion_service.INGEST_EARLIEST_POST_DATE.isoformat()
+    soon = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+
+    [(_, received, valid, errors)] = prepare(ndjson(
+        {**VALID_ROW, "post_datetime": earliest},
+        {**VALID_ROW, "external_id": "ig-2", "post_datetime": soon}
+    ), "ndjson")
+
+    assert (received, valid, errors) == (2, 2, [])
+
+
+def test_malformed_ndjson_lines():
+    [(copy_data, received, valid, errors)] = prepare(ndjson(
+        VALID_ROW,
+        '{"platform": "tiktok", ',
+        "",
+        '["tiktok", "tt-1"]',
+        "42"
+    ), "ndjson")
+
+    # The blank line is skipped but still counted in the line numbers
+    assert (received, valid) == (4, 1)
+    assert [row[0] for row in copy_rows(copy_data)] == ["1"]
+    assert [(error_type, payload, message.split(":")[0]) for error_type, payload, message, _ in errors] == [
+        ("invalid_row", {"raw": '{"platform": "tiktok",'}, "Line 2"),
+        ("invalid_row", ["tiktok", "tt-1"], "Line 4"),
+        ("invalid_row", 42, "Line 5"),
+    ]
+    assert "invalid JSON" in errors[0][2]
+    assert "row is not a JSON object" in errors[1][2]
+
+
+def test_malformed_csv_rows():
+    data = (
+        "platform,external_id,creator_id,post_datetime,content_type,views,hashtags\n"
+        f"youtube,yt-1,{CREATOR},2024-05-01T10:00:00Z,video,10,\"gym, fitness  run\"\n"
+        f"youtube,,{CREATOR},2024-05-01T10:00:00Z,video,10,\n"
+        f"youtube,yt-3,{CREATOR},2024-05-01,video,ten,\n"
+        f"youtube,{'y' * 256},{CREATOR},2024-05-01T10:00:00Z,video,10,\n"
+        "youtube,yt-5\n"
+    )
+
+    [(copy_data, received, valid, errors)] = prepare(data, "csv")
+
+    assert (received, valid) == (5, 1)
+    [row] = copy_rows(copy_data)
+    assert row[0] == "2"
+    assert row[ingestion_service.STAGING_COLUMNS.index("hashtags")] == '{"gym","fitness","run"}'
+    assert [(error_type, message.split(":")[0]) for error_type, _, message, _ in errors] == [
+        ("invalid_row", "Line 3"),
+        ("invalid_row", "Line 4"),
+        ("too_long", "Line 5"),
+        ("invalid_row", "Line 6"),
+    ]
+    assert "missing required field(s): external_id" in errors[0][2]
+    assert "views must be an integer" in errors[1][2]
+    assert "missing required field(s): creator_id, post_datetime" in errors[3][2]
+
+
+def test_rows_are_split_into_batches(monkeypatch):
+    monkeypatch.setattr(ingestion_service, "INGEST_BATCH_SIZE", 2)
+    rows = [{**VALID_ROW, "external_id": f"ig-{n}"} for n in range(4)] + ["not json"]
+
+    batches = prepare(ndjson(*rows), "ndjson")
+
+    assert [(received, valid, len(errors)) for _, received, valid, errors in batches] == [(2, 2, 0), (2, 2, 0), (1, 0, 1)]
+    assert [row[0] for row in copy_rows(batches[1][0])] == ["3", "4"]
@@ -0,0 +1,106 @@
+import bisect
+import random
+from collections import Counter
+
+import pytest
+
+from services.ranking_service import (
+    SKETCH_RELATIVE_ACCURACY, ZERO_BUCKET, PercentileSketch, SketchSet, sketch_bucket
+)
+
+# Width of one bucket: every value in a bucket is within this factor of any other
+GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+# percentile() rounds to one decimal
+ROUNDING = 0.05 + 1e-9
+
+
+def share_below(sorted_values, value):
+    return 100.0 * bisect.bisect_left(sorted_values, value) / len(sorted_values)
+
+
+def share_at_or_below(sorted_values, value):
+    return 100.0 * bisect.bisect_right(sorted_values, value) / len(sorted_values)
+
+
+@pytest.fixture(scope="module")
+def creator_values():
+    """Sorted view-like values: heavy-tailed, with ties and some zeros."""
+    rng = random.Random(16)
+    values = [round(rng.lognormvariate(8, 2.5)) for _ in range(20000)]
+    values += [0] * 500
+    return sorted(values)
+
+
+@pytest.fixture(scope="module")
+def sketch(creator_values):
+    return PercentileSketch(Counter(sketch_bucket(v) for v in creator_values))
+
+
+def test_bucket_is_within_relative_accuracy():
+    for value in (0.001, 0.37, 1, 2, 99.5, 1e4, 123456789.0):
+        bucket = sketch_bucket(value)
+        assert GAMMA ** (bucket - 1) < value * (1 + 1e-12)
+        assert value <= GAMMA ** bucket * (1 + 1e-12)
+    assert sketch_bucket(0) == sketch_bucket(-1) == sketch_bucket(None) == ZERO_BUCKET
+
+
+def test_percentile_is_an_exact_rank_within_one_bucket_width(creator_values, sketch):
+    """
+    A value's rank counts creators below its bucket plus half those in it, so
+    it lies between the exact share below value / GAMMA and the exact share
+    at or below value * GAMMA.
+    """
+    rng = random.Random(17)
+    probes = rng.sample([v for v in creator_values if v > 0], 200)
+    probes += [rng.lognormvariate(8, 3) for _ in range(200)]
+    for value in probes:
+        percentile = sketch.percentile(value)
+        low = share_below(creator_values, value / GAMMA)
+        high = share_at_or_below(creator_values, value * GAMMA)
+        assert low - ROUNDING <= percentile <= high + ROUNDING, value
+
+
+def test_percentile_matches_exact_midrank_closely(creator_values, sketch):
+    worst = 0.0
+    for q in range(1, 100):
+        value = creator_values[len(creator_values) * q // 100]
+        if value <= 0:
+            continue
+        midrank = (share_below(creator_values, value) + share_at_or_below(creator_values, value)) / 2
+        worst = max(worst, abs(sketch.percentile(value) - midrank))
+    # 20k creators spread over ~1000 buckets: a bucket holds well under 1% of them
+    assert worst < 1.0
+
+
+def test_zero_and_out_of_range_values(creator_values, sketch):
+    zero_share = share_at_or_below(creator_values, 0)
+    assert sketch.percentile(0) == round(zero_share / 2, 1)
+    assert sketch.percentile(None) == round(zero_share / 2, 1)
+    assert sketch.percentile(1e-9) == round(zero_share, 1)
+    assert sketch.percentile(max(creator_values) * 10) == 100.0
+
+
+def test_empty_sketch_has_no_percentile():
+    assert PercentileSketch({}).percentile(10) is None
+
+
+def test_sketch_set_ranks_by_dimension():
+    rows = [
+        {"metric": "views", "dimension": "global", "dimension_value": "", "bucket": sketch_bucket(v), "creator_count": 1}
+        for v in (10, 100, 1000, 10000)
+    ] + [
+        {"metric": "views", "dimension": "category", "dimension_value": "fitness", "bucket": sketch_bucket(v), "creator_count": 1}
+        for v in (1000, 10000)
+    ]
+    sketches = SketchSet(rows)
+
+    assert sketches.percentile("views", 1000) == 62.5
+    assert sketches.percentile("views", 1000, "category", "fitness") == 25.0
+    assert sketches.percentile("views", 1000, "category", "travel") is None
+    assert sketches.search_percentiles(0.05, 1000, "fitness")["views"] == {
+        "global": 62.5, "category": {"fitness": 25.0}
+    }
+    assert sketches.creator_percentiles([
+        {"metric": "views", "dimension": "global", "dimension_value": "", "value": 10000},
+        {"metric": "views", "dimension": "category", "dimension_value": "fitness", "value": 10000},
+    ]) == {"views": {"global": 87.5, "category": {"fitness": 75.0}}}
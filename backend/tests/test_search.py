@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from services.ranking_service import SketchSet
+from services.search_service import SEARCH_CREATORS_QUERY, SearchService
+
+
+def search(db_cursor, **kwargs):
+    params = SearchService._search_params(
+        kwargs.get('domain'), None, kwargs.get('min_engagement'), kwargs.get('limit', 50), kwargs.get('offset', 0)
+    )
+    db_cursor.execute(SEARCH_CREATORS_QUERY, params)
+    return SearchService._shape_results(db_cursor.fetchall(), params, SketchSet([]))
+
+
+def test_total_is_reported_past_the_last_page(db_cursor):
+    first_page = search(db_cursor, limit=1)
+
+    past_end = search(db_cursor, limit=1, offset=first_page["total"] + 10)
+
+    assert past_end["creators"] == []
+    assert past_end["count"] == 0
+    assert past_end["total"] == first_page["total"]
+
+
+def test_totals_include_posts_newer_than_the_rollups(db_cursor):
+    db_cursor.execute("""
+        INSERT INTO users (username, user_type, email, display_name)
+        VALUES ('search_test', 'creator', 'search_test@example.com', 'Search Test')
+        RETURNING user_id
+    """)
+    db_cursor.execute("INSERT INTO creators (user_id, verified) VALUES (%s, TRUE) RETURNING creator_id::text",
+                      (db_cursor.fetchone()['user_id'],))
+    creator_id = db_cursor.fetchone()['creator_id']
+    # Written after the last rollup run, so creator_totals has no row for it
+    # yet; the engagement rate ranks it first
+    db_cursor.execute("""
+        INSERT INTO posts_master (platform, creator_id, account_type, content_type, post_datetime, views, likes, comments, shares)
+        VALUES ('instagram', %s, 'creator', 'reel', %s, 1000, 100000, 0, 0)
+    """, (creator_id, datetime.now(timezone.utc)))
+
+    result = search(db_cursor, limit=1)
+
+    [top] = result["creators"]
+    assert str(top["creator_id"]) == creator_id
+    assert top["stats"]["total_views"] == 1000
+    assert top["stats"]["total_posts"] == 1
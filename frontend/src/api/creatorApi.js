@@ -11,6 +11,16 @@ export const creatorApi = {
         return response.json();
     },
 
+    async getDashboardBundle(creatorId, platform = null, dateRange = '30d') {
+        const params = new URLSearchParams({ creator_id: creatorId });
+        if (platform && platform !== 'all') params.append('platform', platform);
+        if (dateRange) params.append('date_range', dateRange);
+
+        const response = await fetch(`${API_BASE_URL}/api/dashboard/bundle?${params}`);
+        if (!response.ok) throw new Error('Failed to fetch dashboard bundle');
+        return response.json();
+    },
+
     async getTrends(creatorId) {
         const response = await fetch(`${API_BASE_URL}/api/dashboard/trends?creator_id=${creatorId}`);
         if (!response.ok) throw new Error('Failed to fetch trends');